@@ -6,24 +6,31 @@
 #
 # we want to be able to use / in docstrings for now
 # pylint: disable=W1401
+import asyncio
 import json
 import sys
-from typing import List, Optional
+from typing import List, Optional, Union
 
+import httpx
 from fastapi import FastAPI, Header, HTTPException, Request
 from fastapi.responses import JSONResponse
 from requests.exceptions import HTTPError
 
-from api import log
+from api import log, uci_log
 from api.app_support import (
     decode_and_normalize_events,
     get_jwt_from_authorization_header,
     perform_uci_test,
     retrieve_prepare_issue_message_from_redis,
+    verify_cms_signatures,
 )
+from api.cms_signatures import cms_verifier
 from api.enrichment.rvig import rvig
+from api.enrichment.rvig.cache import rvig_cache
+from api.http_utils import upstream_clients
 from api.models import (
     ApplicationHealth,
+    ApplicationStatistics,
     CredentialsRequestData,
     CredentialsRequestEvents,
     DataProviderEventsResult,
@@ -37,9 +44,12 @@ from api.models import (
     V2Event,
 )
 from api.requesters import identity_hashes
-from api.requesters.prepare_issue import get_prepare_issue
+from api.requesters.event_data_providers import event_data_providers
+from api.requesters.prepare_issue import get_prepare_issue, prepare_issue_pool
 from api.session_store import session_store
 from api.signers import eu_international, eu_international_print, nl_domestic_dynamic, nl_domestic_print
+from api.signers.logic import DistillationContext
+from api.uci import uci_pool
 
 app = FastAPI()
 
@@ -55,14 +65,17 @@ async def fallback_exception_handler(request: Request, exc: Exception) -> JSONRe
 
 
 @app.exception_handler(HTTPError)
-async def fallback_httperror_handler(_request: Request, http_error: HTTPError) -> JSONResponse:
+@app.exception_handler(httpx.HTTPStatusError)
+async def fallback_httperror_handler(
+    _request: Request, http_error: Union[HTTPError, httpx.HTTPStatusError]
+) -> JSONResponse:
     """
     When making requests to a server, we want the default behavior to be a handled http error rather than an internal
     error which is not very helpful for the calling service.
 
-    This function parses an http error thrown by the requests library, and passes it back to the user.
+    This function parses an http error thrown by the requests or httpx library, and passes it back to the user.
 
-    :param http_error: the error thrown by the requests library
+    :param http_error: the error thrown by the requests or httpx library
     :returns: JSONResponse containing the details as described in the detail section of the error response.
     """
     error_status_code = http_error.response.status_code
@@ -79,7 +92,59 @@ async def fallback_httperror_handler(_request: Request, http_error: HTTPError) -
 @app.get("/", response_model=ApplicationHealth)
 @app.get("/health", response_model=ApplicationHealth)
 async def health_request() -> ApplicationHealth:
-    return ApplicationHealth(running=True, service_status=session_store.health_check() + rvig.health())
+    return ApplicationHealth(running=True, service_status=await session_store.health_check() + await rvig.health())
+
+
+@app.get("/statistics", response_model=ApplicationStatistics)
+async def statistics_request() -> ApplicationStatistics:
+    return ApplicationStatistics(
+        http_pools=upstream_clients.statistics(),
+        rvig_cache=rvig_cache.statistics(),
+        session_store=session_store.statistics(),
+        prepare_issue_pool=prepare_issue_pool.statistics(),
+        cms_verification=cms_verifier.statistics(),
+        uci_pool=uci_pool.statistics(),
+    )
+
+
+@app.on_event("startup")
+async def fill_prepare_issue_pool() -> None:
+    prepare_issue_pool.start_refill()
+
+
+@app.on_event("startup")
+async def fill_uci_pool() -> None:
+    uci_pool.start_refill()
+
+
+@app.on_event("shutdown")
+async def stop_prepare_issue_pool() -> None:
+    await prepare_issue_pool.aclose()
+
+
+@app.on_event("shutdown")
+async def stop_uci_pool() -> None:
+    await uci_pool.aclose()
+
+
+@app.on_event("shutdown")
+async def close_upstream_connections() -> None:
+    await upstream_clients.aclose()
+    await session_store.aclose()
+    await rvig_cache.aclose()
+
+
+@app.on_event("shutdown")
+async def stop_signing_threads() -> None:
+    event_data_providers.shutdown()
+    cms_verifier.shutdown()
+
+
+@app.on_event("shutdown")
+async def flush_uci_log() -> None:
+    # Logging closes the UCI log at exit as well, this makes sure the UCIs are on disk before the workers stop.
+    for handler in uci_log.handlers:
+        handler.flush()
 
 
 @app.get("/unhealth")
@@ -103,7 +168,7 @@ async def get_access_tokens_request(authorization: str = Header(None)) -> List[E
     """
     jwt_token = get_jwt_from_authorization_header(authorization)
     bsn = await identity_hashes.retrieve_bsn_from_inge6(jwt_token)
-    return identity_hashes.create_provider_jwt_tokens(bsn)
+    return await identity_hashes.create_provider_jwt_tokens(bsn)
 
 
 @app.post("/app/prepare_issue/", response_model=PrepareIssueResponse)
@@ -114,26 +179,36 @@ async def app_prepare_issue_request():
 @app.post("/app/credentials/", response_model=MobileAppProofOfVaccination)
 async def app_credential_request(request_data: CredentialsRequestData):
     # Get the prepare issue message using the stoken
-    prepare_issue_message = retrieve_prepare_issue_message_from_redis(request_data.stoken)
+    prepare_issue_message = await retrieve_prepare_issue_message_from_redis(request_data.stoken)
     if not prepare_issue_message:
         raise HTTPException(status_code=401, detail=["Session expired or is invalid"])
 
+    await verify_cms_signatures(request_data.events)
     events = decode_and_normalize_events(request_data.events)
 
-    domestic_response: Optional[DomesticGreenCard] = nl_domestic_dynamic.sign(
-        events, prepare_issue_message, request_data.issueCommitmentMessage
+    # The signers share the distillation work and each gets its own copy of the events, so they can run at the
+    # same time. An error from either signer is raised as is and handled by the exception handlers above.
+    context = DistillationContext(events)
+    domestic_response: Optional[DomesticGreenCard]
+    eu_response: Optional[List[EUGreenCard]]
+    domestic_response, eu_response = await asyncio.gather(
+        nl_domestic_dynamic.sign(events, prepare_issue_message, request_data.issueCommitmentMessage, context),
+        eu_international.sign(events, context),
     )
-    eu_response: Optional[List[EUGreenCard]] = eu_international.sign(events)
 
     return MobileAppProofOfVaccination(**{"domesticGreencard": domestic_response, "euGreencards": eu_response})
 
 
 @app.post("/app/print/", response_model=PrintProof)
 async def print_proof_request(request_data: CredentialsRequestEvents):
+    await verify_cms_signatures(request_data.events)
     events = decode_and_normalize_events(request_data.events)
 
-    domestic = nl_domestic_print.sign(events)
-    european = eu_international_print.sign(events)
+    # See app_credential_request on signing concurrently
+    context = DistillationContext(events)
+    domestic, european = await asyncio.gather(
+        nl_domestic_print.sign(events, context), eu_international_print.sign(events, context)
+    )
 
     return PrintProof(
         domestic=domestic,
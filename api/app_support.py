@@ -5,19 +5,21 @@
 # SPDX-License-Identifier: EUPL-1.2
 #
 import base64
-import json
 import logging
 from http import HTTPStatus
-from typing import List, Optional
+from typing import List, Optional, Sequence
 from uuid import UUID
 
+import orjson
 from fastapi import HTTPException
 from pydantic import ValidationError
 
-from api import log
+from api import log, uci_log
+from api.cms_signatures import cms_verifier
 from api.models import (
     CMSSignedDataBlob,
     DataProviderEventsResult,
+    DecodedDataProviderEventsResult,
     DutchBirthDate,
     Event,
     Events,
@@ -46,10 +48,14 @@ def get_jwt_from_authorization_header(header_data: str) -> str:
     return possible_jwt_token.strip()
 
 
-def extract_results(blobs: List[CMSSignedDataBlob]) -> List[DataProviderEventsResult]:
+def extract_results(blobs: List[CMSSignedDataBlob]) -> List[DecodedDataProviderEventsResult]:
+    """
+    Decodes the payloads in one pass: the events are validated straight into Event, with the holder and provider of
+    their payload.
+    """
     results = []
     for i, cms_signed_blob in enumerate(blobs):
-        dp_event_json = json.loads(base64.b64decode(cms_signed_blob.payload))
+        dp_event_json = orjson.loads(base64.b64decode(cms_signed_blob.payload))
         protocol_loc = ["body", i, "payload", "protocolVersion"]
         if not "protocolVersion" in dp_event_json:
             raise HTTPException(
@@ -58,12 +64,12 @@ def extract_results(blobs: List[CMSSignedDataBlob]) -> List[DataProviderEventsRe
             )
         try:
             if dp_event_json["protocolVersion"] == "3.0":
-                dp_event_result: DataProviderEventsResult = DataProviderEventsResult(**dp_event_json)
+                dp_event_result = DecodedDataProviderEventsResult(**dp_event_json)
             elif dp_event_json["protocolVersion"] == "2.0":
                 log.debug("Receiving V2 event, upgrading to V3. This event cannot be EU signed.")
                 # V2 is contains only one single negative test
                 # V2 messages are not eligible for EU signing because it contains no full name and a wrong year(!)
-                dp_event_result = V2Event(**dp_event_json).upgrade_to_v3()
+                dp_event_result = DecodedDataProviderEventsResult(**dict(V2Event(**dp_event_json).upgrade_to_v3()))
             else:
                 raise HTTPException(
                     status_code=HTTPStatus.UNPROCESSABLE_ENTITY,
@@ -82,7 +88,40 @@ def extract_results(blobs: List[CMSSignedDataBlob]) -> List[DataProviderEventsRe
     return results
 
 
-def has_unique_holder(events_results: List[DataProviderEventsResult]) -> bool:
+async def verify_cms_signatures(blobs: List[CMSSignedDataBlob]) -> None:
+    """
+    Checks the signature of every blob with the certificates of the provider that the payload names, when
+    CMS_SIGNATURE_VERIFICATION_ENABLED. The blobs are verified at the same time.
+    """
+    if not cms_verifier.enabled:
+        return
+
+    signed_payloads = []
+    for i, cms_signed_blob in enumerate(blobs):
+        try:
+            payload = base64.b64decode(cms_signed_blob.payload)
+            signature = base64.b64decode(cms_signed_blob.signature)
+            # Parsing the payload once more is cheap next to checking the signature.
+            provider_identifier = orjson.loads(payload)["providerIdentifier"]
+        except (ValueError, TypeError, KeyError) as err:
+            raise HTTPException(
+                status_code=HTTPStatus.UNPROCESSABLE_ENTITY,
+                detail=[{"loc": ["body", i, "payload"], "msg": "payload can not be read", "type": "value_error"}],
+            ) from err
+        signed_payloads.append((str(provider_identifier), signature, payload))
+
+    errors = await cms_verifier.verify_all(signed_payloads)
+    detail = [
+        {"loc": ["body", i, "signature"], "msg": str(error), "type": "value_error.signature"}
+        for i, error in enumerate(errors)
+        if error is not None
+    ]
+    if detail:
+        log.warning(f"Rejected {len(detail)} of {len(blobs)} CMS signatures: {detail}")
+        raise HTTPException(status_code=HTTPStatus.UNPROCESSABLE_ENTITY, detail=detail)
+
+
+def has_unique_holder(events_results: Sequence[DataProviderEventsResult]) -> bool:
     if not events_results or len(events_results) <= 1:
         return True
 
@@ -106,9 +145,7 @@ def has_unique_holder(events_results: List[DataProviderEventsResult]) -> bool:
 
 def decode_and_normalize_events(request_data_events: List[CMSSignedDataBlob]) -> Events:
     log.debug(f"Received {len(request_data_events)} CMSSignedDataBlobs.")
-    # TODO: CMS signature checks
-    # for loop over events -> cms sig check
-    # signature should be a pkcs7 over payload with a cert.
+    # The CMS signatures are checked before, see verify_cms_signatures.
 
     """
     Incoming Request
@@ -175,20 +212,14 @@ def decode_and_normalize_events(request_data_events: List[CMSSignedDataBlob]) ->
     return events
 
 
-def data_provider_events_results_to_events(data_provider_events_results: List[DataProviderEventsResult]) -> Events:
+def data_provider_events_results_to_events(
+    data_provider_events_results: List[DecodedDataProviderEventsResult],
+) -> Events:
     log.debug(f"Received {len(data_provider_events_results)} DataProviderEventsResult.")
     events: Events = Events()
     for dp_event_result in data_provider_events_results:
-        holder = dp_event_result.holder
-
-        for dp_event in dp_event_result.events:
-            events.events.append(
-                Event(
-                    source_provider_identifier=dp_event_result.providerIdentifier,
-                    holder=holder,
-                    **dp_event.dict(),
-                )
-            )
+        # Already Events with the holder and provider of their result, see extract_results
+        events.events.extend(dp_event_result.events)
 
     log.debug(f"Created {len(events.events)} events.")
     return events
@@ -218,7 +249,7 @@ def filter_specimen_events(events: Events) -> Events:
     return Events(events=[event for event in events.events if not event.isSpecimen])
 
 
-def retrieve_prepare_issue_message_from_redis(stoken: UUID) -> Optional[str]:
+async def retrieve_prepare_issue_message_from_redis(stoken: UUID) -> Optional[str]:
     # Explicitly do not push the prepare_issue_message into a model: the structure will change over time
     # and that change has to be transparent.
     # Pydantic validates the stoken into a uuid, but the redis code needs a string.
@@ -226,7 +257,7 @@ def retrieve_prepare_issue_message_from_redis(stoken: UUID) -> Optional[str]:
     if settings.STOKEN_MOCK:
         return settings.STOKEN_MOCK_DATA
 
-    prepare_issue_message = session_store.get_message(str(stoken))
+    prepare_issue_message = await session_store.get_message(str(stoken))
     return prepare_issue_message.decode("UTF-8") if prepare_issue_message else None
 
 
@@ -239,4 +270,7 @@ def perform_uci_test() -> UciTestInfo:
         source_provider_identifier="ZZZ", unique="UCI_TEST_EVENT", holder=fake_holder, type=EventType.test
     )
     uci = test_event.to_uci_01()
+    # The UCI log is written in the background, wait until this UCI is on disk
+    for handler in uci_log.handlers:
+        handler.flush()
     return UciTestInfo(uci_written_to_logfile=uci, event=test_event)
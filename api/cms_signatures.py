@@ -0,0 +1,326 @@
+# Copyright (c) 2020-2021 De Staat der Nederlanden, Ministerie van Volksgezondheid, Welzijn en Sport.
+#
+# Licensed under the EUROPEAN UNION PUBLIC LICENCE v. 1.2
+#
+# SPDX-License-Identifier: EUPL-1.2
+#
+import asyncio
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Type
+
+from asn1crypto import cms
+from cryptography import x509
+from cryptography.exceptions import InvalidSignature, UnsupportedAlgorithm
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.asymmetric import ec, ed25519, padding, rsa
+
+from api.key_material import KeyMaterial
+from api.metrics import LatencyHistogram
+from api.models import CmsVerificationStatistics
+from api.settings import AppSettings, settings
+
+PEM_CERTIFICATE = re.compile(b"-----BEGIN CERTIFICATE-----.+?-----END CERTIFICATE-----", re.DOTALL)
+
+# How far a signing certificate can be from the certificate of the provider it chains up to
+MAX_CHAIN_LENGTH = 5
+
+DIGEST_ALGORITHMS: Dict[str, Type[hashes.HashAlgorithm]] = {
+    "sha256": hashes.SHA256,
+    "sha384": hashes.SHA384,
+    "sha512": hashes.SHA512,
+}
+
+
+class CmsSignatureError(ValueError):
+    """
+    The signature over a payload is missing, broken, made with an untrusted certificate or does not match.
+    """
+
+
+def load_certificates(data: bytes) -> List[x509.Certificate]:
+    """
+    All certificates in a pem file, such as a certificate with its intermediates.
+    """
+    certificates = [x509.load_pem_x509_certificate(pem) for pem in PEM_CERTIFICATE.findall(data)]
+    if not certificates:
+        raise ValueError("No certificate found.")
+    return certificates
+
+
+@lru_cache(maxsize=1024)
+def parse_certificate(der: bytes) -> x509.Certificate:
+    # Providers send the same certificates with every signature, parse them once.
+    return x509.load_der_x509_certificate(der)
+
+
+def verify_signed_by(public_key: Any, signature: bytes, data: bytes, hash_algorithm: hashes.HashAlgorithm) -> None:
+    """
+    :raises InvalidSignature: when the signature does not match
+    :raises UnsupportedAlgorithm: for a key that is not rsa (pkcs1 v1.5), ecdsa or ed25519
+    """
+    if isinstance(public_key, rsa.RSAPublicKey):
+        public_key.verify(signature, data, padding.PKCS1v15(), hash_algorithm)
+    elif isinstance(public_key, ec.EllipticCurvePublicKey):
+        public_key.verify(signature, data, ec.ECDSA(hash_algorithm))
+    elif isinstance(public_key, ed25519.Ed25519PublicKey):
+        public_key.verify(signature, data)
+    else:
+        raise UnsupportedAlgorithm(f"Can not verify signatures of {type(public_key).__name__}.")
+
+
+class CmsVerifierCounters:  # pylint: disable=too-few-public-methods
+    def __init__(self) -> None:
+        self.verified = 0
+        self.failed = 0
+        self.chain_cache_hits = 0
+        self.chain_cache_misses = 0
+        self.latency: Dict[str, LatencyHistogram] = {}
+
+
+class CmsVerifier:
+    """
+    Verifies the CMS (PKCS#7) signatures that event data providers put over their payloads.
+
+    Every provider in vaccinationproviders.json5 lists the pem files with its certificates in `cms_certificates`. A
+    signature is trusted when its signing certificate is one of those, or is issued by one of those through the
+    certificates in the signature. The signed content, or the detached content, is the decoded payload.
+
+    Certificates are parsed once and a chain that checked out is remembered per provider and signing certificate until
+    the first certificate in it expires, so most signatures only cost checking the signature itself. With more than one
+    thread the payloads of a request are verified at the same time in a thread pool.
+    """
+
+    def __init__(self, app_settings: AppSettings, provider_configs: Optional[List[Dict[str, Any]]] = None):
+        self.enabled = app_settings.CMS_SIGNATURE_VERIFICATION_ENABLED
+        self.threads = app_settings.CMS_SIGNATURE_VERIFICATION_THREADS
+        configs = app_settings.EVENT_DATA_PROVIDERS if provider_configs is None else provider_configs
+        self.provider_certificates: Dict[str, List[KeyMaterial]] = {
+            config["identifier"]: [
+                KeyMaterial(f"{app_settings.SECRETS_FOLDER}/{filename}", load_certificates)
+                for filename in config.get("cms_certificates", [])
+            ]
+            for config in configs
+        }
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+        # (provider, fingerprint of the signing certificate) -> (fingerprint of the trusted certificate, valid until)
+        self._chains: Dict[Tuple[str, bytes], Tuple[bytes, datetime]] = {}
+        # Verification happens in threads
+        self._lock = threading.Lock()
+        self.counters = CmsVerifierCounters()
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.threads, thread_name_prefix="cms-verification")
+        return self._executor
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+    def verify(self, provider_identifier: str, signature: bytes, payload: bytes) -> None:
+        """
+        :raises CmsSignatureError: when the signature is not a valid signature of the provider over the payload
+        """
+        started = time.perf_counter()
+        try:
+            self._verify(provider_identifier, signature, payload)
+        except CmsSignatureError:
+            with self._lock:
+                self.counters.failed += 1
+            raise
+        else:
+            with self._lock:
+                self.counters.verified += 1
+        finally:
+            with self._lock:
+                histogram = self.counters.latency.setdefault(provider_identifier, LatencyHistogram())
+                histogram.observe((time.perf_counter() - started) * 1000)
+
+    async def verify_all(
+        self, signed_payloads: Sequence[Tuple[str, bytes, bytes]]
+    ) -> List[Optional[CmsSignatureError]]:
+        """
+        Verifies (provider identifier, signature, payload) at the same time. Returns the error per payload, None for
+        the payloads that are signed correctly. A single payload is verified in place.
+        """
+        if len(signed_payloads) <= 1 or self.threads <= 1:
+            return [self._error_of(*signed_payload) for signed_payload in signed_payloads]
+
+        loop = asyncio.get_running_loop()
+        return await asyncio.gather(
+            *[
+                loop.run_in_executor(self.executor, self._error_of, *signed_payload)
+                for signed_payload in signed_payloads
+            ]
+        )
+
+    def _error_of(self, provider_identifier: str, signature: bytes, payload: bytes) -> Optional[CmsSignatureError]:
+        try:
+            self.verify(provider_identifier, signature, payload)
+        except CmsSignatureError as err:
+            return err
+        return None
+
+    def _verify(self, provider_identifier: str, signature: bytes, payload: bytes) -> None:
+        trusted = [
+            certificate
+            for key_material in self.provider_certificates.get(provider_identifier, [])
+            for certificate in key_material.key
+        ]
+        if not trusted:
+            raise CmsSignatureError(f"No CMS certificates for provider {provider_identifier}.")
+
+        try:
+            content_info = cms.ContentInfo.load(signature)
+            if content_info["content_type"].native != "signed_data":
+                raise CmsSignatureError("The signature is not CMS signed data.")
+            signed_data = content_info["content"]
+            signer_infos = signed_data["signer_infos"]
+            if len(signer_infos) != 1:
+                raise CmsSignatureError("The signature should have exactly one signer.")
+            signer_info = signer_infos[0]
+
+            content = signed_data["encap_content_info"]["content"].native
+            if content is not None and content != payload:
+                raise CmsSignatureError("The signed content is not the payload.")
+
+            embedded = [
+                parse_certificate(choice.chosen.dump())
+                for choice in signed_data["certificates"] or []
+                if choice.name == "certificate"
+            ]
+            signer = self._find_signer(signer_info["sid"], embedded + trusted)
+            self._check_chain(provider_identifier, signer, embedded, trusted)
+            self._check_signature(signer_info, signer, payload)
+        except CmsSignatureError:
+            raise
+        except (ValueError, TypeError, KeyError) as err:
+            # asn1crypto and cryptography raise these for data that does not parse
+            raise CmsSignatureError(f"The signature could not be read: {repr(err)}") from err
+
+    @staticmethod
+    def _find_signer(sid: cms.SignerIdentifier, certificates: List[x509.Certificate]) -> x509.Certificate:
+        for certificate in certificates:
+            if sid.name == "issuer_and_serial_number":
+                if (
+                    certificate.serial_number == sid.chosen["serial_number"].native
+                    and certificate.issuer.public_bytes() == sid.chosen["issuer"].dump()
+                ):
+                    return certificate
+            else:
+                try:
+                    key_identifier = certificate.extensions.get_extension_for_class(x509.SubjectKeyIdentifier)
+                except x509.ExtensionNotFound:
+                    continue
+                if key_identifier.value.digest == sid.chosen.native:
+                    return certificate
+        raise CmsSignatureError("The signing certificate is not in the signature.")
+
+    def _check_chain(
+        self,
+        provider_identifier: str,
+        signer: x509.Certificate,
+        embedded: List[x509.Certificate],
+        trusted: List[x509.Certificate],
+    ) -> None:
+        now = datetime.utcnow()
+        trusted_by_fingerprint = {certificate.fingerprint(hashes.SHA256()): certificate for certificate in trusted}
+        cache_key = (provider_identifier, signer.fingerprint(hashes.SHA256()))
+
+        with self._lock:
+            cached = self._chains.get(cache_key)
+            # Also not when the provider no longer has the certificate that the chain ended in.
+            if cached is not None and cached[0] in trusted_by_fingerprint and now < cached[1]:
+                self.counters.chain_cache_hits += 1
+                return
+            self.counters.chain_cache_misses += 1
+
+        chain = [signer]
+        while chain[-1].fingerprint(hashes.SHA256()) not in trusted_by_fingerprint:
+            if len(chain) > MAX_CHAIN_LENGTH:
+                raise CmsSignatureError("The signing certificate is not issued by a certificate of the provider.")
+            chain.append(self._issuer_of(chain[-1], embedded + trusted))
+
+        for certificate in chain:
+            if not certificate.not_valid_before <= now <= certificate.not_valid_after:
+                raise CmsSignatureError(f"Certificate {certificate.subject.rfc4514_string()} is not valid now.")
+
+        valid_until = min(certificate.not_valid_after for certificate in chain)
+        with self._lock:
+            self._chains[cache_key] = (chain[-1].fingerprint(hashes.SHA256()), valid_until)
+
+    @staticmethod
+    def _issuer_of(certificate: x509.Certificate, candidates: List[x509.Certificate]) -> x509.Certificate:
+        for candidate in candidates:
+            if candidate.subject != certificate.issuer:
+                continue
+            try:
+                constraints = candidate.extensions.get_extension_for_class(x509.BasicConstraints).value
+            except x509.ExtensionNotFound:
+                continue
+            if not constraints.ca:
+                continue
+            try:
+                verify_signed_by(
+                    candidate.public_key(),
+                    certificate.signature,
+                    certificate.tbs_certificate_bytes,
+                    certificate.signature_hash_algorithm,  # type: ignore
+                )
+            except (InvalidSignature, UnsupportedAlgorithm):
+                continue
+            return candidate
+        raise CmsSignatureError("The signing certificate is not issued by a certificate of the provider.")
+
+    @staticmethod
+    def _check_signature(signer_info: cms.SignerInfo, signer: x509.Certificate, payload: bytes) -> None:
+        digest_algorithm = signer_info["digest_algorithm"]["algorithm"].native
+        if digest_algorithm not in DIGEST_ALGORITHMS:
+            raise CmsSignatureError(f"Digest algorithm {digest_algorithm} is not supported.")
+        hash_algorithm = DIGEST_ALGORITHMS[digest_algorithm]()
+
+        signed_attrs = signer_info["signed_attrs"]
+        if signed_attrs:
+            message_digests = [
+                attr["values"][0].native for attr in signed_attrs if attr["type"].native == "message_digest"
+            ]
+            digest = hashes.Hash(hash_algorithm)
+            digest.update(payload)
+            if message_digests != [digest.finalize()]:
+                raise CmsSignatureError("The signed digest is not the digest of the payload.")
+            # The signature is over the attributes as a SET OF, not with the implicit tag they have in the SignerInfo.
+            signed = b"\x31" + signed_attrs.dump()[1:]
+        else:
+            signed = payload
+
+        try:
+            verify_signed_by(signer.public_key(), signer_info["signature"].native, signed, hash_algorithm)
+        except InvalidSignature as err:
+            raise CmsSignatureError("The signature does not match the payload.") from err
+        except UnsupportedAlgorithm as err:
+            raise CmsSignatureError(str(err)) from err
+
+    def statistics(self) -> CmsVerificationStatistics:
+        certificate_cache = parse_certificate.cache_info()
+        counters = self.counters
+        return CmsVerificationStatistics(
+            enabled=self.enabled,
+            verified=counters.verified,
+            failed=counters.failed,
+            certificate_cache_hits=certificate_cache.hits,
+            certificate_cache_misses=certificate_cache.misses,
+            chain_cache_hits=counters.chain_cache_hits,
+            chain_cache_misses=counters.chain_cache_misses,
+            latency={provider: histogram.statistics() for provider, histogram in counters.latency.items()},
+        )
+
+
+cms_verifier = CmsVerifier(settings)
@@ -5,9 +5,9 @@
 # SPDX-License-Identifier: EUPL-1.2
 #
 import re
+from functools import lru_cache
 
 import mrz.generator._transliterations as dictionaries
-from mrz.base.functions import transliterate
 
 # Compile universal transliteration dictionary
 TRANSLITERATION = {
@@ -17,9 +17,24 @@ TRANSLITERATION = {
     **dictionaries.cyrillic(),
 }
 
+NOT_MRZ = re.compile(r"[^A-Z<]+")
 
+# The same as mrz.base.functions.transliterate with TRANSLITERATION, in one str.translate: words are separated by a
+# space or a hyphen and joined with "<", every character is replaced by its transliteration, then uppercased.
+# For characters in the dictionary the uppercased and filtered transliteration is known up front. Other characters
+# stay, uppercasing and filtering them is the second pass in normalize_name.
+TRANSLATION_TABLE = {
+    **{ord(char): NOT_MRZ.sub("", transliteration.upper()) for char, transliteration in TRANSLITERATION.items()},
+    ord(" "): "<",
+    ord("-"): "<",
+}
+
+# Names that were normalized before, shared by all requests of this worker. Names recur, for example the same holder
+# over several providers and requests.
+NORMALIZED_NAMES_CACHE_SIZE = 10000
+
+
+@lru_cache(maxsize=NORMALIZED_NAMES_CACHE_SIZE)
 def normalize_name(name):
-    encoded = transliterate(name, dictionary=TRANSLITERATION)
-    encoded = encoded.upper()
-    encoded = re.sub(r"[^A-Z<]+", "", encoded)
-    return encoded
+    # Uppercasing can expand a character, ß becomes SS, so it is done over the whole name.
+    return NOT_MRZ.sub("", name.translate(TRANSLATION_TABLE).upper())
@@ -0,0 +1,163 @@
+# Copyright (c) 2020-2021 De Staat der Nederlanden, Ministerie van Volksgezondheid, Welzijn en Sport.
+#
+# Licensed under the EUROPEAN UNION PUBLIC LICENCE v. 1.2
+#
+# SPDX-License-Identifier: EUPL-1.2
+#
+import time
+from base64 import b64encode
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+import redis
+import redis.asyncio
+
+from api import log
+from api.enrichment.rvig.rvig import PersonNotFound, get_pii_from_rvig
+from api.http_utils import hmac256
+from api.models import Holder, RvigCacheStatistics
+from api.session_store import create_async_redis
+from api.settings import AppSettings, RedisSettings, redis_settings, settings
+
+# Stored in redis for a bsn that RVIG does not know.
+NOT_FOUND = b""
+
+
+class RvigCacheCounters:  # pylint: disable=too-few-public-methods
+    def __init__(self) -> None:
+        self.hits = 0
+        self.redis_hits = 0
+        self.misses = 0
+        self.not_found_hits = 0
+        self.evictions = 0
+
+
+class RvigCache:
+    """
+    Remembers the answers of RVIG for a while, so a holder that retries does not cause another request to GBA-V.
+
+    Entries are kept in memory per worker, the least recently used entry is dropped when the cache is full.
+    Optionally redis is used as a second tier, shared by all workers. The bsn is never used as key, only an hmac
+    of it. A bsn that RVIG does not know is also remembered, for a shorter time.
+    """
+
+    def __init__(self, general_settings: AppSettings, backend_settings: RedisSettings):
+        self.settings = general_settings
+        self._key_prefix: bytes = general_settings.REDIS_KEY_PREFIX.encode() + b":rvig:"
+        self._redis: Optional[redis.asyncio.Redis] = (
+            create_async_redis(backend_settings, general_settings.REDIS_POOL_TIMEOUT_SECONDS)
+            if general_settings.RVIG_CACHE_REDIS_ENABLED
+            else None
+        )
+
+        # hashed bsn -> (expires at, holder or None when not found)
+        self._entries: "OrderedDict[bytes, Tuple[float, Optional[Holder]]]" = OrderedDict()
+
+        self.counters = RvigCacheCounters()
+
+    def _hash_key(self, bsn: str) -> bytes:
+        return b64encode(hmac256(bsn.encode(), self.settings.REDIS_HMAC_KEY))
+
+    async def get_pii(self, bsn: str) -> Holder:
+        """
+        Same as get_pii_from_rvig, but answered from the cache when possible.
+        """
+        if not self.settings.RVIG_CACHE_ENABLED:
+            return await get_pii_from_rvig(bsn)
+
+        key = self._hash_key(bsn)
+        found, holder = await self._get(key)
+        if not found:
+            self.counters.misses += 1
+            try:
+                holder = await get_pii_from_rvig(bsn)
+            except PersonNotFound:
+                await self._set(key, None)
+                raise
+            await self._set(key, holder)
+
+        if holder is None:
+            self.counters.not_found_hits += 1
+            raise PersonNotFound(500, detail="Error processing result from enrichment service.")
+
+        # A copy, so the caller can not change the cached holder
+        return holder.copy()
+
+    async def _get(self, key: bytes) -> Tuple[bool, Optional[Holder]]:
+        entry = self._entries.get(key)
+        if entry is not None:
+            expires_at, holder = entry
+            if expires_at > time.monotonic():
+                self._entries.move_to_end(key)
+                self.counters.hits += 1
+                return True, holder
+            del self._entries[key]
+
+        if self._redis is None:
+            return False, None
+
+        try:
+            # One round trip for both
+            pipe = self._redis.pipeline(transaction=False)
+            pipe.get(self._key_prefix + key)
+            pipe.ttl(self._key_prefix + key)
+            value, ttl = await pipe.execute()
+        except redis.exceptions.RedisError as err:
+            # The cache is an optimization, RVIG can still be asked.
+            log.exception(err)
+            return False, None
+
+        if value is None:
+            return False, None
+
+        self.counters.redis_hits += 1
+        holder = None if value == NOT_FOUND else Holder.parse_raw(value)
+        self._remember(key, holder, max(ttl, 1))
+        return True, holder
+
+    async def _set(self, key: bytes, holder: Optional[Holder]) -> None:
+        ttl = (
+            self.settings.RVIG_CACHE_TTL_SECONDS
+            if holder is not None
+            else self.settings.RVIG_CACHE_NOT_FOUND_TTL_SECONDS
+        )
+        self._remember(key, holder, ttl)
+
+        if self._redis is None:
+            return
+
+        try:
+            await self._redis.set(self._key_prefix + key, holder.json() if holder is not None else NOT_FOUND, ex=ttl)
+        except redis.exceptions.RedisError as err:
+            log.exception(err)
+
+    def _remember(self, key: bytes, holder: Optional[Holder], ttl: int) -> None:
+        self._entries[key] = (time.monotonic() + ttl, holder)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.settings.RVIG_CACHE_MAX_SIZE:
+            self._entries.popitem(last=False)
+            self.counters.evictions += 1
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    async def aclose(self) -> None:
+        if self._redis is not None:
+            await self._redis.close()
+            await self._redis.connection_pool.disconnect()
+
+    def statistics(self) -> RvigCacheStatistics:
+        counters = self.counters
+        return RvigCacheStatistics(
+            enabled=self.settings.RVIG_CACHE_ENABLED,
+            size=len(self._entries),
+            max_size=self.settings.RVIG_CACHE_MAX_SIZE,
+            hits=counters.hits,
+            redis_hits=counters.redis_hits,
+            misses=counters.misses,
+            not_found_hits=counters.not_found_hits,
+            evictions=counters.evictions,
+        )
+
+
+rvig_cache = RvigCache(settings, redis_settings)
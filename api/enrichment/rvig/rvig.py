@@ -6,14 +6,16 @@
 #
 from typing import List
 
+import httpx
 from fastapi import HTTPException
-from requests import RequestException, Session
-from requests.auth import HTTPBasicAuth
-from zeep import Client
-from zeep.transports import Transport
+from lxml import etree
+from zeep import AsyncClient, Settings
+from zeep.transports import AsyncTransport
 
 from api import log
 from api.constants import INGE4_ROOT
+from api.enrichment.rvig.vraag_response import VraagAntwoord, parse_vraag_response
+from api.http_utils import upstream_clients
 from api.models import Holder, ServiceHealth
 from api.settings import settings
 
@@ -29,6 +31,15 @@ RVIG_VOORNAAM = 10210
 RVIG_GESLACHTSNAAM = 10240
 RVIG_GEBOORTEDATUM = 10310
 
+# Resultaat code when there is no persoonslijst for the bsn: "Geen gegevens gevonden."
+RVIG_GEEN_GEGEVENS_GEVONDEN = 33
+
+
+class PersonNotFound(HTTPException):
+    """
+    RVIG does not know the bsn. This is handled like any other error of RVIG, but can be told apart for caching.
+    """
+
 
 """
 Example request:
@@ -106,14 +117,52 @@ Example response:
 """
 
 
+class PooledAsyncTransport(AsyncTransport):
+    """
+    Sends the SOAP requests over a kept-alive connection pool to RVIG, see http_utils.UpstreamClients.
+    The wsdl is read from disk, so the synchronous client of the AsyncTransport is not needed.
+    """
+
+    def __init__(self, timeout: httpx.Timeout, **client_options):  # pylint: disable=super-init-not-called
+        # AsyncTransport.__init__ would create its own clients, with options that are not available in this httpx.
+        self.cache = None
+        self.timeout = timeout
+        self.client_options = client_options
+
+    def _load_remote_data(self, url):
+        raise RuntimeError(f"The RVIG wsdl and its imports are read from disk, refusing to download {url}.")
+
+    async def post(self, address, message, headers):
+        log.debug(f"SOAP request to {address}.")
+        pool = upstream_clients.pool_for(address, **self.client_options)
+        return await pool.request("POST", address, timeout=self.timeout, content=message, headers=headers)
+
+    async def get(self, address, params, headers):
+        pool = upstream_clients.pool_for(address, **self.client_options)
+        response = await pool.request("GET", address, timeout=self.timeout, params=params, headers=headers)
+        return self.new_response(response)
+
+    async def aclose(self):
+        # The pool is closed with the other upstream pools.
+        ...
+
+
 def create_rvig_client():
-    session = Session()
-    session.verify = False
-    session.cert = settings.RVIG_CERT
-    session.auth = HTTPBasicAuth(username=settings.RVIG_USERNAME, password=settings.RVIG_PASSWORD)
-    transport = Transport(session=session)
+    # The certificate is read when the first request to RVIG is made
+    cert = settings.RVIG_CERT
+    if settings.RVIG_CONNECT_WITHOUT_CERT:
+        log.warning("Connecting to RVIG without a client certificate, RVIG_CONNECT_WITHOUT_CERT is set.")
+        cert = None
+
+    transport = PooledAsyncTransport(
+        timeout=httpx.Timeout(settings.RVIG_READ_TIMEOUT, connect=settings.HTTP_CONNECT_TIMEOUT),
+        verify=False,
+        cert=cert,
+        auth=httpx.BasicAuth(username=settings.RVIG_USERNAME, password=settings.RVIG_PASSWORD),
+    )
     wsdl = f"{INGE4_ROOT}/api/enrichment/rvig/{settings.RVIG_ENVIRONMENT}_LrdPlus1_1.wsdl"
-    _client = Client(wsdl=wsdl, transport=transport)
+    # zeep only builds the request, the response is read with the lighter parse_vraag_response.
+    _client = AsyncClient(wsdl=wsdl, transport=transport, settings=Settings(raw_response=True))
     _factory = _client.type_factory("ns0")
 
     return _client, _factory
@@ -123,9 +172,9 @@ def create_rvig_client():
 client, factory = create_rvig_client()
 
 
-def health() -> List[ServiceHealth]:
+async def health() -> List[ServiceHealth]:
     try:
-        get_pii_from_rvig(settings.RVIG_HEALTH_CHECK_BSN)
+        await get_pii_from_rvig(settings.RVIG_HEALTH_CHECK_BSN)
         return [ServiceHealth(service="rvig", is_healthy=True, message="Data request successful")]
     except Exception as err:  # pylint: disable=broad-except
         # There are too many exceptions that could happen here, so we're catching and logging everything.
@@ -134,7 +183,7 @@ def health() -> List[ServiceHealth]:
         return [ServiceHealth(service="rvig", is_healthy=False, message="Could not perform test call.")]
 
 
-def get_pii_from_rvig(bsn: str) -> Holder:
+async def get_pii_from_rvig(bsn: str) -> Holder:
     """
     WSDL Specificatie en mogelijke foutcodes: Zie bijlage C 7.3 van: Page 694
     https://www.rvig.nl/documenten/publicaties/2020/10/05/logisch-ontwerp-gba-versie-3.13a
@@ -164,17 +213,27 @@ def get_pii_from_rvig(bsn: str) -> Holder:
             parameters=[{"item": [{"zoekwaarde": bsn, "rubrieknummer": 10120}]}],
             masker=[{"item": [RVIG_VOORNAAM, RVIG_GESLACHTSNAAM, RVIG_GEBOORTEDATUM]}],
         )
-        antwoord = client.service.vraag(zoekvraag)
-        vraag_response = client.get_element("ns0:vraagResponse")(antwoord)
-
-        deal_with_error_codes(vraag_response)
-        return _to_holder(vraag_response)
-    except RequestException as err:
+        response = await client.service.vraag(zoekvraag)
+    except httpx.HTTPError as err:
         log.exception(err)
         raise HTTPException(500, detail="Could not connect to enrichment service.") from err
 
+    if response.status_code != 200:
+        # SOAP faults are sent with a 500 status, there is no answer to read in them.
+        log.error(f"RVIG responded with status {response.status_code}.")
+        raise HTTPException(500, detail="Error processing result from enrichment service.")
 
-def deal_with_error_codes(vraag_response) -> None:
+    try:
+        antwoord = parse_vraag_response(response.content)
+    except (etree.XMLSyntaxError, ValueError) as err:
+        log.exception(err)
+        raise HTTPException(500, detail="Error processing result from enrichment service.") from err
+
+    deal_with_error_codes(antwoord)
+    return _to_holder(antwoord)
+
+
+def deal_with_error_codes(antwoord: VraagAntwoord) -> None:
     """
     <resultaat>
         <code>0</code>
@@ -185,46 +244,28 @@ def deal_with_error_codes(vraag_response) -> None:
     """
 
     # No error. All good.
-    if vraag_response.vraagReturn.resultaat.code == 0:
+    if antwoord.resultaat.code == 0:
         return None
 
-    res = vraag_response.vraagReturn.resultaat
+    res = antwoord.resultaat
 
     error_message = (
         f"RVIG fout. Code: {res.code}, Letter: {res.letter}, "
         f"Omschrijving: {res.omschrijving}, Referentie: {res.referentie}"
     )
     log.error(error_message)
+    if res.code == RVIG_GEEN_GEGEVENS_GEVONDEN:
+        raise PersonNotFound(500, detail="Error processing result from enrichment service.")
     raise HTTPException(500, detail="Error processing result from enrichment service.")
 
 
-def _to_holder(vraag_response) -> Holder:
-    voornamen = ""
-    geslachtsnaam = ""
-    geboortedatum = ""
-    # infix = ""
-
+def _to_holder(antwoord: VraagAntwoord) -> Holder:
     # Note: there is no "only first name" option.
     # This is by design.
-    for persoonslijst in vraag_response.vraagReturn.persoonslijsten.item:
-        for categoriestapel in persoonslijst.categoriestapels.item:
-            for categorievoorkomen in categoriestapel.categorievoorkomens.item:
-                if categorievoorkomen.categorienummer != 1:
-                    continue
-                for element in categorievoorkomen.elementen.item:
-                    if element.nummer == 210:
-                        voornamen = element.waarde or voornamen
-                    # if element.nummer == 230:
-                    #     infix = element.waarde or infix
-                    if element.nummer == 240:
-                        geslachtsnaam = element.waarde or geslachtsnaam
-                    if element.nummer == 310:
-                        geboortedatum = element.waarde or geboortedatum
-
     return Holder(
-        firstName=voornamen,
-        lastName=geslachtsnaam,
-        birthDate=rvig_birtdate_to_dutch_birthdate(geboortedatum),
+        firstName=antwoord.voornamen,
+        lastName=antwoord.geslachtsnaam,
+        birthDate=rvig_birtdate_to_dutch_birthdate(antwoord.geboortedatum),
         infix=None,
     )
 
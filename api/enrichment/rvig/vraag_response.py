@@ -0,0 +1,93 @@
+# Copyright (c) 2020-2021 De Staat der Nederlanden, Ministerie van Volksgezondheid, Welzijn en Sport.
+#
+# Licensed under the EUROPEAN UNION PUBLIC LICENCE v. 1.2
+#
+# SPDX-License-Identifier: EUPL-1.2
+#
+from io import BytesIO
+from typing import Dict, List, NamedTuple, Optional
+
+from lxml import etree
+
+"""
+The vraagResponse of GBA-V holds a lot of structure for the three values that are asked for. Deserializing it with
+zeep builds an object for every item in the answer, validated against the wsdl. This parser streams over the
+response instead and only keeps what is used: the resultaat and elements 210, 240 and 310 of category 1.
+See rvig.py for an example response.
+"""
+
+# Element number -> field of the answer, of the elements in category 1 (persoon).
+CATEGORIE_PERSOON = 1
+PERSOON_ELEMENTEN = {210: "voornamen", 240: "geslachtsnaam", 310: "geboortedatum"}
+RESULTAAT_VELDEN = ("code", "letter", "omschrijving", "referentie")
+
+
+class Resultaat(NamedTuple):
+    code: Optional[int]
+    letter: str
+    omschrijving: str
+    referentie: str
+
+
+class VraagAntwoord(NamedTuple):
+    resultaat: Resultaat
+    voornamen: str
+    geslachtsnaam: str
+    geboortedatum: str
+
+
+def parse_vraag_response(content: bytes) -> VraagAntwoord:
+    """
+    Reads the answer from a SOAP vraagResponse. As with the person list itself, the last non-empty value of an element
+    wins when a category occurs more than once. A missing resultaat leaves the code at None, which is not a success.
+
+    :raises etree.XMLSyntaxError: when the content is not xml
+    :raises ValueError: when a number in the response is not a number
+    """
+    persoon: Dict[str, str] = {veld: "" for veld in PERSOON_ELEMENTEN.values()}
+    resultaat: Dict[str, str] = {}
+    path: List[str] = []
+    categorienummer: Optional[int] = None
+    nummer: Optional[int] = None
+    waarde: Optional[str] = None
+
+    # The response comes from a trusted service, but there is no reason to follow entities or go on the network.
+    parser = etree.iterparse(BytesIO(content), events=("start", "end"), resolve_entities=False, no_network=True)
+    for event, element in parser:
+        # Namespaces differ between the outer (LRDPlus) and inner (LO3) elements, they are not needed to find things.
+        name = etree.QName(element).localname
+        if event == "start":
+            path.append(name)
+            continue
+
+        path.pop()
+        parent = path[-1] if path else ""
+        if name == "categorienummer":
+            categorienummer = int(element.text)
+        elif name == "nummer":
+            nummer = int(element.text)
+        elif name == "waarde":
+            waarde = element.text
+        elif name == "item" and parent == "elementen":
+            if categorienummer == CATEGORIE_PERSOON and nummer in PERSOON_ELEMENTEN:
+                veld = PERSOON_ELEMENTEN[nummer]
+                persoon[veld] = waarde or persoon[veld]
+            nummer, waarde = None, None
+        elif name == "item" and parent == "categorievoorkomens":
+            categorienummer = None
+        elif parent == "resultaat" and name in RESULTAAT_VELDEN:
+            resultaat[name] = element.text or ""
+
+        # Everything that is needed is read, don't build the tree.
+        element.clear()
+
+    code = resultaat.get("code")
+    return VraagAntwoord(
+        resultaat=Resultaat(
+            code=int(code) if code else None,
+            letter=resultaat.get("letter", ""),
+            omschrijving=resultaat.get("omschrijving", ""),
+            referentie=resultaat.get("referentie", ""),
+        ),
+        **persoon,
+    )
@@ -4,22 +4,142 @@
 #
 # SPDX-License-Identifier: EUPL-1.2
 #
+import asyncio
 import json
 from datetime import date, datetime
-from typing import Tuple, Union
+from typing import Any, Dict, List, Optional, Tuple, Union
 from uuid import UUID
 
-import requests
+import httpx
 from cryptography.hazmat.primitives import hashes, hmac
-from requests.adapters import HTTPAdapter
-from urllib3 import Retry
 
 from api import log
-from api.settings import settings
+from api.models import HttpPoolStatistics
+from api.settings import AppSettings, settings
 
 iso_formattable = (date, datetime)
 str_formattable = (UUID,)
 
+# Equal to the urllib3 Retry defaults, only these methods are retried on read errors and status codes.
+RETRY_ALLOWED_METHODS = frozenset(["HEAD", "GET", "PUT", "DELETE", "OPTIONS", "TRACE"])
+RETRY_BACKOFF_MAX = 120
+
+# httpcore trace events that mean a new connection had to be set up instead of reusing a kept-alive one
+NEW_CONNECTION_TRACE_EVENTS = frozenset(["connection.connect_tcp.complete", "connection.connect_unix_socket.complete"])
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+
+class UpstreamPoolCounters:  # pylint: disable=too-few-public-methods
+    def __init__(self) -> None:
+        self.requests = 0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.new_connections = 0
+
+
+class UpstreamPool:
+    """
+    A long-lived client for a single upstream, so connections (and their TLS sessions) are reused between
+    requests. Keeps counters of how busy the pool is and how often an existing connection could be used.
+    """
+
+    def __init__(self, origin: str, app_settings: AppSettings, **client_options):
+        self.origin = origin
+        self.settings = app_settings
+        # Overrides the default options of the client, for example the certificates for an upstream.
+        self.client_options = client_options
+        self.client: Optional[httpx.AsyncClient] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+        self.counters = UpstreamPoolCounters()
+
+    def get_client(self) -> httpx.AsyncClient:
+        # Connections belong to the event loop they were opened on. There is one loop per worker, but the
+        # test suite starts a new loop per test, in which case the connections of the old loop are abandoned.
+        loop = asyncio.get_running_loop()
+        if self.client is None or self._loop is not loop:
+            log.debug(f"Creating connection pool for {self.origin}, http2: {self.settings.HTTP_HTTP2_ENABLED}")
+            # Possibly needed: check client side certs
+            # https://www.python-httpx.org/advanced/#client-side-certificates
+            options = {
+                "verify": self.settings.SIGNER_CA_CERT_FILE,
+                "http2": self.settings.HTTP_HTTP2_ENABLED,
+                "limits": httpx.Limits(
+                    max_connections=self.settings.HTTP_POOL_MAX_CONNECTIONS,
+                    max_keepalive_connections=self.settings.HTTP_POOL_MAX_KEEPALIVE_CONNECTIONS,
+                    keepalive_expiry=self.settings.HTTP_POOL_KEEPALIVE_EXPIRY,
+                ),
+                **self.client_options,
+            }
+            self.client = httpx.AsyncClient(**options)
+            self._loop = loop
+        return self.client
+
+    async def request(self, method: str, url, timeout: httpx.Timeout, **kwargs) -> httpx.Response:
+        client = self.get_client()
+        counters = self.counters
+        counters.requests += 1
+        counters.in_flight += 1
+        counters.peak_in_flight = max(counters.peak_in_flight, counters.in_flight)
+        try:
+            return await client.request(method, url, timeout=timeout, extensions={"trace": self._trace}, **kwargs)
+        finally:
+            counters.in_flight -= 1
+
+    async def _trace(self, event_name: str, _info: Dict[str, Any]) -> None:
+        if event_name in NEW_CONNECTION_TRACE_EVENTS:
+            self.counters.new_connections += 1
+
+    async def aclose(self) -> None:
+        if self.client is not None and self._loop is asyncio.get_running_loop():
+            await self.client.aclose()
+        self.client = None
+        self._loop = None
+
+    def statistics(self) -> HttpPoolStatistics:
+        counters = self.counters
+        reused = counters.requests - min(counters.new_connections, counters.requests)
+        return HttpPoolStatistics(
+            upstream=self.origin,
+            max_connections=self.settings.HTTP_POOL_MAX_CONNECTIONS,
+            in_flight=counters.in_flight,
+            peak_in_flight=counters.peak_in_flight,
+            requests=counters.requests,
+            new_connections=counters.new_connections,
+            reuse_rate=reused / counters.requests if counters.requests else 0,
+        )
+
+
+class UpstreamClients:
+    """
+    Hands out one pool per upstream (scheme, host and port), so a slow signer can not use up the connections
+    that are needed for another upstream.
+    """
+
+    def __init__(self, app_settings: AppSettings):
+        self.settings = app_settings
+        self.pools: Dict[str, UpstreamPool] = {}
+
+    def pool_for(self, url, **client_options) -> UpstreamPool:
+        """
+        :param client_options: options of httpx.AsyncClient for this upstream, used when the pool is created.
+        """
+        parsed = httpx.URL(url)
+        origin = f"{parsed.scheme}://{parsed.host}:{parsed.port or DEFAULT_PORTS.get(parsed.scheme)}"
+        if origin not in self.pools:
+            self.pools[origin] = UpstreamPool(origin, self.settings, **client_options)
+        return self.pools[origin]
+
+    async def aclose(self) -> None:
+        for pool in self.pools.values():
+            await pool.aclose()
+
+    def statistics(self) -> List[HttpPoolStatistics]:
+        return [pool.statistics() for pool in self.pools.values()]
+
+
+upstream_clients = UpstreamClients(settings)
+
 
 def defaultconverter(something):
     if isinstance(something, iso_formattable):
@@ -32,34 +152,49 @@ def defaultconverter(something):
     raise TypeError(f"Object of type {something.__class__.__name__} is not JSON serializable")
 
 
-def request_post_with_retries(
+async def request_post_with_retries(
     url,
     data,
     exponential_retries: int = settings.HTTP_EXPONENTIAL_RETRIES,
     timeout: Union[float, Tuple[float, float]] = (settings.HTTP_CONNECT_TIMEOUT, settings.HTTP_READ_TIMEOUT),
     retry_on_these_status_codes: Tuple[int, ...] = settings.HTTP_RETRY_STATUS_CODES,
     **kwargs,
-) -> requests.Response:
-    return request_request_with_retries(
+) -> httpx.Response:
+    return await request_request_with_retries(
         "POST", url, data, exponential_retries, timeout, retry_on_these_status_codes, **kwargs
     )
 
 
-def request_get_with_retries(
+async def request_get_with_retries(
     url,
     data,
     exponential_retries: int = settings.HTTP_EXPONENTIAL_RETRIES,
     timeout: Union[float, Tuple[float, float]] = (settings.HTTP_CONNECT_TIMEOUT, settings.HTTP_READ_TIMEOUT),
     retry_on_these_status_codes: Tuple[int, ...] = settings.HTTP_RETRY_STATUS_CODES,
     **kwargs,
-) -> requests.Response:
-    return request_request_with_retries(
+) -> httpx.Response:
+    return await request_request_with_retries(
         "GET", url, data, exponential_retries, timeout, retry_on_these_status_codes, **kwargs
     )
 
 
+def _to_httpx_timeout(timeout: Union[float, Tuple[float, float]]) -> httpx.Timeout:
+    # requests accepts a single timeout or a (connect, read) tuple, httpx wants to know them separately.
+    if isinstance(timeout, tuple):
+        connect_timeout, read_timeout = timeout
+        return httpx.Timeout(read_timeout, connect=connect_timeout)
+    return httpx.Timeout(timeout)
+
+
+def _backoff_time(consecutive_errors: int, backoff_factor: float) -> float:
+    # Same as urllib3.Retry.get_backoff_time: no sleep on the first retry, then exponentially longer.
+    if consecutive_errors <= 1:
+        return 0.0
+    return float(min(RETRY_BACKOFF_MAX, backoff_factor * (2 ** (consecutive_errors - 1))))
+
+
 # pylint: disable=R0913
-def request_request_with_retries(
+async def request_request_with_retries(
     method: str,
     url,
     data=None,
@@ -68,39 +203,49 @@ def request_request_with_retries(
     retry_on_these_status_codes: Tuple[int, ...] = settings.HTTP_RETRY_STATUS_CODES,
     backoff_factor: float = settings.HTTP_RETRY_BACKOFF_TIME,
     **kwargs,
-) -> requests.Response:
+) -> httpx.Response:
+    """
+    Performs the request on the event loop, so waiting for a signer does not block other requests on this worker.
+    The request is sent over the kept-alive connection pool of the upstream, see UpstreamClients.
+
+    Retries follow the semantics of the urllib3 Retry that was used with the requests library: connection errors
+    are retried for every method, read errors and the given status codes only for idempotent methods (so not
+    for POST). After the last retry the last response is returned, this function will not do a "raise for status".
+    """
     # better to many arguments then code duplication
 
     # because default argument should not be mutable, these are the defaults:
     if retry_on_these_status_codes is None:
         retry_on_these_status_codes = (429, 500, 502, 503, 504)
 
-    session = requests.Session()
-    # https://docs.python-requests.org/en/master/user/advanced/#ssl-cert-verification
     log.debug(
         f"Requesting {method} to {url} with verification: {settings.SIGNER_CA_CERT_FILE} and backoff {backoff_factor}"
     )
-    session.verify = settings.SIGNER_CA_CERT_FILE
-    retries = Retry(
-        total=exponential_retries, backoff_factor=backoff_factor, status_forcelist=retry_on_these_status_codes
-    )
+    is_idempotent = method.upper() in RETRY_ALLOWED_METHODS
+    content = json.dumps(data, default=defaultconverter) if data else None
+    pool = upstream_clients.pool_for(url)
+    httpx_timeout = _to_httpx_timeout(timeout)
 
-    # Possibly needed: check client side certs
-    # https://docs.python-requests.org/en/master/user/advanced/#client-side-certificates
-
-    session.mount("https://", HTTPAdapter(max_retries=retries))
-    session.mount("http://", HTTPAdapter(max_retries=retries))
-
-    response = session.request(
-        method,
-        url,
-        data=json.dumps(data, default=defaultconverter) if data else None,
-        timeout=timeout,
-        **kwargs,
-    )
+    attempt = 0
+    while True:
+        try:
+            response = await pool.request(method, url, timeout=httpx_timeout, content=content, **kwargs)
+            if not is_idempotent or response.status_code not in retry_on_these_status_codes:
+                return response
+            if attempt >= exponential_retries:
+                return response
+            log.debug(f"Received {response.status_code} from {url}, retrying.")
+        except (httpx.ConnectError, httpx.ConnectTimeout) as err:
+            if attempt >= exponential_retries:
+                raise
+            log.debug(f"Could not connect to {url}: {repr(err)}, retrying.")
+        except (httpx.ReadError, httpx.ReadTimeout) as err:
+            if not is_idempotent or attempt >= exponential_retries:
+                raise
+            log.debug(f"Could not read from {url}: {repr(err)}, retrying.")
 
-    # will not do a "raise for status"
-    return response
+        attempt += 1
+        await asyncio.sleep(_backoff_time(attempt, backoff_factor))
 
 
 def hmac256(message: bytes, key: bytes) -> bytes:
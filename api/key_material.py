@@ -0,0 +1,127 @@
+# Copyright (c) 2020-2021 De Staat der Nederlanden, Ministerie van Volksgezondheid, Welzijn en Sport.
+#
+# Licensed under the EUROPEAN UNION PUBLIC LICENCE v. 1.2
+#
+# SPDX-License-Identifier: EUPL-1.2
+#
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+
+import jwt
+from cryptography.hazmat.primitives.asymmetric import ec, ed448, ed25519, rsa
+from cryptography.hazmat.primitives.serialization import load_pem_private_key, load_pem_public_key
+from cryptography.x509 import load_pem_x509_certificate
+
+from api import log
+from api.settings import AppSettings, settings
+
+# The jwt algorithms the access tokens for event data providers can be signed with: setting of the key file, key type
+IDENTITY_HASH_JWT_ALGORITHMS: Dict[str, Tuple[str, Tuple[type, ...]]] = {
+    "RS256": ("DYNAMIC_FLOW_JWT_PRIVATE_KEY_FILENAME", (rsa.RSAPrivateKey,)),
+    "ES256": ("DYNAMIC_FLOW_JWT_ES256_PRIVATE_KEY_FILENAME", (ec.EllipticCurvePrivateKey,)),
+    "EdDSA": ("DYNAMIC_FLOW_JWT_EDDSA_PRIVATE_KEY_FILENAME", (ed25519.Ed25519PrivateKey, ed448.Ed448PrivateKey)),
+}
+
+
+def load_private_key(data: bytes) -> Any:
+    return load_pem_private_key(data, password=None)
+
+
+def load_public_key(data: bytes) -> Any:
+    # Both a bare public key and a certificate are used for the public keys of jwt's.
+    if b"-----BEGIN CERTIFICATE-----" in data:
+        return load_pem_x509_certificate(data).public_key()
+    return load_pem_public_key(data)
+
+
+class KeyMaterial:  # pylint: disable=too-many-instance-attributes,too-few-public-methods
+    """
+    A key read from a pem file, kept as a cryptography key object. Handing PyJWT the pem string makes it parse the
+    key for every token, a key object is used as is.
+
+    When the file changes on disk the key is loaded again, so keys can be rotated without a restart. Changes are
+    looked for at most once every KEY_MATERIAL_RELOAD_INTERVAL_SECONDS. A file that can not be loaded is logged and
+    the previous key stays in use, only the first load has to succeed.
+    """
+
+    def __init__(self, path: Union[str, Path], loader: Callable[[bytes], Any], reload_interval: Optional[float] = None):
+        self.path = str(path)
+        self._loader = loader
+        self._reload_interval = (
+            settings.KEY_MATERIAL_RELOAD_INTERVAL_SECONDS if reload_interval is None else reload_interval
+        )
+        # Signing happens in threads as well, see EventDataProviders.
+        self._lock = threading.Lock()
+
+        self.reloads = 0
+        self._checked_at = time.monotonic()
+        self._file_state = self._stat()
+        self._key = self._load()
+
+    def _stat(self) -> Tuple[int, int, int]:
+        stat = os.stat(self.path)
+        return stat.st_mtime_ns, stat.st_size, stat.st_ino
+
+    def _load(self) -> Any:
+        with open(self.path, "rb") as file:
+            return self._loader(file.read())
+
+    @property
+    def key(self) -> Any:
+        if time.monotonic() - self._checked_at >= self._reload_interval:
+            self._reload_if_changed()
+        return self._key
+
+    def _reload_if_changed(self) -> None:
+        with self._lock:
+            self._checked_at = time.monotonic()
+            try:
+                file_state = self._stat()
+                if file_state == self._file_state:
+                    return
+                self._key = self._load()
+                self._file_state = file_state
+                self.reloads += 1
+                log.info(f"Reloaded key from {self.path}.")
+            except (OSError, ValueError, TypeError) as err:
+                # A rotation can be caught halfway, the file will be looked at again after the interval.
+                log.error(f"Could not reload key from {self.path}, keeping the previous key: {repr(err)}")
+
+
+def encode_jwt(payload: Dict[str, Any], key: KeyMaterial, algorithm: str = "RS256") -> str:
+    return jwt.encode(payload, key.key, algorithm=algorithm)
+
+
+def decode_jwt(token: str, key: KeyMaterial, algorithms: List[str], **kwargs) -> Dict[str, Any]:
+    """
+    Same as jwt.decode, with the already loaded key. Raises jwt.InvalidTokenError as jwt.decode does.
+    """
+    return jwt.decode(token, key=key.key, algorithms=algorithms, **kwargs)
+
+
+def load_identity_hash_jwt_private_keys(app_settings: AppSettings) -> Dict[str, KeyMaterial]:
+    """
+    The keys that sign the access tokens for the event data providers, per jwt algorithm. Algorithms without a key
+    file are left out, RS256 is always there.
+
+    :raises ValueError: when a key does not fit its algorithm
+    """
+    keys = {}
+    for algorithm, (filename_setting, key_types) in IDENTITY_HASH_JWT_ALGORITHMS.items():
+        filename = getattr(app_settings, filename_setting)
+        if not filename and algorithm != "RS256":
+            continue
+        keys[algorithm] = KeyMaterial(f"{app_settings.SECRETS_FOLDER}/{filename}", load_private_key)
+        if not isinstance(keys[algorithm].key, key_types):
+            raise ValueError(f"{filename_setting} does not contain a key for {algorithm}.")
+    return keys
+
+
+# Sign the access tokens for the event data providers
+identity_hash_jwt_private_keys = load_identity_hash_jwt_private_keys(settings)
+identity_hash_jwt_private_key = identity_hash_jwt_private_keys["RS256"]
+# Verifies the tokens that the app gets from inge6
+inge6_jwt_public_key = KeyMaterial(f"{settings.SECRETS_FOLDER}/{settings.INGE6_JWT_PUBLIC_CRT_FILE}", load_public_key)
@@ -0,0 +1,50 @@
+# Copyright (c) 2020-2021 De Staat der Nederlanden, Ministerie van Volksgezondheid, Welzijn en Sport.
+#
+# Licensed under the EUROPEAN UNION PUBLIC LICENCE v. 1.2
+#
+# SPDX-License-Identifier: EUPL-1.2
+#
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Iterator, List, Sequence
+
+from api.models import LatencyStatistics
+
+# Upper bounds in milliseconds, a local redis answers in well under a millisecond, a busy one in tens.
+DEFAULT_LATENCY_BUCKETS_MS = (0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000)
+
+
+class LatencyHistogram:
+    """
+    Counts how long calls take, in buckets like a prometheus histogram. Failed calls are counted as well.
+    """
+
+    def __init__(self, buckets_ms: Sequence[float] = DEFAULT_LATENCY_BUCKETS_MS):
+        self._buckets_ms = tuple(sorted(buckets_ms))
+        # The last count is for calls that took longer than the largest bucket
+        self._counts: List[int] = [0] * (len(self._buckets_ms) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+
+    def observe(self, duration_ms: float) -> None:
+        self._counts[bisect_left(self._buckets_ms, duration_ms)] += 1
+        self.count += 1
+        self.total_ms += duration_ms
+
+    @contextmanager
+    def time(self) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe((time.perf_counter() - started) * 1000)
+
+    def statistics(self) -> LatencyStatistics:
+        buckets, cumulative = {}, 0
+        for bound, count in zip([*map(str, self._buckets_ms), "+Inf"], self._counts):
+            cumulative += count
+            buckets[bound] = cumulative
+        return LatencyStatistics(
+            count=self.count, mean_ms=self.total_ms / self.count if self.count else 0.0, buckets=buckets
+        )
@@ -12,18 +12,18 @@ import json
 import re
 from datetime import date, datetime, timedelta
 from enum import Enum
-from typing import List, Optional, Set, Union
+from typing import Dict, List, Optional, Set, Union
 from uuid import UUID
 
 import pycountry
 import pytz
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, PrivateAttr, validator
 
 from api import log, uci_log
 from api.attribute_allowlist import domestic_signer_attribute_allow_list
 from api.enrichment.name_normalizer import normalize_name
 from api.settings import settings
-from api.uci import generate_uci_01
+from api.uci import uci_pool
 
 TZ = pytz.timezone("UTC")
 
@@ -222,6 +222,11 @@ class Holder(BaseModel):
 
     infix: Optional[str] = Field(description="Infix received via app", example="van den")
 
+    # Initials and normalized names are read many times, for example once per strip. They are kept by the name they are
+    # made from, so a changed name is noticed.
+    _initials: Dict[str, str] = PrivateAttr(default_factory=dict)
+    _eu_normalized: Dict[str, str] = PrivateAttr(default_factory=dict)
+
     @classmethod
     def _name_initial(cls, name, default=""):
         """
@@ -244,23 +249,33 @@ class Holder(BaseModel):
             return match.group(2).upper()
         return default
 
+    def _cached_name_initial(self, name):
+        if name not in self._initials:
+            self._initials[name] = self._name_initial(name, default="")
+        return self._initials[name]
+
     @property
     def first_name_initial(self):
         """See documentation of `_name_initial`"""
-        return self._name_initial(self.firstName, default="")
+        return self._cached_name_initial(self.firstName)
 
     @property
     def last_name_initial(self):
         """See dcomentation of `_name_initial`"""
-        return self._name_initial(self.lastName, default="")
+        return self._cached_name_initial(self.lastName)
 
     @staticmethod
     def _eu_normalize(value):
         return normalize_name(value)
 
+    def _cached_eu_normalize(self, name):
+        if name not in self._eu_normalized:
+            self._eu_normalized[name] = Holder._eu_normalize(name)
+        return self._eu_normalized[name]
+
     @property
     def first_name_eu_normalized(self):
-        return Holder._eu_normalize(self.firstName)
+        return self._cached_eu_normalize(self.firstName)
 
     @property
     def last_name_with_infix(self):
@@ -271,7 +286,7 @@ class Holder(BaseModel):
 
     @property
     def last_name_eu_normalized(self):
-        return Holder._eu_normalize(self.last_name_with_infix)
+        return self._cached_eu_normalize(self.last_name_with_infix)
 
     def equal_to(self, other):
         return (
@@ -460,7 +475,7 @@ class Event(DataProviderEvent):
         if not self.unique:
             log.error("Event has no unique, currently we'll let this pass but a unique is mandatory for the EU!")
 
-        uci = generate_uci_01()
+        uci = uci_pool.take()
         uci_log.info(json.dumps({"uci": uci, "provider": self.source_provider_identifier, "unique": self.unique}))
         return uci
 
@@ -497,52 +512,98 @@ class Event(DataProviderEvent):
         return self._get_date_attribute(recovery_attr="validFrom")
 
 
+class DecodedDataProviderEventsResult(DataProviderEventsResult):
+    """
+    A DataProviderEventsResult of which the events are validated straight into Event, with the holder and provider
+    of the result. Used when decoding the CMS payloads, so every event is validated once.
+    """
+
+    events: List[Event]  # type: ignore
+
+    @validator("events", pre=True)
+    def events_of_holder(cls, events, values):  # pylint: disable=no-self-argument
+        # The holder and provider identifier are validated before the events, see the order of the fields.
+        if "holder" not in values or "providerIdentifier" not in values:
+            # The result is rejected for its holder or provider, the events would only add errors about a holder.
+            return []
+        if not isinstance(events, list):
+            return events
+        of_holder = {"holder": values["holder"], "source_provider_identifier": values["providerIdentifier"]}
+        # dict() of a model keeps the validated fields as they are, such as the events of an upgraded V2Event.
+        return [
+            {**dict(event), **of_holder} if isinstance(event, (dict, DataProviderEvent)) else event for event in events
+        ]
+
+
 class Events(BaseModel):
     events: List[Event] = Field(default=[])
 
+    # The events per type, sorted once and reused until the events list is replaced or grows or shrinks.
+    # Changing the date of an event in place, or replacing an item of the list, is not noticed: assign a new list.
+    _indexed_events: Optional[List[Event]] = PrivateAttr(default=None)
+    _indexed_length: int = PrivateAttr(default=0)
+    _index: Dict[str, List[Event]] = PrivateAttr(default_factory=dict)
+    _type_set: Set[EventType] = PrivateAttr(default_factory=set)
+
+    def _events_index(self) -> Dict[str, List[Event]]:
+        if self._indexed_events is self.events and self._indexed_length == len(self.events):
+            return self._index
+
+        self._index = {
+            "vaccinations": sorted(
+                [event for event in self.events if isinstance(event.vaccination, Vaccination)],
+                key=lambda e: e.vaccination.date,  # type: ignore
+            ),
+            "positivetests": sorted(
+                [event for event in self.events if isinstance(event.positivetest, Positivetest)],
+                key=lambda e: e.positivetest.sampleDate,  # type: ignore
+            ),
+            "negativetests": sorted(
+                [event for event in self.events if isinstance(event.negativetest, Negativetest)],
+                key=lambda e: e.negativetest.sampleDate,  # type: ignore
+            ),
+            "recoveries": sorted(
+                [event for event in self.events if isinstance(event.recovery, Recovery)],
+                key=lambda e: e.recovery.sampleDate,  # type: ignore
+            ),
+        }
+        self._type_set = {event.type for event in self.events}
+        self._indexed_events = self.events
+        self._indexed_length = len(self.events)
+        return self._index
+
     @property
     def vaccinations(self) -> List[Event]:
         """
-        :return: sorted list of events that have vaccination data. Sorted by data.date.
+        :return: sorted list of events that have vaccination data. Sorted by data.date. Do not change this list.
         """
-        events = [event for event in self.events if isinstance(event.vaccination, Vaccination)]
-
-        events = sorted(events, key=lambda e: e.vaccination.date)  # type: ignore
-        return events
+        return self._events_index()["vaccinations"]
 
     @property
     def positivetests(self) -> List[Event]:
         """
-        :return: sorted list of events that have test data. Sorted by data.sampleDate.
+        :return: sorted list of events that have test data. Sorted by data.sampleDate. Do not change this list.
         """
-
-        events = [event for event in self.events if isinstance(event.positivetest, Positivetest)]
-        events = sorted(events, key=lambda e: e.positivetest.sampleDate)  # type: ignore
-        return events
+        return self._events_index()["positivetests"]
 
     @property
     def negativetests(self) -> List[Event]:
         """
-        :return: sorted list of events that have test data. Sorted by data.sampleDate.
+        :return: sorted list of events that have test data. Sorted by data.sampleDate. Do not change this list.
         """
-
-        events = [event for event in self.events if isinstance(event.negativetest, Negativetest)]
-        events = sorted(events, key=lambda e: e.negativetest.sampleDate)  # type: ignore
-        return events
+        return self._events_index()["negativetests"]
 
     @property
     def recoveries(self) -> List[Event]:
         """
-        :return: sorted list of events that have recovery data. Sorted by data.sampleDate.
+        :return: sorted list of events that have recovery data. Sorted by data.sampleDate. Do not change this list.
         """
-
-        events = [event for event in self.events if isinstance(event.recovery, Recovery)]
-        events = sorted(events, key=lambda e: e.recovery.sampleDate)  # type: ignore
-        return events
+        return self._events_index()["recoveries"]
 
     @property
     def type_set(self) -> Set[EventType]:
-        return {event.type for event in self.events}
+        self._events_index()
+        return self._type_set
 
     # todo: move code down so EuropeanOnlineSigningRequest is known and method can be typed.
     def toEuropeanOnlineSigningRequest(self):
@@ -1049,6 +1110,91 @@ class ApplicationHealth(BaseModel):  # noqa
     service_status: List[ServiceHealth]
 
 
+class HttpPoolStatistics(BaseModel):  # noqa
+    upstream: str = Field(description="Scheme, host and port of the upstream.", example="https://signer.local:443")
+    max_connections: int
+    in_flight: int = Field(description="Requests currently waiting for this upstream.")
+    peak_in_flight: int
+    requests: int
+    new_connections: int = Field(description="Connections that had to be opened (TCP and TLS handshake).")
+    reuse_rate: float = Field(description="Fraction of requests that were sent over a kept-alive connection.")
+
+
+class RvigCacheStatistics(BaseModel):  # noqa
+    enabled: bool
+    size: int = Field(description="Entries in the memory of this worker.")
+    max_size: int
+    hits: int = Field(description="Answered from the memory of this worker.")
+    redis_hits: int = Field(description="Answered from redis, shared by all workers.")
+    misses: int = Field(description="Requests to RVIG.")
+    not_found_hits: int = Field(description="Answered from the cache with an unknown bsn.")
+    evictions: int
+
+
+class PrepareIssuePoolStatistics(BaseModel):  # noqa
+    enabled: bool
+    size: int = Field(description="Fresh messages in the pool of this worker.")
+    low_watermark: int
+    high_watermark: int
+    hits: int = Field(description="Messages handed out from the pool.")
+    misses: int = Field(description="Messages that had to be fetched while the app waited.")
+    fetched: int = Field(description="Messages fetched in the background.")
+    expired: int
+    refill_errors: int
+
+
+class LatencyStatistics(BaseModel):  # noqa
+    count: int
+    mean_ms: float
+    buckets: Dict[str, int] = Field(
+        description="Calls that took at most this many milliseconds, cumulative like a prometheus histogram.",
+        example={"0.5": 10, "1": 12, "+Inf": 12},
+    )
+
+
+class SessionStoreStatistics(BaseModel):  # noqa
+    backend: str = Field(example="redis")
+    max_connections: Optional[int] = Field(description="Of the connection pool to redis.")
+    latency: Dict[str, LatencyStatistics] = Field(description="Per operation on the session store.")
+
+
+class CmsVerificationStatistics(BaseModel):  # noqa
+    enabled: bool
+    verified: int = Field(description="Payloads with a valid signature.")
+    failed: int = Field(description="Payloads of which the signature was rejected.")
+    certificate_cache_hits: int = Field(description="Certificates in signatures that were parsed before.")
+    certificate_cache_misses: int
+    chain_cache_hits: int = Field(description="Signing certificates that were checked before.")
+    chain_cache_misses: int
+    latency: Dict[str, LatencyStatistics] = Field(description="Per event data provider.")
+
+
+class UciPoolStatistics(BaseModel):  # noqa
+    enabled: bool
+    size: int = Field(description="UCI's in the pool of this worker.")
+    low_watermark: int
+    high_watermark: int
+    hits: int = Field(description="UCI's issued from the pool.")
+    misses: int = Field(description="UCI's generated while a request waited.")
+    generated: int = Field(description="UCI's generated in the background.")
+    refills: int
+    refill_rate: float = Field(description="UCI's per second while generating in the background.")
+
+
+class ApplicationStatistics(BaseModel):  # noqa
+    """
+    Counters that help to see how the service and its connections to other services perform. These are counters
+    since the start of this worker process.
+    """
+
+    http_pools: List[HttpPoolStatistics]
+    rvig_cache: RvigCacheStatistics
+    session_store: SessionStoreStatistics
+    prepare_issue_pool: PrepareIssuePoolStatistics
+    cms_verification: CmsVerificationStatistics
+    uci_pool: UciPoolStatistics
+
+
 class UciTestInfo(BaseModel):
     uci_written_to_logfile: str = Field(description="UCI written to logfile")
     event: Event
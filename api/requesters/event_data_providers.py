@@ -0,0 +1,91 @@
+# Copyright (c) 2020-2021 De Staat der Nederlanden, Ministerie van Volksgezondheid, Welzijn en Sport.
+#
+# Licensed under the EUROPEAN UNION PUBLIC LICENCE v. 1.2
+#
+# SPDX-License-Identifier: EUPL-1.2
+#
+import base64
+import hashlib
+import hmac
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+from nacl.public import Box, PrivateKey, PublicKey
+
+from api.key_material import KeyMaterial, encode_jwt, identity_hash_jwt_private_keys
+from api.settings import AppSettings, settings
+
+
+class EventDataProvider:  # pylint: disable=too-few-public-methods
+    """
+    An event data provider from vaccinationproviders.json5, with its keys decoded once instead of on every request
+    for access tokens.
+    """
+
+    def __init__(self, config: Dict[str, Any]):
+        self.identifier: str = config["identifier"]
+        self.unomi_url: str = config["unomi_url"]
+        self.event_url: str = config["event_url"]
+        # Providers move from RS256 to a faster algorithm one at a time
+        self.jwt_algorithm: str = config.get("jwt_algorithm", "RS256")
+
+        # The hmac state after the key is mixed in. Copying it is cheaper than starting over from the secret.
+        self._identity_hash_hmac = hmac.new(config["identity_hash_secret"].encode(), digestmod=hashlib.sha256)
+
+        private_key = PrivateKey(base64.b64decode(config["bsn_cryptography"]["private_key"].encode("UTF-8")))
+        public_key = PublicKey(base64.b64decode(config["bsn_cryptography"]["public_key"].encode("UTF-8")))
+        # Box precomputes the shared key of the two, encrypting with it is cheap.
+        self.box = Box(private_key, public_key)
+
+    def identity_hash(self, message: bytes) -> str:
+        """
+        Same as calculate_identity_hash with the identity_hash_secret of this provider.
+        """
+        _hmac = self._identity_hash_hmac.copy()
+        _hmac.update(message)
+        return _hmac.hexdigest()
+
+
+class EventDataProviders:
+    """
+    All event data providers and the keys that sign the access tokens for them, prepared at startup.
+
+    Signing two tokens per provider is the expensive part of handing out access tokens. With more than one signing
+    thread the providers are split in batches that are signed in a thread pool, which also keeps the event loop free.
+    """
+
+    def __init__(self, app_settings: AppSettings, signing_keys: Optional[Dict[str, KeyMaterial]] = None):
+        self.providers = [EventDataProvider(config) for config in app_settings.EVENT_DATA_PROVIDERS]
+        self.signing_keys = identity_hash_jwt_private_keys if signing_keys is None else signing_keys
+        for provider in self.providers:
+            if provider.jwt_algorithm not in self.signing_keys:
+                # Don't start when a provider can not get tokens
+                raise ValueError(f"No key to sign {provider.jwt_algorithm} jwt's for provider {provider.identifier}.")
+        self.signing_threads = app_settings.IDENTITY_HASH_JWT_SIGNING_THREADS
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.signing_threads, thread_name_prefix="identity-hash-signing"
+            )
+        return self._executor
+
+    def encode_jwt(self, provider: EventDataProvider, payload: Dict[str, Any]) -> str:
+        return encode_jwt(payload, self.signing_keys[provider.jwt_algorithm], algorithm=provider.jwt_algorithm)
+
+    def batches(self) -> List[List[EventDataProvider]]:
+        """
+        The providers in order, split in about equal batches: one per signing thread. A single batch is signed in place.
+        """
+        size = max(1, -(-len(self.providers) // max(1, self.signing_threads)))
+        return [self.providers[start : start + size] for start in range(0, len(self.providers), size)]
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+
+event_data_providers = EventDataProviders(settings)
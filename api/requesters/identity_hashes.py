@@ -7,7 +7,7 @@
 # SPDX-License-Identifier: EUPL-1.2
 __author__ = "Elger Jonker, Nick ten Cate for minvws"
 
-import base64
+import asyncio
 import logging
 from datetime import datetime, timedelta
 from typing import Any, Dict, List
@@ -16,12 +16,14 @@ import jwt
 import pytz
 from fastapi import HTTPException
 from nacl.encoding import Base64Encoder
-from nacl.public import Box, PrivateKey, PublicKey
+from nacl.public import Box
 from nacl.utils import random
 
-from api.enrichment.rvig.rvig import get_pii_from_rvig
+from api.enrichment.rvig.cache import rvig_cache
 from api.http_utils import hmac256, request_post_with_retries
+from api.key_material import decode_jwt, inge6_jwt_public_key
 from api.models import EventDataProviderJWT, Holder
+from api.requesters.event_data_providers import EventDataProvider, event_data_providers
 from api.settings import settings
 
 log = logging.getLogger(__package__)
@@ -35,8 +37,8 @@ async def retrieve_bsn_from_inge6(jwt_token: str):
         return settings.INGE6_MOCK_MODE_BSN
 
     try:
-        _payload = jwt.decode(
-            jwt_token, key=settings.INGE6_JWT_PUBLIC_CRT, algorithms=["RS256"], audience=settings.INGE4_JWT_AUDIENCE
+        _payload = decode_jwt(
+            jwt_token, inge6_jwt_public_key, algorithms=["RS256"], audience=settings.INGE4_JWT_AUDIENCE
         )
     except jwt.InvalidTokenError as err:
         log.error(f"invalid token error {repr(err)}")
@@ -44,7 +46,7 @@ async def retrieve_bsn_from_inge6(jwt_token: str):
 
     headers = {"Authorization": f"Bearer {jwt_token}"}
 
-    response = request_post_with_retries(settings.INGE6_BSN_RETRIEVAL_URL, data="", headers=headers)
+    response = await request_post_with_retries(settings.INGE6_BSN_RETRIEVAL_URL, data="", headers=headers)
     response.raise_for_status()
 
     encrypted_bsn = response.content
@@ -53,7 +55,7 @@ async def retrieve_bsn_from_inge6(jwt_token: str):
     return bsn.decode()
 
 
-def create_provider_jwt_tokens(bsn: str) -> List[EventDataProviderJWT]:
+async def create_provider_jwt_tokens(bsn: str) -> List[EventDataProviderJWT]:
     """
     In order to reliably determine a system contains information about a certain person without revealing who that
     person is an identity-hash will be generated for each individual connected party and sent to the Information
@@ -74,37 +76,57 @@ def create_provider_jwt_tokens(bsn: str) -> List[EventDataProviderJWT]:
 
     # todo: deal with errors.
     errors = None
-    holder = get_pii_from_rvig(bsn)
+    holder = await rvig_cache.get_pii(bsn)
     if errors:
         # Service might be down etc.
         log.error(errors)
         raise HTTPException(500, detail=["internal server error"])
 
+    identity_hash_message = calculate_identity_hash_message(bsn, holder).encode()
+    batches = event_data_providers.batches()
+    if len(batches) < 2:
+        return _mint_provider_jwt_tokens(batches[0] if batches else [], bsn, identity_hash_message, generic_data)
+
+    loop = asyncio.get_running_loop()
+    minted = await asyncio.gather(
+        *[
+            loop.run_in_executor(
+                event_data_providers.executor,
+                _mint_provider_jwt_tokens,
+                batch,
+                bsn,
+                identity_hash_message,
+                generic_data,
+            )
+            for batch in batches
+        ]
+    )
+    return [token for tokens in minted for token in tokens]
+
+
+def _mint_provider_jwt_tokens(
+    providers: List[EventDataProvider], bsn: str, identity_hash_message: bytes, generic_data: Dict[str, Any]
+) -> List[EventDataProviderJWT]:
+    # Runs in the signing threads, generic_data is shared between them so it is not changed here.
     tokens = []
-    for data_provider in settings.EVENT_DATA_PROVIDERS:
-        generic_data["identityHash"] = calculate_identity_hash(
-            bsn,
-            holder,
-            key=data_provider["identity_hash_secret"],
-        )
+    for data_provider in providers:
+        identity_data = {**generic_data, "identityHash": data_provider.identity_hash(identity_hash_message)}
 
         unomi_data = {
             "iss": settings.IDENTITY_HASH_JWT_ISSUER_CLAIM,  # Issuer Claim
-            "aud": data_provider["unomi_url"],  # Audience Claim
+            "aud": data_provider.unomi_url,  # Audience Claim
         }
 
         # Send the BSN encrypted to respect privacy
         nonce = random(Box.NONCE_SIZE)
-        private_key = PrivateKey(base64.b64decode(data_provider["bsn_cryptography"]["private_key"].encode("UTF-8")))
-        public_key = PublicKey(base64.b64decode(data_provider["bsn_cryptography"]["public_key"].encode("UTF-8")))
-        box = Box(private_key, public_key)
+        box = data_provider.box
 
         # Put the data in the JWT for events
         event_data = {
             # Issuer Claim
             "iss": settings.IDENTITY_HASH_JWT_ISSUER_CLAIM,
             # Audience claim
-            "aud": data_provider["event_url"],
+            "aud": data_provider.event_url,
             # Remove the nonce and other authentication from the encrypted box (its prefixed by pynacl)
             "bsn": box.encrypt(bsn.encode(), nonce=nonce)[Box.NONCE_SIZE :].hex(),
             # Encode NONCE with hex format
@@ -142,16 +164,16 @@ def create_provider_jwt_tokens(bsn: str) -> List[EventDataProviderJWT]:
         # And by merging dictionaries by kwargs, the order is unreliably shuffled it seems, therefore
         # it was not possible to create a stable test case.
         # Therefore sort the dictionaries by key to create a consistent call.
-        unomi_jwt_data = {**generic_data, **unomi_data}
-        event_jwt_data = {**generic_data, **event_data}
+        unomi_jwt_data = {**identity_data, **unomi_data}
+        event_jwt_data = {**identity_data, **event_data}
         unomi_jwt_data = dict(sorted(unomi_jwt_data.items(), key=lambda kv: kv[0]))
         event_jwt_data = dict(sorted(event_jwt_data.items(), key=lambda kv: kv[0]))
 
         tokens.append(
             EventDataProviderJWT(
-                provider_identifier=data_provider["identifier"],
-                unomi=jwt.encode(unomi_jwt_data, settings.IDENTITY_HASH_JWT_PRIVATE_KEY, algorithm="RS256"),
-                event=jwt.encode(event_jwt_data, settings.IDENTITY_HASH_JWT_PRIVATE_KEY, algorithm="RS256"),
+                provider_identifier=data_provider.identifier,
+                unomi=event_data_providers.encode_jwt(data_provider, unomi_jwt_data),
+                event=event_data_providers.encode_jwt(data_provider, event_jwt_data),
             )
         )
 
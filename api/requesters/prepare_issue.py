@@ -4,29 +4,111 @@
 #
 # SPDX-License-Identifier: EUPL-1.2
 #
+import asyncio
 import base64
 import math
+import time
+from typing import Optional, Tuple
 
+from api import log
 from api.http_utils import request_post_with_retries
-from api.models import PrepareIssueResponse
+from api.models import PrepareIssuePoolStatistics, PrepareIssueResponse
 from api.session_store import session_store
-from api.settings import settings
+from api.settings import AppSettings, settings
+from api.watermark_pool import WatermarkPool
 
 
-async def get_prepare_issue() -> PrepareIssueResponse:
+async def fetch_prepare_issue_message() -> bytes:
     credential_amount = math.ceil(
         (settings.DOMESTIC_MAXIMUM_ISSUANCE_DAYS * 24)
         / (settings.DOMESTIC_STRIP_VALIDITY_HOURS - settings.DOMESTIC_MAXIMUM_RANDOMIZED_OVERLAP_HOURS)
     )
 
-    response = request_post_with_retries(
+    response = await request_post_with_retries(
         settings.DOMESTIC_NL_VWS_PREPARE_ISSUE_URL,
         data={"credentialAmount": credential_amount},
         headers={"accept": "application/json", "Content-Type": "application/json"},
     )
     response.raise_for_status()
 
-    message = base64.b64encode(response.content)
+    return base64.b64encode(response.content)
+
+
+class PrepareIssuePool(WatermarkPool[Tuple[float, bytes]]):
+    """
+    Prepare issue messages fetched ahead of time, so an app that starts does not have to wait for the signer.
+
+    A background task fetches messages up to the high watermark. Messages older than the maximum age are thrown away.
+    When the pool is empty the caller fetches a message itself, as without the pool.
+    """
+
+    def __init__(self, app_settings: AppSettings):
+        super().__init__(
+            app_settings.PREPARE_ISSUE_POOL_ENABLED,
+            app_settings.PREPARE_ISSUE_POOL_LOW_WATERMARK,
+            app_settings.PREPARE_ISSUE_POOL_HIGH_WATERMARK,
+        )
+        self._max_age = app_settings.PREPARE_ISSUE_POOL_MAX_AGE_SECONDS
+        self._concurrency = app_settings.PREPARE_ISSUE_POOL_REFILL_CONCURRENCY
+
+        self.fetched = 0
+        self.expired = 0
+        self.refill_errors = 0
+
+    def take(self) -> Optional[bytes]:
+        """
+        A fresh message from the pool, or None when there is none. Starts a refill when the pool runs low.
+        """
+        self._drop_expired()
+        item = self._take()
+        return item[1] if item else None
+
+    def _drop_expired(self) -> None:
+        # Items are (fetched at, message), oldest first
+        oldest_allowed = time.monotonic() - self._max_age
+        while self._items and self._items[0][0] < oldest_allowed:
+            self._items.popleft()
+            self.expired += 1
+
+    async def _refill(self) -> None:
+        while self.missing:
+            amount = min(self._concurrency, self.missing)
+            results = await asyncio.gather(
+                *[fetch_prepare_issue_message() for _ in range(amount)], return_exceptions=True
+            )
+
+            errors = [result for result in results if isinstance(result, BaseException)]
+            for result in results:
+                if not isinstance(result, BaseException):
+                    self._items.append((time.monotonic(), result))
+                    self.fetched += 1
+
+            if errors:
+                # Don't hammer a signer that has trouble, the next message that is taken tries again.
+                self.refill_errors += len(errors)
+                log.warning(f"Could not refill the prepare issue pool: {repr(errors[0])}")
+                return
+
+    def statistics(self) -> PrepareIssuePoolStatistics:
+        self._drop_expired()
+        return PrepareIssuePoolStatistics(
+            enabled=self._enabled,
+            size=len(self._items),
+            low_watermark=self._low_watermark,
+            high_watermark=self._high_watermark,
+            hits=self.hits,
+            misses=self.misses,
+            fetched=self.fetched,
+            expired=self.expired,
+            refill_errors=self.refill_errors,
+        )
+
+
+prepare_issue_pool = PrepareIssuePool(settings)
+
+
+async def get_prepare_issue() -> PrepareIssueResponse:
+    message = prepare_issue_pool.take() or await fetch_prepare_issue_message()
 
-    session_token = session_store.store_message(message)
+    session_token = await session_store.store_message(message)
     return PrepareIssueResponse(prepareIssueMessage=message.decode(), stoken=session_token)
@@ -4,34 +4,85 @@
 #
 # SPDX-License-Identifier: EUPL-1.2
 #
+import threading
+import time
+from abc import ABC, abstractmethod
 from base64 import b64encode
-from typing import List, Optional
+from typing import Dict, List, Optional, Tuple, cast
 from uuid import UUID, uuid4
 
 import redis
+import redis.asyncio
 
 from api import log
 from api.http_utils import hmac256
-from api.models import ServiceHealth
+from api.metrics import LatencyHistogram
+from api.models import ServiceHealth, SessionStoreStatistics
 from api.settings import AppSettings, RedisSettings, redis_settings, settings
 
+# Used when REDIS_MAX_CONNECTIONS is not set
+DEFAULT_MAX_CONNECTIONS = 50
 
-class SessionStore:
-    def __init__(self, general_settings: AppSettings, backend_settings: RedisSettings):
-        self._redis: redis.Redis = redis.Redis(**backend_settings.dict())
-        self._hmac_key = general_settings.REDIS_HMAC_KEY
-        self._ex: int = general_settings.EXPIRATION_TIME_IN_SECONDS
-        self._key_prefix: bytes = general_settings.REDIS_KEY_PREFIX.encode() + b":"
+# Reads and removes a message in one round trip and atomically, so a session token can only be used once.
+# GETDEL does the same, but needs redis 6.2.
+GET_AND_DELETE = """
+local message = redis.call('GET', KEYS[1])
+if message then
+    redis.call('DEL', KEYS[1])
+end
+return message
+"""
 
-    def _hash_key(self, key: bytes) -> bytes:
-        return self._key_prefix + b64encode(hmac256(key, self._hmac_key))
 
-    def store_message(self, message: bytes) -> str:
+def create_async_redis(backend_settings: RedisSettings, pool_timeout: float) -> redis.asyncio.Redis:
+    """
+    A client with a pool that waits up to pool_timeout seconds for a free connection when all connections are in
+    use, instead of failing right away.
+    """
+    # charset and errors are old names of encoding and encoding_errors, the asyncio client does not know them.
+    options = backend_settings.dict(exclude={"charset", "errors"})
+    options["max_connections"] = backend_settings.max_connections or DEFAULT_MAX_CONNECTIONS
+    # Let redis work out how to connect (tcp, ssl or unix socket), then put those connections in a blocking pool.
+    default_pool = redis.asyncio.Redis(**options).connection_pool
+    pool = redis.asyncio.BlockingConnectionPool(
+        max_connections=options["max_connections"],
+        timeout=pool_timeout,  # type: ignore
+        connection_class=default_pool.connection_class,
+        **default_pool.connection_kwargs,
+    )
+    return redis.asyncio.Redis(connection_pool=pool)
+
+
+class SessionStore(ABC):
+    """
+    Keeps a message for EXPIRATION_TIME_IN_SECONDS under a new session token. A message can be retrieved only once.
+    The backends (redis, memory) only store, the timing of every operation is done here.
+    """
+
+    backend = ""
+
+    def __init__(self, general_settings: AppSettings):
+        self._ex: int = general_settings.EXPIRATION_TIME_IN_SECONDS
+        self._latency: Dict[str, LatencyHistogram] = {
+            operation: LatencyHistogram() for operation in ["store_message", "store_messages", "get_message", "ping"]
+        }
+
+    async def store_message(self, message: bytes) -> str:
         session_token = uuid4()
-        self._redis.set(self._hash_key(session_token.bytes), message, ex=self._ex)
+        with self._latency["store_message"].time():
+            await self._set(session_token, message)
         return str(session_token)
 
-    def get_message(self, session_token: str) -> Optional[bytes]:
+    async def store_messages(self, messages: List[bytes]) -> List[str]:
+        """
+        Same as store_message for many messages at once. The session tokens are in the order of the messages.
+        """
+        session_tokens = [uuid4() for _ in messages]
+        with self._latency["store_messages"].time():
+            await self._set_many(list(zip(session_tokens, messages)))
+        return [str(session_token) for session_token in session_tokens]
+
+    async def get_message(self, session_token: str) -> Optional[bytes]:
         """
 
         Args:
@@ -42,23 +93,147 @@ class SessionStore:
             By design the session token can be used only once to retreive the nonces.
 
         """
-        key = self._hash_key(UUID(session_token).bytes)
-        pipe = self._redis.pipeline()
-        pipe.get(key)
-        pipe.delete(key)
-        message, _ = pipe.execute()
+        with self._latency["get_message"].time():
+            return await self._get_and_delete(UUID(session_token))
+
+    async def health_check(self) -> List[ServiceHealth]:
+        with self._latency["ping"].time():
+            return await self._health_check()
+
+    def statistics(self) -> SessionStoreStatistics:
+        return SessionStoreStatistics(
+            backend=self.backend,
+            max_connections=self._max_connections(),
+            latency={operation: histogram.statistics() for operation, histogram in self._latency.items()},
+        )
+
+    async def aclose(self) -> None:
+        ...
+
+    @abstractmethod
+    async def _set(self, session_token: UUID, message: bytes) -> None:
+        ...
+
+    @abstractmethod
+    async def _set_many(self, messages: List[Tuple[UUID, bytes]]) -> None:
+        ...
+
+    @abstractmethod
+    async def _get_and_delete(self, session_token: UUID) -> Optional[bytes]:
+        ...
+
+    @abstractmethod
+    async def _health_check(self) -> List[ServiceHealth]:
+        ...
+
+    def _max_connections(self) -> Optional[int]:
+        return None
+
+
+class RedisSessionStore(SessionStore):
+    backend = "redis"
+
+    def __init__(self, general_settings: AppSettings, backend_settings: RedisSettings):
+        super().__init__(general_settings)
+        self._redis: redis.asyncio.Redis = create_async_redis(
+            backend_settings, pool_timeout=general_settings.REDIS_POOL_TIMEOUT_SECONDS
+        )
+        self._hmac_key = general_settings.REDIS_HMAC_KEY
+        self._key_prefix: bytes = general_settings.REDIS_KEY_PREFIX.encode() + b":"
+        self._get_and_delete_script = self._redis.register_script(GET_AND_DELETE)
+
+    def _hash_key(self, key: bytes) -> bytes:
+        return self._key_prefix + b64encode(hmac256(key, self._hmac_key))
+
+    async def _set(self, session_token: UUID, message: bytes) -> None:
+        await self._redis.set(self._hash_key(session_token.bytes), message, ex=self._ex)
+
+    async def _set_many(self, messages: List[Tuple[UUID, bytes]]) -> None:
+        # One round trip. No transaction: every message is independent of the others.
+        pipe = self._redis.pipeline(transaction=False)
+        for session_token, message in messages:
+            pipe.set(self._hash_key(session_token.bytes), message, ex=self._ex)
+        await pipe.execute()
+
+    async def _get_and_delete(self, session_token: UUID) -> Optional[bytes]:
+        # The script is registered with the client that the store started with, tests replace the client.
+        message = await self._get_and_delete_script(keys=[self._hash_key(session_token.bytes)], client=self._redis)
         if isinstance(message, bytes):
             return message
         return None
 
-    def health_check(self) -> List[ServiceHealth]:
+    async def _health_check(self) -> List[ServiceHealth]:
         try:
-            self._redis.ping()
+            await self._redis.ping()
             return [ServiceHealth(service="redis", is_healthy=True, message="ping succeeded")]
         except redis.exceptions.RedisError as err:
             # Do not publish specifics about the service.
             log.exception(err)
             return [ServiceHealth(service="redis", is_healthy=False, message="Could not ping redis.")]
 
+    def _max_connections(self) -> Optional[int]:
+        return cast(Optional[int], self._redis.connection_pool.max_connections)
+
+    async def aclose(self) -> None:
+        await self._redis.close()
+        await self._redis.connection_pool.disconnect()
+
+
+class MemorySessionStore(SessionStore):
+    """
+    Keeps the messages in the memory of this process. Only for a single worker: a session token that is stored by
+    one worker can not be retrieved from another. Meant for tests, benchmarks and small deployments without redis.
+
+    Expired messages are never handed out. They are removed at most every SESSION_STORE_SWEEP_INTERVAL_SECONDS, when
+    a message is stored.
+    """
+
+    backend = "memory"
+
+    def __init__(self, general_settings: AppSettings):
+        super().__init__(general_settings)
+        self._sweep_interval = general_settings.SESSION_STORE_SWEEP_INTERVAL_SECONDS
+        # session token -> (expires at, message)
+        self._messages: Dict[UUID, Tuple[float, bytes]] = {}
+        # Taking a message out has to happen once, also when called from threads.
+        self._lock = threading.Lock()
+        self._swept_at = time.monotonic()
+
+    def __len__(self) -> int:
+        return len(self._messages)
+
+    async def _set(self, session_token: UUID, message: bytes) -> None:
+        await self._set_many([(session_token, message)])
+
+    async def _set_many(self, messages: List[Tuple[UUID, bytes]]) -> None:
+        now = time.monotonic()
+        with self._lock:
+            for session_token, message in messages:
+                self._messages[session_token] = (now + self._ex, message)
+            if now - self._swept_at >= self._sweep_interval:
+                self._sweep(now)
+
+    def _sweep(self, now: float) -> None:
+        expired = [session_token for session_token, (expires_at, _) in self._messages.items() if expires_at <= now]
+        for session_token in expired:
+            del self._messages[session_token]
+        self._swept_at = now
+
+    async def _get_and_delete(self, session_token: UUID) -> Optional[bytes]:
+        with self._lock:
+            expires_at, message = self._messages.pop(session_token, (0.0, None))
+        return message if expires_at > time.monotonic() else None
+
+    async def _health_check(self) -> List[ServiceHealth]:
+        return [ServiceHealth(service="session_store", is_healthy=True, message="in memory")]
+
+
+def create_session_store(general_settings: AppSettings, backend_settings: RedisSettings) -> SessionStore:
+    if general_settings.SESSION_STORE_BACKEND == "redis":
+        return RedisSessionStore(general_settings, backend_settings)
+    if general_settings.SESSION_STORE_BACKEND == "memory":
+        return MemorySessionStore(general_settings)
+    raise ValueError(f"Unknown SESSION_STORE_BACKEND {general_settings.SESSION_STORE_BACKEND}, use redis or memory.")
+
 
-session_store = SessionStore(settings, redis_settings)
+session_store = create_session_store(settings, redis_settings)
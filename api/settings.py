@@ -46,18 +46,39 @@ class AppSettings(BaseSettings):
     EVENT_DATA_PROVIDERS_FILENAME: str = ""
     DYNAMIC_FLOW_JWT_PRIVATE_KEY_FILENAME: str = ""
     DYNAMIC_FLOW_JWT_PUBLIC_KEY_FILENAME: str = ""
+    # keys for event data providers that use another jwt algorithm than RS256, see vaccinationproviders.json5
+    DYNAMIC_FLOW_JWT_ES256_PRIVATE_KEY_FILENAME: str = ""
+    DYNAMIC_FLOW_JWT_EDDSA_PRIVATE_KEY_FILENAME: str = ""
     EVENT_DATA_PROVIDERS: List[Dict[str, Any]] = []
     IDENTITY_HASH_JWT_PRIVATE_KEY: str = ""
     IDENTITY_HASH_JWT_PUBLIC_KEY: str = ""
     IDENTITY_HASH_JWT_ISSUER_CLAIM: str = "jwt.test.coronacheck.nl"
     IDENTITY_HASH_JWT_VALIDITY_DURATION_SECONDS: int = 86400
+    # threads that sign the access tokens of the event data providers, 1 signs them on the event loop
+    IDENTITY_HASH_JWT_SIGNING_THREADS: int = 4
+    # CMS signatures of the event data providers over their payloads, see cms_certificates in vaccinationproviders.json5
+    CMS_SIGNATURE_VERIFICATION_ENABLED: bool = False
+    # threads that verify the payloads of one request at the same time, 1 verifies them on the event loop
+    CMS_SIGNATURE_VERIFICATION_THREADS: int = 1
     RVIG_CERT_FILENAME: str = ""
     RVIG_CERT: str = ""
+    # only for development, where there is no client certificate for RVIG
+    RVIG_CONNECT_WITHOUT_CERT: bool = False
     RVIG_USERNAME: str = ""
     RVIG_PASSWORD: str = ""
     # todo: add enum validation to dev or prod. Todo: rename to WSDL_ENVIRONMENT
     RVIG_ENVIRONMENT: str = "dev"
     RVIG_HEALTH_CHECK_BSN: str = ""
+    # GBA-V can take a while to answer, the connect timeout is HTTP_CONNECT_TIMEOUT
+    RVIG_READ_TIMEOUT: float = 30
+
+    # Answers of RVIG are cached per worker, and optionally in redis for all workers
+    RVIG_CACHE_ENABLED: bool = True
+    RVIG_CACHE_MAX_SIZE: int = 10000
+    RVIG_CACHE_TTL_SECONDS: int = 300
+    # bsn's that RVIG does not know
+    RVIG_CACHE_NOT_FOUND_TTL_SECONDS: int = 60
+    RVIG_CACHE_REDIS_ENABLED: bool = False
 
     HPK_MAPPING_FILE: str = ""
     HPK_MAPPING: Dict[Optional[str], Any] = {}
@@ -72,6 +93,20 @@ class AppSettings(BaseSettings):
     DOMESTIC_NL_VWS_PAPER_SIGNING_URL: AnyHttpUrl = Field()
     DOMESTIC_NL_VWS_ONLINE_SIGNING_URL: AnyHttpUrl = Field()
 
+    # prepare_issue messages are fetched ahead of time, from the low up to the high watermark, per worker
+    PREPARE_ISSUE_POOL_ENABLED: bool = False
+    PREPARE_ISSUE_POOL_LOW_WATERMARK: int = 10
+    PREPARE_ISSUE_POOL_HIGH_WATERMARK: int = 50
+    # older messages are not handed out anymore
+    PREPARE_ISSUE_POOL_MAX_AGE_SECONDS: int = 30
+    PREPARE_ISSUE_POOL_REFILL_CONCURRENCY: int = 4
+
+    # UCI's are generated ahead of time, from the low up to the high watermark, per worker
+    UCI_POOL_ENABLED: bool = False
+    UCI_POOL_LOW_WATERMARK: int = 100
+    UCI_POOL_HIGH_WATERMARK: int = 1000
+    UCI_POOL_REFILL_BATCH_SIZE: int = 100
+
     # how many hours a domestic strip is targeted to be valid for
     DOMESTIC_STRIP_VALIDITY_HOURS: int = 24
 
@@ -103,6 +138,8 @@ class AppSettings(BaseSettings):
     DOMESTIC_NL_EXPIRY_HOURS_NEGATIVE_TEST: int = 40
 
     EU_INTERNATIONAL_SIGNING_URL: AnyHttpUrl = Field()
+    # how many messages of one holder are sent to the EU signer at the same time
+    EU_INTERNATIONAL_SIGNING_CONCURRENCY: int = 4
 
     # in how many days from now() a (non-recovery) EU DCC is expiring
     EU_INTERNATIONAL_GREENCARD_EXPIRATION_TIME_DAYS: int = 28
@@ -141,12 +178,20 @@ class AppSettings(BaseSettings):
     REDIS_HMAC_KEY_FILE: str = ""
     REDIS_HMAC_KEY: bytes = b""
     USE_PYTEST_REDIS: bool = False
+    # redis, or memory for a single worker without redis
+    SESSION_STORE_BACKEND: str = "redis"
+    # how often the memory session store removes expired messages
+    SESSION_STORE_SWEEP_INTERVAL_SECONDS: int = 60
+    # seconds a request waits for a free redis connection when REDIS_MAX_CONNECTIONS (default 50) are in use
+    REDIS_POOL_TIMEOUT_SECONDS: float = 2
 
     INGE4_NACL_PRIVATE_KEY_FILE: str = ""
     INGE4_NACL_PUBLIC_KEY_FILE: str = ""
     INGE6_NACL_PUBLIC_KEY_FILE: str = ""
     INGE6_JWT_PUBLIC_CRT_FILE: str = ""
     INGE4_JWT_AUDIENCE: List[str] = []
+    # seconds between checks whether the jwt key files changed on disk, changed keys are loaded without a restart
+    KEY_MATERIAL_RELOAD_INTERVAL_SECONDS: float = 60
 
     # the following initial values are just temporary and never used (overwritten by the factory code)
     # this is just to make mypy and linters stop complaining
@@ -161,6 +206,14 @@ class AppSettings(BaseSettings):
     HTTP_RETRY_BACKOFF_TIME: float = 1
     HTTP_RETRY_STATUS_CODES: Tuple[int, ...] = (429, 500, 502, 503, 504)
 
+    # Every upstream (signers, prepare_issue, inge6) gets its own long-lived connection pool
+    HTTP_POOL_MAX_CONNECTIONS: int = 100
+    HTTP_POOL_MAX_KEEPALIVE_CONNECTIONS: int = 20
+    # seconds an idle connection is kept open for reuse
+    HTTP_POOL_KEEPALIVE_EXPIRY: float = 30
+    # requires the h2 package, only works against upstreams that support HTTP/2 over TLS
+    HTTP_HTTP2_ENABLED: bool = False
+
 
 class RedisSettings(BaseSettings):
     host: str = Field("", env="REDIS_HOST")
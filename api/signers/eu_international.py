@@ -4,13 +4,14 @@
 #
 # SPDX-License-Identifier: EUPL-1.2
 #
-from typing import List
+import asyncio
+from typing import List, Optional
 
 from api import log
 from api.http_utils import request_post_with_retries
 from api.models import EUGreenCard, Events, MessageToEUSigner
 from api.settings import settings
-from api.signers.logic import distill_relevant_events
+from api.signers.logic import DistillationContext
 from api.signers.logic_eu import (
     create_eu_signer_message,
     get_eu_expirationtime,
@@ -20,43 +21,68 @@ from api.signers.logic_eu import (
 )
 
 
-def sign_messages(messages_to_eu_signer: List[MessageToEUSigner]) -> List[EUGreenCard]:
-    greencards = []
-    for message_to_eu_signer in messages_to_eu_signer:
-        response = request_post_with_retries(
-            settings.EU_INTERNATIONAL_SIGNING_URL,
-            # by_alias uses the alias field to create a json object. As such 'is_' will be 'is'.
-            # exclude_none is used to omit v, t and r entirely
-            data=message_to_eu_signer.dict(by_alias=True, exclude_none=True),
-            headers={"accept": "application/json", "Content-Type": "application/json"},
-        )
-        if response.status_code != 200:
-            log.error(response.content)
-        response.raise_for_status()
-        data = response.json()
-        origins = [
-            {
-                "type": message_to_eu_signer.keyUsage,
-                "eventTime": str(get_event_time(message_to_eu_signer).isoformat()),
-                "expirationTime": str(get_eu_expirationtime(message_to_eu_signer).isoformat()),
-                "validFrom": str(get_valid_from_time(message_to_eu_signer).isoformat()),
-            }
-        ]
-        greencards.append(EUGreenCard(**{**data, **{"origins": origins}}))
-    return greencards
-
-
-def sign(events: Events) -> List[EUGreenCard]:
+async def sign_message(message_to_eu_signer: MessageToEUSigner) -> EUGreenCard:
+    response = await request_post_with_retries(
+        settings.EU_INTERNATIONAL_SIGNING_URL,
+        # by_alias uses the alias field to create a json object. As such 'is_' will be 'is'.
+        # exclude_none is used to omit v, t and r entirely
+        data=message_to_eu_signer.dict(by_alias=True, exclude_none=True),
+        headers={"accept": "application/json", "Content-Type": "application/json"},
+    )
+    if response.status_code != 200:
+        log.error(response.content)
+    response.raise_for_status()
+    data = response.json()
+    origins = [
+        {
+            "type": message_to_eu_signer.keyUsage,
+            "eventTime": str(get_event_time(message_to_eu_signer).isoformat()),
+            "expirationTime": str(get_eu_expirationtime(message_to_eu_signer).isoformat()),
+            "validFrom": str(get_valid_from_time(message_to_eu_signer).isoformat()),
+        }
+    ]
+    return EUGreenCard(**{**data, **{"origins": origins}})
+
+
+async def sign_messages(messages_to_eu_signer: List[MessageToEUSigner]) -> List[EUGreenCard]:
+    """
+    Signs all messages at the same time, with at most EU_INTERNATIONAL_SIGNING_CONCURRENCY requests to the signer
+    at once. The greencards are returned in the order of the messages.
+
+    A failing message does not cancel the others: all requests are finished, every failure is logged and then the
+    first failure is raised.
+    """
+    semaphore = asyncio.Semaphore(settings.EU_INTERNATIONAL_SIGNING_CONCURRENCY)
+
+    async def bounded_sign_message(message_to_eu_signer: MessageToEUSigner) -> EUGreenCard:
+        async with semaphore:
+            return await sign_message(message_to_eu_signer)
+
+    results = await asyncio.gather(
+        *[bounded_sign_message(message) for message in messages_to_eu_signer], return_exceptions=True
+    )
+
+    failures = [result for result in results if isinstance(result, BaseException)]
+    for failure in failures:
+        log.error(f"Signing an EU message failed: {repr(failure)}")
+    if failures:
+        raise failures[0]
+
+    return [result for result in results if isinstance(result, EUGreenCard)]
+
+
+async def sign(events: Events, context: Optional[DistillationContext] = None) -> List[EUGreenCard]:
     """
     Implements signing against: https://github.com/minvws/nl-covid19-coronacheck-hcert-private
     https://github.com/ehn-dcc-development/ehn-dcc-schema/blob/release/1.0.1/DGC.combined-schema.json
+
+    Pass the context of the request when other signers are also signing these events.
     """
 
     if not settings.EU_INTERNATIONAL_DYNAMIC_SIGNER_ENABLED:
         return []
 
-    eligible_events = remove_eu_ineligible_events(events)
-    eligible_events = distill_relevant_events(eligible_events)
+    eligible_events = (context or DistillationContext(events)).distill(remove_eu_ineligible_events)
     messages_to_eu_signer = [create_eu_signer_message(event) for event in eligible_events.events]
     log.debug(f"Messages to EU signer: {len(messages_to_eu_signer)}")
-    return sign_messages(messages_to_eu_signer)
+    return await sign_messages(messages_to_eu_signer)
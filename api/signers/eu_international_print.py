@@ -10,11 +10,11 @@ import api.signers.eu_international
 from api import log
 from api.models import EuropeanPrintProof, Events
 from api.settings import settings
-from api.signers.logic import distill_relevant_events
+from api.signers.logic import DistillationContext
 from api.signers.logic_eu import create_eu_signer_message, remove_eu_ineligible_events
 
 
-def sign(events: Events) -> Optional[EuropeanPrintProof]:
+async def sign(events: Events, context: Optional[DistillationContext] = None) -> Optional[EuropeanPrintProof]:
 
     if not settings.EU_INTERNATIONAL_PRINT_SIGNER_ENABLED:
         return None
@@ -27,8 +27,7 @@ def sign(events: Events) -> Optional[EuropeanPrintProof]:
         log.error(f"received mixed types event list: {','.join(event_types)}")
         return None
 
-    eligible_events = remove_eu_ineligible_events(events)
-    eligible_events = distill_relevant_events(eligible_events)
+    eligible_events = (context or DistillationContext(events)).distill(remove_eu_ineligible_events)
     signing_messages = [create_eu_signer_message(event) for event in eligible_events.events]
     if not signing_messages:
         return None
@@ -37,7 +36,7 @@ def sign(events: Events) -> Optional[EuropeanPrintProof]:
         log.error("compiled eligible events into more than one signing messages")
         raise ValueError("multiple signing messages compiled")
 
-    eu_greencards = api.signers.eu_international.sign_messages(signing_messages)
+    eu_greencards = await api.signers.eu_international.sign_messages(signing_messages)
     if not eu_greencards:
         return None
 
@@ -6,8 +6,9 @@
 #
 import json
 import os.path
+from collections import defaultdict
 from datetime import date, datetime, timedelta
-from typing import Any, Callable, Dict, List, Union
+from typing import Any, Callable, DefaultDict, Dict, Hashable, List, Optional, Tuple, Union
 
 import pytz
 
@@ -304,29 +305,94 @@ def _merge_recoveries(base: Event, other: Event) -> Event:
     return base
 
 
-def _deduplicate(events: List[Event], events_are_identical_func: Callable, merge_func: Callable) -> List[Event]:
+def _date_cell(moment: Union[date, datetime]) -> int:
+    """
+    Splits time in cells of DEDUPLICATION_MARGIN + 1 days. Events that can be duplicates according to
+    same_type_and_same_day are less than that apart, so they are in the same or in a neighbouring cell.
+    """
+    cell_seconds = (settings.DEDUPLICATION_MARGIN + 1) * 86400
+    # date is the base class of datetime, so check for datetime first
+    seconds = moment.timestamp() if isinstance(moment, datetime) else moment.toordinal() * 86400
+    return int(seconds // cell_seconds)
+
+
+class _RetainedEvents:
+    """
+    The events that _deduplicate retains, by bucket and date cell to find the ones an event can be identical to.
+    """
+
+    def __init__(
+        self, bucket_func: Callable[[Event], Hashable], date_func: Callable[[Event], Union[date, datetime]]
+    ) -> None:
+        self._bucket_func = bucket_func
+        self._date_func = date_func
+        self.events: List[Event] = []
+        self._event_cells: List[Tuple[Hashable, int]] = []
+        self._cells: DefaultDict[Tuple[Hashable, int], List[int]] = defaultdict(list)
+
+    def _cell(self, event: Event) -> Tuple[Hashable, int]:
+        return self._bucket_func(event), _date_cell(self._date_func(event))
+
+    def candidates(self, event: Event) -> List[int]:
+        """The indexes of the retained events in the same bucket and the same or a neighbouring cell, in order."""
+        bucket, cell = self._cell(event)
+        return sorted(index for offset in (-1, 0, 1) for index in self._cells.get((bucket, cell + offset), []))
+
+    def add(self, event: Event) -> None:
+        cell = self._cell(event)
+        self._cells[cell].append(len(self.events))
+        self._event_cells.append(cell)
+        self.events.append(event)
+
+    def merged(self, index: int) -> None:
+        """Moves the retained event to the cell of its date after merging, which can be an earlier date."""
+        cell = self._cell(self.events[index])
+        if cell != self._event_cells[index]:
+            self._cells[self._event_cells[index]].remove(index)
+            self._cells[cell].append(index)
+            self._event_cells[index] = cell
+
+
+def _deduplicate(
+    events: List[Event],
+    events_are_identical_func: Callable,
+    merge_func: Callable,
+    bucket_func: Callable[[Event], Hashable],
+    date_func: Callable[[Event], Union[date, datetime]],
+) -> List[Event]:
+    """
+    Every event is merged into all retained events it is identical to, or retained when there are none.
+
+    Only retained events that can be identical are compared: the ones in the same bucket and in the same or a
+    neighbouring date cell. The bucket_func returns the attributes that have to be equal for events to be
+    identical, and that do not change when merging. Merging can move the date of a retained event to an earlier
+    date, so it is moved to the cell of that date.
+    """
     log.debug(f"deduplication starting with {len(events)} events.")
-    retained: List[Event] = []
+    retained = _RetainedEvents(bucket_func, date_func)
+
     for event in events:
-        if event in retained:
+        candidates = retained.candidates(event)
+
+        if any(retained.events[index] == event for index in candidates):
             log.debug("Event already in retained, dropping...")
             continue
-        if len(retained) == 0:
-            retained.append(event)
-            continue
 
         merged = False
-        for ret in retained:
+        for index in candidates:
+            ret = retained.events[index]
             if events_are_identical_func(ret, event):
                 log.debug(f"Merging {event.unique}.")
                 merge_func(ret, event)
                 merged = True
+                retained.merged(index)
+
         if not merged:
             log.debug(f"Adding {event.unique}")
-            retained.append(event)
+            retained.add(event)
 
-    log.debug(f"deduplication finished with {len(retained)} events.")
-    return retained
+    log.debug(f"deduplication finished with {len(retained.events)} events.")
+    return retained.events
 
 
 def deduplicate_events(events: Events) -> Events:
@@ -334,10 +400,36 @@ def deduplicate_events(events: Events) -> Events:
 
     # We see that when data goes from provider one to provider two, data is lost.
     # Therefore merging is relevant. For example country is lost, or number of vaccinations.
-    deduped_vaccinations = _deduplicate(events.vaccinations, _identical_vaccinations, _merge_vaccinations)
-    deduped_negative_tests = _deduplicate(events.negativetests, _identical_negative_tests, _merge_negative_tests)
-    deduped_positive_tests = _deduplicate(events.positivetests, _identical_positive_tests, _merge_positive_tests)
-    deduped_recoveries = _deduplicate(events.recoveries, _identical_recoveries, _merge_recoveries)
+    # Vaccinations with and without an hpk code, type, manufacturer or brand can be identical, so these can
+    # only be told apart by date.
+    deduped_vaccinations = _deduplicate(
+        events.vaccinations,
+        _identical_vaccinations,
+        _merge_vaccinations,
+        bucket_func=lambda e: None,
+        date_func=lambda e: e.vaccination.date,  # type: ignore
+    )
+    deduped_negative_tests = _deduplicate(
+        events.negativetests,
+        _identical_negative_tests,
+        _merge_negative_tests,
+        bucket_func=lambda e: tuple(getattr(e.negativetest, attr) for attr in _TEST_ATTRIBUTES),
+        date_func=lambda e: e.negativetest.sampleDate,  # type: ignore
+    )
+    deduped_positive_tests = _deduplicate(
+        events.positivetests,
+        _identical_positive_tests,
+        _merge_positive_tests,
+        bucket_func=lambda e: tuple(getattr(e.positivetest, attr) for attr in _TEST_ATTRIBUTES),
+        date_func=lambda e: e.positivetest.sampleDate,  # type: ignore
+    )
+    deduped_recoveries = _deduplicate(
+        events.recoveries,
+        _identical_recoveries,
+        _merge_recoveries,
+        bucket_func=lambda e: (e.recovery.validFrom, e.recovery.validUntil, e.recovery.country),  # type: ignore
+        date_func=lambda e: e.recovery.sampleDate,  # type: ignore
+    )
 
     result = Events()
     result.events = [
@@ -581,14 +673,63 @@ def filter_redundant_events(events: Events) -> Events:
     return relevant_events
 
 
-def distill_relevant_events(events: Events) -> Events:
-    log.debug(f"Filtering, reducing and preparing events, starting with N events: {len(events.events)}")
-
+def prepare_events(events: Events) -> Events:
+    """
+    The stages of the distillation that look at one event at a time. The outcome for an event does not depend on
+    the other events, so these can be run once for all signers. Changes the given events in place.
+    """
     eligible_events = remove_ineligible_events(events)
     eligible_events = enrich_from_hpk(eligible_events)
     eligible_events = set_missing_doses(eligible_events)
     eligible_events = set_completed_by_statement(eligible_events)
-    eligible_events = deduplicate_events(eligible_events)
-    eligible_events = filter_redundant_events(eligible_events)
-    eligible_events = evaluate_cross_type_events(eligible_events)
     return eligible_events
+
+
+def reduce_events(events: Events) -> Events:
+    """
+    The stages of the distillation that combine and choose between events, so these depend on what events a signer
+    accepts. Changes the given events in place.
+    """
+    relevant_events = deduplicate_events(events)
+    relevant_events = filter_redundant_events(relevant_events)
+    relevant_events = evaluate_cross_type_events(relevant_events)
+    return relevant_events
+
+
+def distill_relevant_events(events: Events) -> Events:
+    log.debug(f"Filtering, reducing and preparing events, starting with N events: {len(events.events)}")
+
+    return reduce_events(prepare_events(events))
+
+
+class DistillationContext:
+    """
+    Distills the events of a single request for all signers of that request.
+
+    The stages that are the same for every signer (see prepare_events) run once. What each signer accepts differs,
+    so the reduction runs once per signer filter. Every stage works on its own copy of the events: the events of
+    the request and the events handed to one signer are never changed by another signer.
+    """
+
+    def __init__(self, events: Events):
+        self.events = events
+        self._prepared_events: Optional[Events] = None
+        self._distilled_events: Dict[Callable[[Events], Events], Events] = {}
+
+    @property
+    def prepared_events(self) -> Events:
+        if self._prepared_events is None:
+            log.debug(f"Preparing events for all signers, starting with N events: {len(self.events.events)}")
+            self._prepared_events = prepare_events(self.events.copy(deep=True))
+        return self._prepared_events
+
+    def distill(self, signer_filter: Callable[[Events], Events]) -> Events:
+        """
+        :param signer_filter: removes the events a signer does not accept, such as remove_eu_ineligible_events.
+        :return: the relevant events for the signer, a copy that the signer is free to change.
+        """
+        if signer_filter not in self._distilled_events:
+            accepted_events = signer_filter(self.prepared_events.copy(deep=True))
+            log.debug(f"Reducing events after {signer_filter.__name__}, N events: {len(accepted_events.events)}")
+            self._distilled_events[signer_filter] = reduce_events(accepted_events)
+        return self._distilled_events[signer_filter].copy(deep=True)
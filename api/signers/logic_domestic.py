@@ -6,7 +6,7 @@
 #
 import secrets
 from datetime import datetime, timedelta
-from typing import List, Optional, Tuple
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
 
 import pytz
 
@@ -28,6 +28,10 @@ from api.models import (
 from api.settings import settings
 from api.signers.logic import floor_hours
 
+EPOCH = datetime(1970, 1, 1, tzinfo=pytz.utc)
+SECOND = 1_000_000
+HOUR = 3600 * SECOND
+
 
 def create_vaccination_rich_origin(event: Event) -> RichOrigin:
     if not isinstance(event.vaccination, Vaccination):
@@ -94,20 +98,57 @@ def create_negative_test_rich_origin(event: Event) -> RichOrigin:
     )
 
 
-def calculate_attributes_from_blocks(contiguous_blocks: List[ContiguousOriginsBlock]) -> List[DomesticSignerAttributes]:
+class Strip(NamedTuple):
+    # Unix timestamp the strip is valid from
+    valid_from: int
+    # The struck attributes of the holder and the other attributes of the block, shared by all strips of the block
+    attributes: Dict[str, Any]
+
+    def to_signer_attributes(self) -> DomesticSignerAttributes:
+        # Everything is validated once per block already, the signer only understands strings.
+        return DomesticSignerAttributes.construct(validFrom=str(self.valid_from), **self.attributes)
+
+
+def block_attributes(block: ContiguousOriginsBlock) -> Dict[str, Any]:
+    """
+    The attributes every strip of the block has, with the holder attributes struck by the allowlist.
+    """
+    # we only have one single holder across all origins, pick the first
+    holder = block.origins[0].holder
+
+    attributes = DomesticSignerAttributes(
+        # mixing specimen with non-specimen requests is weird. We'll use what's in the first origin
+        isSpecimen="1" if block.origins[0].isSpecimen else "0",
+        isPaperProof=StripType.APP_STRIP,
+        validFrom="",
+        validForHours=settings.DOMESTIC_STRIP_VALIDITY_HOURS,
+        firstNameInitial=holder.first_name_initial,
+        lastNameInitial=holder.last_name_initial,
+        # Dutch Birthdays can be unknown, supplied as 1970-XX-XX. See DutchBirthDate
+        birthDay=str(holder.birthDate.day) if holder.birthDate.day else "",
+        birthMonth=str(holder.birthDate.month) if holder.birthDate.month else "",
+    ).strike()
+    return attributes.dict(exclude={"validFrom"})
+
+
+def _microseconds(moment: datetime) -> int:
+    return (moment - EPOCH) // timedelta(microseconds=1)
+
+
+def calculate_strips_from_blocks(contiguous_blocks: List[ContiguousOriginsBlock]) -> List[Strip]:
     # docs: https://github.com/minvws/nl-covid19-coronacheck-app-coordination-private/blob/feature/
     # stripcard/architecture/Privacy%20Preserving%20Green%20Card.md
     # contiguous_blocks -> tijden dat je sowieso een credential krijgt.
-    log.debug(f"Creating attributes from {len(contiguous_blocks)} ContiguousOriginsBlock.")
 
-    # Calculate sets of credentials for every block
-    rounded_now = logic.floor_hours(datetime.now(tz=pytz.utc))
+    # Calculate sets of credentials for every block. Times are in microseconds since the epoch.
+    rounded_now = _microseconds(logic.floor_hours(datetime.now(tz=pytz.utc)))
 
-    attributes = []
+    strips = []
 
     # Calculate the maximum expiration time we're going to issue credentials for. Not going to give a credential
     # after this amount of days.
-    maximum_expiration_time = rounded_now + timedelta(days=settings.DOMESTIC_MAXIMUM_ISSUANCE_DAYS)
+    maximum_expiration_time = rounded_now + settings.DOMESTIC_MAXIMUM_ISSUANCE_DAYS * 24 * HOUR
+    validity = settings.DOMESTIC_STRIP_VALIDITY_HOURS * HOUR
 
     """
     Scrubber:              |
@@ -115,8 +156,10 @@ def calculate_attributes_from_blocks(contiguous_blocks: List[ContiguousOriginsBl
     Timeline:  Mar 2                                             Mar 30
     """
     for overlapping_block in contiguous_blocks:
+        block_expiration_time = _microseconds(overlapping_block.expirationTime)
         # Initialize the scrubber with time that is valid and not in the past. A scrubber is analogous to AV products.
-        expiration_time_scrubber = max(rounded_now, overlapping_block.validFrom)
+        expiration_time_scrubber = max(rounded_now, _microseconds(overlapping_block.validFrom))
+        attributes: Optional[Dict[str, Any]] = None
 
         # Give an attribute ('strip') until the time of the block is passed.
         while True:
@@ -125,40 +168,28 @@ def calculate_attributes_from_blocks(contiguous_blocks: List[ContiguousOriginsBl
 
             # Calculate the expiry time for this credential, considering the validity and random overlap,
             #  while it shouldn't be higher than the expiry time of this contiguous block
-            expiration_time_scrubber += timedelta(hours=settings.DOMESTIC_STRIP_VALIDITY_HOURS) - timedelta(
-                hours=rand_overlap_hours
-            )
-            expiration_time_scrubber = min(expiration_time_scrubber, overlapping_block.expirationTime)
+            expiration_time_scrubber += validity - rand_overlap_hours * HOUR
+            expiration_time_scrubber = min(expiration_time_scrubber, block_expiration_time)
 
             # Break out if we're past the range we're issuing in
             if expiration_time_scrubber >= maximum_expiration_time:
                 break
 
             # Finally add the credential
-            valid_from = expiration_time_scrubber - timedelta(hours=settings.DOMESTIC_STRIP_VALIDITY_HOURS)
-            # we only have one single holder across all origins, pick the first
-            holder = overlapping_block.origins[0].holder
-
-            # The signer only understands strings.
-            domestic_signer_attributes = DomesticSignerAttributes(
-                # mixing specimen with non-specimen requests is weird. We'll use what's in the first origin
-                isSpecimen="1" if overlapping_block.origins[0].isSpecimen else "0",
-                isPaperProof=StripType.APP_STRIP,
-                validFrom=str(int(valid_from.timestamp())),
-                validForHours=settings.DOMESTIC_STRIP_VALIDITY_HOURS,
-                firstNameInitial=holder.first_name_initial,
-                lastNameInitial=holder.last_name_initial,
-                # Dutch Birthdays can be unknown, supplied as 1970-XX-XX. See DutchBirthDate
-                birthDay=str(holder.birthDate.day) if holder.birthDate.day else "",
-                birthMonth=str(holder.birthDate.month) if holder.birthDate.month else "",
-            )
-            domestic_signer_attributes.strike()
-            attributes.append(domestic_signer_attributes)
+            if attributes is None:
+                attributes = block_attributes(overlapping_block)
+            strips.append(Strip((expiration_time_scrubber - validity) // SECOND, attributes))
 
             # Break out if we're done with this block
-            if expiration_time_scrubber == overlapping_block.expirationTime:
+            if expiration_time_scrubber == block_expiration_time:
                 break
 
+    return strips
+
+
+def calculate_attributes_from_blocks(contiguous_blocks: List[ContiguousOriginsBlock]) -> List[DomesticSignerAttributes]:
+    log.debug(f"Creating attributes from {len(contiguous_blocks)} ContiguousOriginsBlock.")
+    attributes = [strip.to_signer_attributes() for strip in calculate_strips_from_blocks(contiguous_blocks)]
     log.debug(f"Found {len(attributes)} attributes")
     return attributes
 
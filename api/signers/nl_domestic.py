@@ -13,9 +13,9 @@ from api.http_utils import request_post_with_retries
 from api.models import DomesticGreenCard, GreenCardOrigin, IssueMessage, RichOrigin, StaticIssueMessage
 
 
-def _sign_attributes(url, issue_message: StaticIssueMessage) -> str:
+async def _sign_attributes(url, issue_message: StaticIssueMessage) -> str:
     log.debug("Signing domestic attributes.")
-    response = request_post_with_retries(
+    response = await request_post_with_retries(
         url,
         issue_message.dict(),
         headers={"accept": "application/json", "Content-Type": "application/json"},
@@ -32,10 +32,10 @@ def _sign_attributes(url, issue_message: StaticIssueMessage) -> str:
         raise ValueError(f"could not sign attributes; error {qr_response.content}") from no_qr
 
 
-def _sign(url, data: Union[IssueMessage, StaticIssueMessage], origins: List[RichOrigin]) -> DomesticGreenCard:
+async def _sign(url, data: Union[IssueMessage, StaticIssueMessage], origins: List[RichOrigin]) -> DomesticGreenCard:
     log.debug(f"Signing domestic greencard for {len(origins)}.")
 
-    response = request_post_with_retries(
+    response = await request_post_with_retries(
         url,
         data=data.dict(),
         headers={"accept": "application/json", "Content-Type": "application/json"},
@@ -10,7 +10,7 @@ from typing import Optional
 
 from api.models import DomesticGreenCard, Events, IssueMessage
 from api.settings import settings
-from api.signers.logic import distill_relevant_events
+from api.signers.logic import DistillationContext
 from api.signers.logic_domestic import (
     create_origins_and_attributes,
     is_eligible_for_proof,
@@ -19,14 +19,18 @@ from api.signers.logic_domestic import (
 from api.signers.nl_domestic import _sign
 
 
-def sign(events: Events, prepare_issue_message: str, issue_commitment_message: str) -> Optional[DomesticGreenCard]:
+async def sign(
+    events: Events,
+    prepare_issue_message: str,
+    issue_commitment_message: str,
+    context: Optional[DistillationContext] = None,
+) -> Optional[DomesticGreenCard]:
     # This signer talks to: https://github.com/minvws/nl-covid19-coronacheck-idemix-private/
 
     if not settings.DOMESTIC_NL_DYNAMIC_SIGNER_ENABLED:
         return None
 
-    eligible_events = remove_domestic_ineligible_events(events)
-    eligible_events = distill_relevant_events(eligible_events)
+    eligible_events = (context or DistillationContext(events)).distill(remove_domestic_ineligible_events)
 
     if not is_eligible_for_proof(eligible_events):
         return None
@@ -47,4 +51,4 @@ def sign(events: Events, prepare_issue_message: str, issue_commitment_message: s
         }
     )
 
-    return _sign(settings.DOMESTIC_NL_VWS_ONLINE_SIGNING_URL, data=issue_message, origins=origins)
+    return await _sign(settings.DOMESTIC_NL_VWS_ONLINE_SIGNING_URL, data=issue_message, origins=origins)
@@ -9,7 +9,7 @@ from typing import Optional
 from api import log
 from api.models import DomesticPrintProof, DomesticSignerAttributes, Event, Events, StaticIssueMessage, StripType
 from api.settings import settings
-from api.signers.logic import distill_relevant_events
+from api.signers.logic import DistillationContext
 from api.signers.logic_domestic import (
     derive_print_validity_hours,
     is_eligible_for_proof,
@@ -36,7 +36,7 @@ def create_attributes(event: Event) -> DomesticSignerAttributes:
     return attributes
 
 
-def sign(events: Events) -> Optional[DomesticPrintProof]:
+async def sign(events: Events, context: Optional[DistillationContext] = None) -> Optional[DomesticPrintProof]:
 
     if not settings.DOMESTIC_NL_PRINT_SIGNER_ENABLED:
         return None
@@ -44,8 +44,7 @@ def sign(events: Events) -> Optional[DomesticPrintProof]:
     if not events or not events.events:
         return None
 
-    eligible_events = remove_domestic_ineligible_events(events)
-    eligible_events = distill_relevant_events(eligible_events)
+    eligible_events = (context or DistillationContext(events)).distill(remove_domestic_ineligible_events)
 
     if not eligible_events.events:
         return None
@@ -60,7 +59,7 @@ def sign(events: Events) -> Optional[DomesticPrintProof]:
 
     attributes = create_attributes(best_event)
     issue_message = StaticIssueMessage(credentialAttributes=attributes)
-    qr_data = _sign_attributes(settings.DOMESTIC_NL_VWS_PAPER_SIGNING_URL, issue_message)
+    qr_data = await _sign_attributes(settings.DOMESTIC_NL_VWS_PAPER_SIGNING_URL, issue_message)
 
     return DomesticPrintProof(
         attributes=attributes,
@@ -39,13 +39,11 @@ def test_validate_bearer():
 
 
 @freeze_time("2020-02-02")
-def test_sign_via_app_step_http_error(requests_mock):
-    requests_mock.post(
-        url=f"{settings.INGE6_BSN_RETRIEVAL_URL}",
+def test_sign_via_app_step_http_error(respx_mock):
+    respx_mock.post(url=f"{settings.INGE6_BSN_RETRIEVAL_URL}").respond(
         text='{"detail":"not found", "some_nonsense":"found"}',
         status_code=404,
     )
-    requests_mock.post(url="http://testserver/app/access_tokens/", real_http=True)
 
     client = TestClient(app)
     response = client.post(
@@ -58,16 +56,10 @@ def test_sign_via_app_step_http_error(requests_mock):
 
 # todo: add unhappy testcases to hit all the ways this endpoint can fail
 @freeze_time("2020-02-02")
-def test_sign_via_app_step_1(requests_mock, current_path, mocker):
-    requests_mock.post(
-        url=RVIG_URL,
-        text=read_file(f"{current_path}/rvig/999995571.xml"),
-    )
+def test_sign_via_app_step_1(requests_mock, respx_mock, current_path, mocker):
+    respx_mock.post(url=RVIG_URL).respond(text=read_file(f"{current_path}/rvig/999995571.xml"))
     encrypted_bsn = "MDEyMzQ1Njc4OTAxMjM0NTY3ODkwMUND6owfnEdTl4ZeCzPiQwdQNv39vIpNeMlJ8g=="  # bsn=999999138
-    requests_mock.post(
-        url=f"{settings.INGE6_BSN_RETRIEVAL_URL}",
-        text=encrypted_bsn,
-    )
+    respx_mock.post(url=f"{settings.INGE6_BSN_RETRIEVAL_URL}").respond(text=encrypted_bsn)
     requests_mock.post(url="http://testserver/app/access_tokens/", real_http=True)
 
     # Make sure the nonce is always the same
@@ -4,6 +4,7 @@
 #
 # SPDX-License-Identifier: EUPL-1.2
 #
+import asyncio
 import json
 from base64 import b64encode
 
@@ -18,12 +19,14 @@ from api.utils import read_file
 
 @freeze_time("2021-05-28")
 def test_app_credential_request(
-    mock_signers, requests_mock, current_path, redis_db  # noqa
+    mock_signers, requests_mock, current_path, async_redis_db  # noqa
 ):  # pylint: disable=unused-argument
     # mock redis, disableW0212 since we should be able to access private members for mocking
     # # create fake session:
-    session_store._redis = redis_db  # pylint: disable=W0212
-    session_token = session_store.store_message(b64encode(b'{"some": "data"}'))
+    session_store._redis = async_redis_db  # pylint: disable=W0212
+    session_token = asyncio.get_event_loop().run_until_complete(
+        session_store.store_message(b64encode(b'{"some": "data"}'))
+    )
 
     events = json5.loads(read_file(current_path.joinpath("test_data/events1.json5")))
     issuecommitmentmessage = b64encode(b'{"foo": "bar"}').decode("UTF-8")
@@ -87,13 +90,15 @@ def test_app_credential_request(
 
 @freeze_time("2021-06-22")
 def test_app_credential_request_alt(
-    mock_signers, requests_mock, current_path, redis_db  # noqa
+    mock_signers, requests_mock, current_path, async_redis_db  # noqa
 ):  # pylint: disable=unused-argument
     # Another end to end test.
     # mock redis, disableW0212 since we should be able to access private members for mocking
     # # create fake session:
-    session_store._redis = redis_db  # pylint: disable=W0212
-    session_token = session_store.store_message(b64encode(b'{"some": "data"}'))
+    session_store._redis = async_redis_db  # pylint: disable=W0212
+    session_token = asyncio.get_event_loop().run_until_complete(
+        session_store.store_message(b64encode(b'{"some": "data"}'))
+    )
 
     requests_mock.post("http://testserver/app/credentials/", real_http=True)
 
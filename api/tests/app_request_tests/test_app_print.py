@@ -12,6 +12,7 @@ from fastapi.testclient import TestClient
 from freezegun import freeze_time
 
 from api.app import app
+from api.settings import settings
 
 
 def createCredentialsRequestEvents(event: str) -> Dict[str, Any]:
@@ -20,12 +21,7 @@ def createCredentialsRequestEvents(event: str) -> Dict[str, Any]:
     return {"events": [{"signature": "", "payload": b64encode(json.dumps(data).encode()).decode("UTF-8")}]}
 
 
-@freeze_time("2021-06-09")
-def test_app_print(mock_signers, requests_mock, mocker):  # noqa # pylint: disable=unused-argument
-    mocker.patch("api.uci.random_unique_identifier", return_value="5717YIZIZFD3BMTEFA4CVU1337")
-    requests_mock.post("http://testserver/app/print/", real_http=True)
-
-    event = """{
+VACCINATION_EVENT = """{
           "protocolVersion": "3.0",
           "providerIdentifier": "GGD",
           "status": "complete",
@@ -55,8 +51,14 @@ def test_app_print(mock_signers, requests_mock, mocker):  # noqa # pylint: disab
           ]
     }"""
 
+
+@freeze_time("2021-06-09")
+def test_app_print(mock_signers, requests_mock, mocker):  # noqa # pylint: disable=unused-argument
+    mocker.patch("api.uci.random_unique_identifier", return_value="5717YIZIZFD3BMTEFA4CVU1337")
+    requests_mock.post("http://testserver/app/print/", real_http=True)
+
     client = TestClient(app)
-    response = client.post("/app/print/", json=createCredentialsRequestEvents(event))
+    response = client.post("/app/print/", json=createCredentialsRequestEvents(VACCINATION_EVENT))
 
     response_data = response.json()
 
@@ -100,3 +102,18 @@ def test_app_print(mock_signers, requests_mock, mocker):  # noqa # pylint: disab
             "qr": "A_QR_CODE",
         },
     }
+
+
+@freeze_time("2021-06-09")
+def test_app_print_signer_error(mock_signers, requests_mock, mocker):  # noqa # pylint: disable=unused-argument
+    # the domestic signer is called alongside the european one, the error of the latter is passed on
+    mocker.patch("api.uci.random_unique_identifier", return_value="5717YIZIZFD3BMTEFA4CVU1337")
+    requests_mock.post("http://testserver/app/print/", real_http=True)
+    mock_signers.post(settings.EU_INTERNATIONAL_SIGNING_URL).respond(400, json={"detail": "invalid dcc"})
+
+    client = TestClient(app)
+    response = client.post("/app/print/", json=createCredentialsRequestEvents(VACCINATION_EVENT))
+
+    assert response.status_code == 400
+    assert response.json() == {"detail": "invalid dcc"}
+    assert len(mock_signers.calls) == 2
@@ -7,9 +7,11 @@
 from fastapi.testclient import TestClient
 
 from api.app import app
+from api.session_store import session_store
 
 
-def test_health(redis_db):
+def test_health(async_redis_db):
+    session_store._redis = async_redis_db  # pylint: disable=W0212
     client = TestClient(app)
     response = client.get("/health")
     assert response.json() == {
@@ -17,12 +17,12 @@ from api.settings import settings
 
 
 @freeze_time("2021-05-20")
-def test_get_prepare_issue(redis_db, requests_mock):
+def test_get_prepare_issue(async_redis_db, requests_mock, respx_mock):
     # mock redis, disableW0212 since we should be able to access private members for mocking
-    session_store._redis = redis_db  # pylint: disable=W0212
+    session_store._redis = async_redis_db  # pylint: disable=W0212
 
     example_response = {"issuerPkId": "TST-KEY-01", "issuerNonce": "kdRNFRIzXiaeYAetJBQdMg==", "credentialAmount": 28}
-    requests_mock.post(settings.DOMESTIC_NL_VWS_PREPARE_ISSUE_URL, json=example_response)
+    respx_mock.post(settings.DOMESTIC_NL_VWS_PREPARE_ISSUE_URL).respond(text=json.dumps(example_response))
     requests_mock.post("http://testserver/app/prepare_issue/", real_http=True)
 
     client = TestClient(app)
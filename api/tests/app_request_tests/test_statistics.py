@@ -0,0 +1,18 @@
+# Copyright (c) 2020-2021 De Staat der Nederlanden, Ministerie van Volksgezondheid, Welzijn en Sport.
+#
+# Licensed under the EUROPEAN UNION PUBLIC LICENCE v. 1.2
+#
+# SPDX-License-Identifier: EUPL-1.2
+#
+from fastapi.testclient import TestClient
+
+from api.app import app
+
+
+def test_statistics():
+    client = TestClient(app)
+
+    response = client.get("/statistics")
+    assert response.status_code == 200
+    assert isinstance(response.json()["http_pools"], list)
+    assert "get_message" in response.json()["session_store"]["latency"]
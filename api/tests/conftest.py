@@ -5,14 +5,19 @@
 # SPDX-License-Identifier: EUPL-1.2
 #
 import asyncio
+import json
 
 # allow access of private variables for mocking purposes
 # pylint: disable=W0212
 import pytest
+import redis
+import redis.asyncio
+import respx
 
 from api.constants import INGE4_ROOT, TESTS_DIR
+from api.enrichment.rvig.cache import rvig_cache
 from api.session_store import session_store
-from api.settings import settings
+from api.settings import redis_settings, settings
 
 if settings.USE_PYTEST_REDIS:
 
@@ -20,14 +25,37 @@ if settings.USE_PYTEST_REDIS:
     def redis_db(redisdb):
         yield redisdb
 
+    @pytest.fixture
+    def async_redis_db(redis_proc, redisdb):  # pylint: disable=unused-argument
+        # The same redis as redis_db, that also empties it after the test. The asyncio client is bound to the loop
+        # of the test, so every test gets its own.
+        yield redis.asyncio.Redis(
+            host=redis_proc.host,
+            port=redis_proc.port,
+            username=redis_proc.username,
+            password=redis_proc.password,
+            unix_socket_path=redis_proc.unixsocket,
+        )
+
 
 else:
 
     @pytest.fixture
     def redis_db():
+        yield redis.Redis(**redis_settings.dict())
+
+    @pytest.fixture
+    def async_redis_db():
         yield session_store._redis
 
 
+@pytest.fixture(autouse=True)
+def empty_rvig_cache():
+    # Tests mock different answers of RVIG for the same bsn
+    rvig_cache.clear()
+    yield
+
+
 @pytest.fixture
 def root_path():
     yield INGE4_ROOT
@@ -52,13 +80,18 @@ else:
 
 
 @pytest.fixture
-def mock_signers(requests_mock):
+def mock_signers():
     """
     The structure retuned from these methods are _NOT_ close to the real answers. This mock is used
     to check internal rules, not signing itself and this mock should not be used in end to end / integration tests.
-    :param requests_mock:
+    Not every test talks to every signer, so unused routes are allowed. The json is dumped with the default
+    separators, as the signed responses are passed on as-is.
     :return:
     """
-    requests_mock.post(settings.EU_INTERNATIONAL_SIGNING_URL, json={"credential": "A_QR_CODE"})
-    requests_mock.post(settings.DOMESTIC_NL_VWS_ONLINE_SIGNING_URL, json={"credential": "A_QR_CODE"})
-    requests_mock.post(settings.DOMESTIC_NL_VWS_PAPER_SIGNING_URL, json={"qr": "A_QR_CODE"})
+    with respx.mock(assert_all_called=False) as respx_mock:
+        respx_mock.post(settings.EU_INTERNATIONAL_SIGNING_URL).respond(text=json.dumps({"credential": "A_QR_CODE"}))
+        respx_mock.post(settings.DOMESTIC_NL_VWS_ONLINE_SIGNING_URL).respond(
+            text=json.dumps({"credential": "A_QR_CODE"})
+        )
+        respx_mock.post(settings.DOMESTIC_NL_VWS_PAPER_SIGNING_URL).respond(text=json.dumps({"qr": "A_QR_CODE"}))
+        yield respx_mock
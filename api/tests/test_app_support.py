@@ -4,15 +4,36 @@
 #
 # SPDX-License-Identifier: EUPL-1.2
 #
+import json
+from base64 import b64encode
 from copy import deepcopy
 from datetime import datetime, timezone
 
+import pytest
+from fastapi import HTTPException
 from freezegun import freeze_time
-
-from api.app_support import decode_and_normalize_events, filter_specimen_events, has_unique_holder
-from api.models import DataProviderEventsResult, DutchBirthDate, Event, Events, EventType, Holder, Negativetest
+from pydantic import ValidationError
+
+from api.app_support import (
+    data_provider_events_results_to_events,
+    decode_and_normalize_events,
+    extract_results,
+    filter_specimen_events,
+    has_unique_holder,
+)
+from api.models import (
+    CMSSignedDataBlob,
+    DataProviderEventsResult,
+    DutchBirthDate,
+    Event,
+    Events,
+    EventType,
+    Holder,
+    Negativetest,
+)
 from api.tests.test_eu_signer import testcase_event_vaccination
 from api.tests.test_logic_domestic import get_testevents
+from api.tests.test_utils import DEFAULT_TEST_DATA, json_from_test_data_file
 
 holder1 = Holder(
     firstName="Bob",
@@ -129,3 +150,39 @@ def test_decode_and_normalize_events(current_path):
             ),
         ]
     )
+
+
+def two_pass_events(dp_event_json) -> Events:
+    # The decoding before extract_results validated straight into Event, kept as reference
+    result = DataProviderEventsResult(**dp_event_json)
+    return Events(
+        events=[
+            Event(source_provider_identifier=result.providerIdentifier, holder=result.holder, **dp_event.dict())
+            for dp_event in result.events
+        ]
+    )
+
+
+def test_extract_results_same_as_two_pass_validation():
+    test_data = json_from_test_data_file(DEFAULT_TEST_DATA)
+    for dp_event_json in test_data.values():
+        blob = CMSSignedDataBlob(signature="", payload=b64encode(json.dumps(dp_event_json).encode()).decode())
+        try:
+            expected = two_pass_events(dp_event_json)
+        except ValidationError:
+            with pytest.raises(HTTPException):
+                extract_results([blob])
+            continue
+
+        assert data_provider_events_results_to_events(extract_results([blob])) == expected
+
+
+def test_extract_results_invalid_holder():
+    dp_event_json = deepcopy(json_from_test_data_file(DEFAULT_TEST_DATA)["999990019"])
+    del dp_event_json["holder"]["lastName"]
+    blob = CMSSignedDataBlob(signature="", payload=b64encode(json.dumps(dp_event_json).encode()).decode())
+
+    with pytest.raises(HTTPException) as excinfo:
+        extract_results([blob])
+    # Only the holder is wrong, the events are not blamed for it
+    assert [error["loc"] for error in excinfo.value.detail] == [("holder", "lastName")]
@@ -0,0 +1,153 @@
+# Copyright (c) 2020-2021 De Staat der Nederlanden, Ministerie van Volksgezondheid, Welzijn en Sport.
+#
+# Licensed under the EUROPEAN UNION PUBLIC LICENCE v. 1.2
+#
+# SPDX-License-Identifier: EUPL-1.2
+#
+import json
+from base64 import b64encode
+from datetime import datetime, timedelta
+
+import pytest
+from cryptography import x509
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.asymmetric import ec
+from cryptography.hazmat.primitives.serialization import Encoding, pkcs7
+from cryptography.x509.oid import NameOID
+from fastapi import HTTPException
+
+from api import app_support
+from api.app_support import verify_cms_signatures
+from api.cms_signatures import CmsSignatureError, CmsVerifier
+from api.models import CMSSignedDataBlob
+from api.settings import settings
+
+PAYLOAD = json.dumps({"protocolVersion": "3.0", "providerIdentifier": "ZZZ", "status": "complete"}).encode()
+
+
+def new_certificate(name, issuer=None, ca=False, not_valid_after=None):
+    key = ec.generate_private_key(ec.SECP256R1())
+    issuer_certificate, issuer_key = issuer if issuer else (None, key)
+    subject = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, name)])
+    certificate = (
+        x509.CertificateBuilder()
+        .subject_name(subject)
+        .issuer_name(issuer_certificate.subject if issuer_certificate else subject)
+        .public_key(key.public_key())
+        .serial_number(x509.random_serial_number())
+        .not_valid_before(datetime.utcnow() - timedelta(days=1))
+        .not_valid_after(not_valid_after or datetime.utcnow() + timedelta(days=30))
+        .add_extension(x509.BasicConstraints(ca=ca, path_length=None), critical=True)
+        .sign(issuer_key, hashes.SHA256())
+    )
+    return certificate, key
+
+
+def sign(payload, signer, options=()):
+    certificate, key = signer
+    return (
+        pkcs7.PKCS7SignatureBuilder()
+        .set_data(payload)
+        .add_signer(certificate, key, hashes.SHA256())
+        .sign(Encoding.DER, [pkcs7.PKCS7Options.DetachedSignature, pkcs7.PKCS7Options.Binary, *options])
+    )
+
+
+@pytest.fixture(name="provider_ca")
+def fixture_provider_ca():
+    return new_certificate("ZZZ CA", ca=True)
+
+
+@pytest.fixture(name="verifier")
+def fixture_verifier(tmp_path, provider_ca):
+    (tmp_path / "zzz_cms.crt").write_bytes(provider_ca[0].public_bytes(Encoding.PEM))
+    return CmsVerifier(
+        settings.copy(
+            update={
+                "CMS_SIGNATURE_VERIFICATION_ENABLED": True,
+                "CMS_SIGNATURE_VERIFICATION_THREADS": 4,
+                "SECRETS_FOLDER": tmp_path,
+            }
+        ),
+        provider_configs=[{"identifier": "ZZZ", "cms_certificates": ["zzz_cms.crt"]}, {"identifier": "XXX"}],
+    )
+
+
+def test_verify_signature_of_provider(verifier, provider_ca):
+    signer = new_certificate("ZZZ signing", issuer=provider_ca)
+    verifier.verify("ZZZ", sign(PAYLOAD, signer), PAYLOAD)
+    # Without signed attributes the signature is over the payload itself
+    verifier.verify("ZZZ", sign(PAYLOAD, signer, [pkcs7.PKCS7Options.NoAttributes]), PAYLOAD)
+
+    with pytest.raises(CmsSignatureError, match="not the digest of the payload"):
+        verifier.verify("ZZZ", sign(PAYLOAD, signer), PAYLOAD.replace(b"complete", b"pending!"))
+
+    with pytest.raises(CmsSignatureError, match="not issued by a certificate of the provider"):
+        verifier.verify("ZZZ", sign(PAYLOAD, new_certificate("Someone else")), PAYLOAD)
+
+    with pytest.raises(CmsSignatureError, match="No CMS certificates for provider XXX"):
+        verifier.verify("XXX", sign(PAYLOAD, signer), PAYLOAD)
+
+    with pytest.raises(CmsSignatureError, match="could not be read"):
+        verifier.verify("ZZZ", b"not a signature", PAYLOAD)
+
+    statistics = verifier.statistics()
+    assert statistics.verified == 2
+    assert statistics.failed == 4
+    assert statistics.latency["ZZZ"].count == 5
+
+
+def test_verify_signature_with_pinned_certificate(tmp_path):
+    signer = new_certificate("ZZZ signing")
+    (tmp_path / "zzz_cms.crt").write_bytes(signer[0].public_bytes(Encoding.PEM))
+    verifier = CmsVerifier(
+        settings.copy(update={"SECRETS_FOLDER": tmp_path}),
+        provider_configs=[{"identifier": "ZZZ", "cms_certificates": ["zzz_cms.crt"]}],
+    )
+
+    verifier.verify("ZZZ", sign(PAYLOAD, signer), PAYLOAD)
+
+
+def test_verify_signature_expired_certificate(verifier, provider_ca):
+    signer = new_certificate("ZZZ signing", issuer=provider_ca, not_valid_after=datetime.utcnow() - timedelta(hours=1))
+
+    with pytest.raises(CmsSignatureError, match="is not valid now"):
+        verifier.verify("ZZZ", sign(PAYLOAD, signer), PAYLOAD)
+
+
+def test_verified_chains_are_cached(verifier, provider_ca):
+    signer = new_certificate("ZZZ signing", issuer=provider_ca)
+    for _ in range(3):
+        verifier.verify("ZZZ", sign(PAYLOAD, signer), PAYLOAD)
+
+    statistics = verifier.statistics()
+    assert statistics.chain_cache_misses == 1
+    assert statistics.chain_cache_hits == 2
+
+
+@pytest.mark.asyncio
+async def test_verify_all(verifier, provider_ca):
+    signer = new_certificate("ZZZ signing", issuer=provider_ca)
+    signed_payloads = [("ZZZ", sign(PAYLOAD, signer), PAYLOAD)] * 4
+    signed_payloads[2] = ("ZZZ", sign(PAYLOAD, new_certificate("Someone else")), PAYLOAD)
+
+    errors = await verifier.verify_all(signed_payloads)
+    assert [error is None for error in errors] == [True, True, False, True]
+    assert isinstance(errors[2], CmsSignatureError)
+    verifier.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_verify_cms_signatures(verifier, provider_ca, monkeypatch):
+    monkeypatch.setattr(app_support, "cms_verifier", verifier)
+    signer = new_certificate("ZZZ signing", issuer=provider_ca)
+    blob = CMSSignedDataBlob(signature=b64encode(sign(PAYLOAD, signer)).decode(), payload=b64encode(PAYLOAD).decode())
+
+    await verify_cms_signatures([blob])
+
+    unsigned = CMSSignedDataBlob(signature="", payload=blob.payload)
+    with pytest.raises(HTTPException) as excinfo:
+        await verify_cms_signatures([blob, unsigned])
+    assert excinfo.value.status_code == 422
+    assert [error["loc"] for error in excinfo.value.detail] == [["body", 1, "signature"]]
+    verifier.shutdown()
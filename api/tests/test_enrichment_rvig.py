@@ -4,10 +4,22 @@
 #
 # SPDX-License-Identifier: EUPL-1.2
 #
+import asyncio
+import os
+
+import httpx
 import pytest
 from fastapi import HTTPException
 
-from api.enrichment.rvig.rvig import get_pii_from_rvig, health, rvig_birtdate_to_dutch_birthdate
+from api.constants import INGE4_ROOT
+from api.enrichment.rvig.rvig import (
+    client,
+    create_rvig_client,
+    get_pii_from_rvig,
+    health,
+    rvig_birtdate_to_dutch_birthdate,
+)
+from api.enrichment.rvig.vraag_response import Resultaat, VraagAntwoord, parse_vraag_response
 from api.models import DutchBirthDate as Dbd
 from api.models import Holder, ServiceHealth
 from api.settings import settings
@@ -20,39 +32,117 @@ if settings.RVIG_ENVIRONMENT == "mock":
 else:
     RVIG_URL = f"https://147.181.7.110{RVIG_PATH}"
 
+RVIG_FIXTURES = sorted(os.listdir(f"{INGE4_ROOT}/api/tests/rvig"))
+
+
+def zeep_vraag_antwoord(content: bytes) -> VraagAntwoord:
+    """
+    The answer as it was read before parse_vraag_response: deserialized by zeep and walked through.
+    """
+    binding = client.service._binding  # pylint: disable=protected-access
+    response = client.transport.new_response(
+        httpx.Response(200, content=content, request=httpx.Request("POST", "http://rvig"))
+    )
+    vraag_response = client.get_element("ns0:vraagResponse")(
+        binding.process_reply(client, binding.get("vraag"), response)
+    )
+
+    res = vraag_response.vraagReturn.resultaat
+    voornamen, geslachtsnaam, geboortedatum = "", "", ""
+    for persoonslijst in (
+        vraag_response.vraagReturn.persoonslijsten.item if vraag_response.vraagReturn.persoonslijsten else []
+    ):
+        for categoriestapel in persoonslijst.categoriestapels.item:
+            for categorievoorkomen in categoriestapel.categorievoorkomens.item:
+                if categorievoorkomen.categorienummer != 1:
+                    continue
+                for element in categorievoorkomen.elementen.item:
+                    if element.nummer == 210:
+                        voornamen = element.waarde or voornamen
+                    if element.nummer == 240:
+                        geslachtsnaam = element.waarde or geslachtsnaam
+                    if element.nummer == 310:
+                        geboortedatum = element.waarde or geboortedatum
+
+    return VraagAntwoord(
+        resultaat=Resultaat(code=res.code, letter=res.letter, omschrijving=res.omschrijving, referentie=res.referentie),
+        voornamen=voornamen,
+        geslachtsnaam=geslachtsnaam,
+        geboortedatum=geboortedatum,
+    )
+
+
+@pytest.mark.parametrize("fixture", RVIG_FIXTURES)
+def test_parse_vraag_response_as_zeep(fixture, current_path):
+    with open(f"{current_path}/rvig/{fixture}", "rb") as file:
+        content = file.read()
+
+    assert parse_vraag_response(content) == zeep_vraag_antwoord(content)
+
+
+def test_parse_vraag_response(current_path):
+    with open(f"{current_path}/rvig/999995005.xml", "rb") as file:
+        assert parse_vraag_response(file.read()) == VraagAntwoord(
+            resultaat=Resultaat(code=33, letter="G", omschrijving="Geen gegevens gevonden.", referentie="94988422"),
+            voornamen="",
+            geslachtsnaam="",
+            geboortedatum="",
+        )
+
+    # No resultaat is no success
+    assert parse_vraag_response(b"<vraagResponse><vraagReturn/></vraagResponse>").resultaat.code is None
+
 
-def test_get_pii_unhappy_flows(requests_mock, current_path, caplog):
+@pytest.mark.asyncio
+async def test_get_pii_soap_fault(respx_mock):
+    fault = (
+        '<soap:Envelope xmlns:soap="http://schemas.xmlsoap.org/soap/envelope/"><soap:Body><soap:Fault>'
+        "<faultcode>soap:Server</faultcode><faultstring>Internal error</faultstring></soap:Fault></soap:Body>"
+        "</soap:Envelope>"
+    )
+    respx_mock.post(url=RVIG_URL).respond(status_code=500, text=fault)
+    with pytest.raises(HTTPException):
+        await get_pii_from_rvig("999995571")
+
+    respx_mock.post(url=RVIG_URL).respond(text="<not xml")
+    with pytest.raises(HTTPException):
+        await get_pii_from_rvig("999995571")
+
+
+@pytest.mark.asyncio
+async def test_get_pii_unhappy_flows(respx_mock, current_path, caplog):
     # PL met geboortedatum 19710000
-    requests_mock.post(url=RVIG_URL, text=read_file(f"{current_path}/rvig/999995844.xml"))
-    assert get_pii_from_rvig("999995844") == Holder(
+    respx_mock.post(url=RVIG_URL).respond(text=read_file(f"{current_path}/rvig/999995844.xml"))
+    assert await get_pii_from_rvig("999995844") == Holder(
         firstName="Bernhard", lastName="Boer", birthDate=Dbd("1971-XX-XX"), infix=None
     )
 
     # technical error
     with pytest.raises(HTTPException):
-        requests_mock.post(url=RVIG_URL, text=read_file(f"{current_path}/rvig/1_technical_error.xml"))
-        get_pii_from_rvig("999995844")
+        respx_mock.post(url=RVIG_URL).respond(text=read_file(f"{current_path}/rvig/1_technical_error.xml"))
+        await get_pii_from_rvig("999995844")
         assert "RVIG fout. Code: 1, Letter: X, Omschrijving: Aantal: 1., Referentie: 94982454." in caplog.text
 
     with pytest.raises(HTTPException):
-        requests_mock.post(url=RVIG_URL, text=read_file(f"{current_path}/rvig/999995005.xml"))
-        get_pii_from_rvig("999995005")
+        respx_mock.post(url=RVIG_URL).respond(text=read_file(f"{current_path}/rvig/999995005.xml"))
+        await get_pii_from_rvig("999995005")
         assert (
             "RVIG fout. Code: 33, Letter: G, Omschrijving: Geen gegevens gevonden., Referentie: 94988422."
             in caplog.text
         )
 
 
-def test_get_pii_happy_flow(requests_mock, current_path):
-    requests_mock.post(url=RVIG_URL, text=read_file(f"{current_path}/rvig/999995571.xml"))
-    assert get_pii_from_rvig("999995571") == Holder(
+@pytest.mark.asyncio
+async def test_get_pii_happy_flow(respx_mock, current_path):
+    respx_mock.post(url=RVIG_URL).respond(text=read_file(f"{current_path}/rvig/999995571.xml"))
+    assert await get_pii_from_rvig("999995571") == Holder(
         firstName="Naomi", lastName="Goede", birthDate=Dbd("1987-04-01"), infix=None
     )
 
     # with diacritics
     lastna = "T.Śar ŃĆ ĹāÑ ŤÙmön ĊéŴÀŅŇĩ Ļl'ÁÚŘŠĎÉ Pomme-d' Or ĽÒÓĢÛŨ\n                                                "
-    requests_mock.post(url=RVIG_URL, text=read_file(f"{current_path}/rvig/999990743.xml"))
-    assert get_pii_from_rvig("999990743") == Holder(
+    respx_mock.post(url=RVIG_URL).respond(text=read_file(f"{current_path}/rvig/999990743.xml"))
+    assert await get_pii_from_rvig("999990743") == Holder(
         firstName="Ŗî Ãō Øū Ŋÿ Ği ŢžŰŲ ŜŞőĠĪ Ŷŵ Ĉŷ",
         lastName=lastna,
         birthDate=Dbd("2010-01-01"),
@@ -63,26 +153,40 @@ def test_get_pii_happy_flow(requests_mock, current_path):
 @pytest.mark.skip(reason="Useful for gathering testdata from rvig.")
 # 999990743, 999994888, 4322630, 4322320
 @pytest.mark.parametrize("bsn", [999995844])
-def test_manually(bsn):
+@pytest.mark.asyncio
+async def test_manually(bsn):
     # Invalid BSN is no data found, code 33
-    get_pii_from_rvig(bsn)
+    await get_pii_from_rvig(bsn)
 
 
 @pytest.mark.skip(reason="Only useful for distilling new testcases from the RVIG test environment")
 @pytest.mark.parametrize("bsn", [999994979, 999994991, "XX"])
-def test_error_scenarios(bsn):
+@pytest.mark.asyncio
+async def test_error_scenarios(bsn):
     # Invalid BSN is no data found, code 33
-    get_pii_from_rvig(bsn)
+    await get_pii_from_rvig(bsn)
 
 
 @require_rvig_mock
-def test_rvig_mock():
+@pytest.mark.asyncio
+async def test_rvig_mock():
     # todo: alter settings to talk to mock.
-    assert get_pii_from_rvig("999990019") == Holder(
+    assert await get_pii_from_rvig("999990019") == Holder(
         firstName="Bob", lastName="Bouwer", birthDate=Dbd("1960-01-01"), infix=""
     )
 
 
+def test_create_rvig_client_cert(mocker):
+    mocker.patch.object(settings, "RVIG_CONNECT_WITHOUT_CERT", False)
+    rvig_client, _ = create_rvig_client()
+    assert rvig_client.transport.client_options["cert"] == settings.RVIG_CERT
+
+    # Only without the certificate when that is set explicitly, not when the file is missing
+    mocker.patch.object(settings, "RVIG_CONNECT_WITHOUT_CERT", True)
+    rvig_client, _ = create_rvig_client()
+    assert rvig_client.transport.client_options["cert"] is None
+
+
 def test_rvig_birtdate_to_dutch_birthdate():
     assert rvig_birtdate_to_dutch_birthdate("19831228") == "1983-12-28"
     assert rvig_birtdate_to_dutch_birthdate("19831200") == "1983-12-XX"
@@ -91,21 +195,45 @@ def test_rvig_birtdate_to_dutch_birthdate():
     assert rvig_birtdate_to_dutch_birthdate("00000000") == "1900-XX-XX"
 
 
-def test_health_not_healthy():
+@pytest.mark.asyncio
+async def test_health_not_healthy(respx_mock):
     # health without config results in errors:
-    ret = health()
+    respx_mock.post(url=RVIG_URL).mock(side_effect=httpx.ConnectError("No route to host"))
+    ret = await health()
     assert ret == [ServiceHealth(service="rvig", is_healthy=False, message="Could not perform test call.")]
 
 
-def test_health_healthy(requests_mock, current_path):
+@pytest.mark.asyncio
+async def test_health_healthy(respx_mock, current_path):
     # health without config results in errors:
-    requests_mock.post(url=RVIG_URL, text=read_file(f"{current_path}/rvig/999995844.xml"))
-    ret = health()
+    respx_mock.post(url=RVIG_URL).respond(text=read_file(f"{current_path}/rvig/999995844.xml"))
+    ret = await health()
     assert ret == [ServiceHealth(service="rvig", is_healthy=True, message="Data request successful")]
 
 
-def test_missing_data_wrong_category(requests_mock, current_path):
-    requests_mock.post(url=RVIG_URL, text=read_file(f"{current_path}/rvig/wrong_category.xml"))
-    assert get_pii_from_rvig("999995571") == Holder(
+@pytest.mark.asyncio
+async def test_missing_data_wrong_category(respx_mock, current_path):
+    respx_mock.post(url=RVIG_URL).respond(text=read_file(f"{current_path}/rvig/wrong_category.xml"))
+    assert await get_pii_from_rvig("999995571") == Holder(
         firstName="Naomi", lastName="Goede", birthDate=Dbd("1987-04-01"), infix=None
     )
+
+
+@pytest.mark.asyncio
+async def test_lookups_overlap(respx_mock, current_path):
+    answer = read_file(f"{current_path}/rvig/999995571.xml")
+    in_flight, peak_in_flight = 0, 0
+
+    async def slow_rvig(_request):
+        nonlocal in_flight, peak_in_flight
+        in_flight += 1
+        peak_in_flight = max(peak_in_flight, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        return httpx.Response(200, text=answer)
+
+    respx_mock.post(url=RVIG_URL).mock(side_effect=slow_rvig)
+    holders = await asyncio.gather(*[get_pii_from_rvig("999995571") for _ in range(3)])
+
+    assert all(holder.firstName == "Naomi" for holder in holders)
+    assert peak_in_flight == 3
@@ -13,6 +13,7 @@ import json
 from typing import Any, Dict, List
 
 import pytz
+import pytest
 from freezegun import freeze_time
 
 from api.models import (
@@ -30,12 +31,8 @@ from api.models import (
     MessageToEUSigner,
 )
 from api.settings import settings
-from api.signers.eu_international import (
-    create_eu_signer_message,
-    distill_relevant_events,
-    remove_eu_ineligible_events,
-    sign,
-)
+from api.signers.eu_international import create_eu_signer_message, remove_eu_ineligible_events, sign
+from api.signers.logic import distill_relevant_events
 from api.signers.logic_eu import EU_INTERNATIONAL_SPECIMEN_EXPIRATION_TIME
 
 
@@ -52,8 +49,9 @@ def _create_events(incoming_events: List[Dict[str, Any]]) -> Events:
     return events
 
 
+@pytest.mark.asyncio
 @freeze_time("2021-06-13T19:20:21+00:00")
-def test_n010(requests_mock):
+async def test_n010(respx_mock):
     """
     1 neg testbewijs antigen (sneltest = RAT)
 
@@ -124,8 +122,8 @@ def test_n010(requests_mock):
     assert signing_messages == expected_signing_messages
 
     example_answer = {"credential": "HC1:NCF%RN%TSMAHN-HCPGHC1*960EM:RH+R61RO9.S4UO+%G"}
-    requests_mock.post(settings.EU_INTERNATIONAL_SIGNING_URL, json=example_answer)
-    greencards = sign(events)
+    respx_mock.post(settings.EU_INTERNATIONAL_SIGNING_URL).respond(json=example_answer)
+    greencards = await sign(events)
 
     expected_greencards = [
         EUGreenCard(
@@ -146,8 +144,9 @@ def test_n010(requests_mock):
     assert greencards == expected_greencards
 
 
+@pytest.mark.asyncio
 @freeze_time("2021-06-13T19:20:21+00:00")
-def test_n030(requests_mock):
+async def test_n030(respx_mock):
     """
     1 neg testbewijs breathalizer (sneltest)
 
@@ -196,8 +195,8 @@ def test_n030(requests_mock):
     assert signing_messages == expected_signing_messages
 
     example_answer = {"credential": "HC1:NCF%RN%TSMAHN-HCPGHC1*960EM:RH+R61RO9.S4UO+%G"}
-    requests_mock.post(settings.EU_INTERNATIONAL_SIGNING_URL, json=example_answer)
-    answer = sign(events)
+    respx_mock.post(settings.EU_INTERNATIONAL_SIGNING_URL).respond(json=example_answer)
+    answer = await sign(events)
 
     assert answer == []
 
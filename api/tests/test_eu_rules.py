@@ -14,12 +14,14 @@ https://docs.google.com/spreadsheets/d/1d66HXvh9bxZTwlTqaxxqE-IKmv22MkB8isZj87a-
 # Kopieer e.e.a. dus.
 # from api.models import Event
 import datetime
+import random
 from copy import deepcopy
 
 import pytest
 
 from api.models import Event, Events
 from api.signers.logic import (
+    _deduplicate,
     _identical_negative_tests,
     _identical_positive_tests,
     _identical_recoveries,
@@ -186,6 +188,81 @@ def test_deduplicate_other_events():
         assert deduplicated.events == [event_1]
 
 
+def _quadratic_deduplicate(events, events_are_identical_func, merge_func):
+    # The comparison of every event with every retained event that was used before the bucketed deduplication.
+    retained = []
+    for event in events:
+        if event in retained:
+            continue
+        merged = False
+        for ret in retained:
+            if events_are_identical_func(ret, event):
+                merge_func(ret, event)
+                merged = True
+        if not merged:
+            retained.append(event)
+    return retained
+
+
+def _random_events(seed: int, amount: int):
+    generator = random.Random(seed)
+    events = []
+    for number in range(amount):
+        event_type = generator.choice([DEFAULT_PFIZER_VACCINATION, DEFAULT_NEGATIVE_TEST, DEFAULT_RECOVERY])
+        event = Event(**deepcopy(event_type))
+        event.unique = str(number)
+        day = datetime.date(2021, 2, 1) + datetime.timedelta(days=generator.randint(0, 30))
+        if event.vaccination:
+            event.vaccination.date = day
+            event.vaccination.hpkCode = generator.choice(["2934701", "2924528", None])
+            event.vaccination.type = generator.choice(["1119349007", None])
+            event.vaccination.doseNumber = generator.choice([1, 2, None])
+        if event.negativetest:
+            event.negativetest.sampleDate = datetime.datetime(
+                day.year, day.month, day.day, generator.randint(0, 23), tzinfo=datetime.timezone.utc
+            )
+            event.negativetest.facility = generator.choice(["GGD XL Amsterdam", "GGD Rotterdam"])
+        if event.recovery:
+            event.recovery.sampleDate = day
+            event.recovery.country = generator.choice(["NLD", "BEL"])
+        events.append(event)
+    return Events(events=events)
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_deduplicate_same_as_comparing_all_events(seed):
+    events = _random_events(seed, 40)
+    reference = deepcopy(events)
+
+    for kind, identical, merge in [
+        ("vaccinations", _identical_vaccinations, _merge_vaccinations),
+        ("negativetests", _identical_negative_tests, _merge_negative_tests),
+        ("recoveries", _identical_recoveries, _merge_recoveries),
+    ]:
+        expected = _quadratic_deduplicate(getattr(reference, kind), identical, merge)
+        deduplicated = getattr(deduplicate_events(deepcopy(events)), kind)
+        assert [event.unique for event in deduplicated] == [event.unique for event in expected]
+        assert deduplicated == expected
+
+
+def test_deduplicate_many_events():
+    # every event is just outside the margin of the previous one, so nothing is merged
+    events = []
+    for day in range(1000):
+        event = Event(**deepcopy(DEFAULT_NEGATIVE_TEST))
+        event.negativetest.sampleDate += datetime.timedelta(days=day * 3)
+        events.append(event)
+
+    deduplicated = _deduplicate(
+        events,
+        _identical_negative_tests,
+        _merge_negative_tests,
+        bucket_func=lambda e: None,
+        date_func=lambda e: e.negativetest.sampleDate,
+    )
+    assert len(deduplicated) == 1000
+
+
 def test_not_really_similar_events():
     # These recoveries are just a little bit different: they are not the same.
     # All events have country fields, these can differ and thus hit other parts of the code.
@@ -4,8 +4,12 @@
 #
 # SPDX-License-Identifier: EUPL-1.2
 #
+import asyncio
+import json
 from datetime import date, datetime, timezone
 
+import httpx
+import pytest
 from freezegun import freeze_time
 
 from api.models import DutchBirthDate, EUGreenCard, Events
@@ -274,27 +278,67 @@ testGreenCard = EUGreenCard(
 )
 
 
+@pytest.mark.asyncio
 @freeze_time("2021-02-02")
-def test_eusign_separate(requests_mock):
+async def test_eusign_separate(respx_mock):
     example_answer = {"credential": "HC1:NCF%RN%TSMAHN-HCPGHC1*960EM:RH+R61RO9.S4UO+%G"}
-    requests_mock.post(settings.EU_INTERNATIONAL_SIGNING_URL, json=example_answer)
-    answer = sign(Events(**{"events": [testcase_event_vaccination]}))
+    respx_mock.post(settings.EU_INTERNATIONAL_SIGNING_URL).respond(json=example_answer)
+    answer = await sign(Events(**{"events": [testcase_event_vaccination]}))
     assert answer == [vaccinationGreenCard]
 
-    answer = sign(Events(**{"events": [testcase_event_recovery]}))
+    answer = await sign(Events(**{"events": [testcase_event_recovery]}))
     assert answer == [recoveryGreenCard]
 
-    answer = sign(Events(**{"events": [testcase_event_negativetest]}))
+    answer = await sign(Events(**{"events": [testcase_event_negativetest]}))
     assert answer == [testGreenCard]
 
-    answer = sign(Events(**{"events": [testcase_event_positivetest]}))
+    answer = await sign(Events(**{"events": [testcase_event_positivetest]}))
     assert answer == [convertedPositiveTestToRecoveryGreencard]
 
 
+@pytest.mark.asyncio
 @freeze_time("2021-02-02")
-def test_eusign_all_events(requests_mock):
+async def test_eusign_all_events(respx_mock):
     example_answer = {"credential": "HC1:NCF%RN%TSMAHN-HCPGHC1*960EM:RH+R61RO9.S4UO+%G"}
-    requests_mock.post(settings.EU_INTERNATIONAL_SIGNING_URL, json=example_answer)
-    answer = sign(Events(**testcase_events))
+    respx_mock.post(settings.EU_INTERNATIONAL_SIGNING_URL).respond(json=example_answer)
+    answer = await sign(Events(**testcase_events))
 
     assert answer == [vaccinationGreenCard, convertedPositiveTestToRecoveryGreencard, testGreenCard, recoveryGreenCard]
+
+
+@pytest.mark.asyncio
+@freeze_time("2021-02-02")
+async def test_eusign_messages_concurrently_in_order(respx_mock, mocker):
+    mocker.patch.object(settings, "EU_INTERNATIONAL_SIGNING_CONCURRENCY", 2)
+    in_flight, peak_in_flight = 0, 0
+
+    async def slow_signer(request):
+        nonlocal in_flight, peak_in_flight
+        in_flight += 1
+        peak_in_flight = max(peak_in_flight, in_flight)
+        # the first message gets its answer last. Frozen time also freezes the event loop clock, so yield instead.
+        for _ in range(20 if json.loads(request.content)["keyUsage"] == "vaccination" else 2):
+            await asyncio.sleep(0)
+        in_flight -= 1
+        return httpx.Response(200, json={"credential": "HC1:NCF%RN%TSMAHN-HCPGHC1*960EM:RH+R61RO9.S4UO+%G"})
+
+    respx_mock.post(settings.EU_INTERNATIONAL_SIGNING_URL).mock(side_effect=slow_signer)
+    answer = await sign(Events(**testcase_events))
+
+    assert answer == [vaccinationGreenCard, convertedPositiveTestToRecoveryGreencard, testGreenCard, recoveryGreenCard]
+    assert peak_in_flight == 2
+
+
+@pytest.mark.asyncio
+@freeze_time("2021-02-02")
+async def test_eusign_failure_does_not_cancel_other_messages(respx_mock):
+    def signer(request):
+        if json.loads(request.content)["keyUsage"] == "test":
+            return httpx.Response(400, json={"error": "invalid"})
+        return httpx.Response(200, json={"credential": "HC1:NCF%RN%TSMAHN-HCPGHC1*960EM:RH+R61RO9.S4UO+%G"})
+
+    route = respx_mock.post(settings.EU_INTERNATIONAL_SIGNING_URL).mock(side_effect=signer)
+    with pytest.raises(httpx.HTTPStatusError):
+        await sign(Events(**testcase_events))
+
+    assert route.call_count == 4
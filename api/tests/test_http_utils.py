@@ -0,0 +1,109 @@
+# Copyright (c) 2020-2021 De Staat der Nederlanden, Ministerie van Volksgezondheid, Welzijn en Sport.
+#
+# Licensed under the EUROPEAN UNION PUBLIC LICENCE v. 1.2
+#
+# SPDX-License-Identifier: EUPL-1.2
+#
+import asyncio
+
+import httpx
+import pytest
+
+from api.http_utils import UpstreamClients, request_get_with_retries, request_post_with_retries
+from api.settings import settings
+
+URL = "http://signer.local/endpoint"
+
+
+@pytest.mark.asyncio
+async def test_status_codes_are_retried_for_idempotent_methods(respx_mock):
+    route = respx_mock.get(URL).mock(side_effect=[httpx.Response(503), httpx.Response(200, json={"ok": True})])
+
+    response = await request_get_with_retries(URL, None, exponential_retries=1)
+    assert response.status_code == 200
+    assert response.json() == {"ok": True}
+    assert route.call_count == 2
+
+
+@pytest.mark.asyncio
+async def test_status_codes_are_not_retried_for_post(respx_mock):
+    route = respx_mock.post(URL).mock(side_effect=[httpx.Response(503), httpx.Response(200)])
+
+    response = await request_post_with_retries(URL, {"a": 1}, exponential_retries=1)
+    assert response.status_code == 503
+    assert route.call_count == 1
+    assert route.calls.last.request.content == b'{"a": 1}'
+
+
+@pytest.mark.asyncio
+async def test_connection_errors_are_retried_for_post(respx_mock):
+    route = respx_mock.post(URL).mock(side_effect=[httpx.ConnectError("refused"), httpx.Response(200)])
+
+    response = await request_post_with_retries(URL, {"a": 1}, exponential_retries=1)
+    assert response.status_code == 200
+    assert route.call_count == 2
+
+
+@pytest.mark.asyncio
+async def test_retries_are_exhausted(respx_mock):
+    respx_mock.post(URL).mock(side_effect=httpx.ConnectError("refused"))
+
+    with pytest.raises(httpx.ConnectError):
+        await request_post_with_retries(URL, {"a": 1}, exponential_retries=1)
+
+    respx_mock.get(URL).respond(503)
+    response = await request_get_with_retries(URL, None, exponential_retries=2, backoff_factor=0)
+    assert response.status_code == 503
+
+
+@pytest.mark.asyncio
+async def test_one_pool_per_upstream(respx_mock):
+    respx_mock.get(URL).mock(return_value=httpx.Response(200))
+    respx_mock.get("http://signer.local:8080/other").mock(return_value=httpx.Response(200))
+
+    clients = UpstreamClients(settings)
+    first_pool = clients.pool_for(URL)
+    assert clients.pool_for("http://signer.local:80/another") is first_pool
+    assert clients.pool_for("http://signer.local:8080/other") is not first_pool
+
+    await first_pool.request("GET", URL, timeout=httpx.Timeout(1))
+    await first_pool.request("GET", URL, timeout=httpx.Timeout(1))
+    assert first_pool.get_client() is first_pool.client
+
+    statistics = {pool.upstream: pool for pool in clients.statistics()}
+    assert statistics["http://signer.local:80"].requests == 2
+    assert statistics["http://signer.local:80"].in_flight == 0
+    assert statistics["http://signer.local:8080"].requests == 0
+    await clients.aclose()
+
+
+@pytest.mark.asyncio
+async def test_connections_are_kept_alive():
+    connections = []
+
+    async def keep_alive_server(reader, writer):
+        connections.append(writer)
+        try:
+            while await reader.readuntil(b"\r\n\r\n"):
+                writer.write(b"HTTP/1.1 200 OK\r\nContent-Length: 2\r\n\r\nok")
+                await writer.drain()
+        except asyncio.IncompleteReadError:
+            writer.close()
+
+    server = await asyncio.start_server(keep_alive_server, "127.0.0.1", 0)
+    url = f"http://127.0.0.1:{server.sockets[0].getsockname()[1]}/"
+
+    clients = UpstreamClients(settings)
+    pool = clients.pool_for(url)
+    for _ in range(3):
+        response = await pool.request("GET", url, timeout=httpx.Timeout(1))
+        assert response.text == "ok"
+
+    await clients.aclose()
+    server.close()
+
+    assert len(connections) == 1
+    statistics = pool.statistics()
+    assert statistics.requests == 3
+    assert statistics.new_connections == 1
+    assert statistics.reuse_rate == pytest.approx(2 / 3)
@@ -4,10 +4,12 @@
 #
 # SPDX-License-Identifier: EUPL-1.2
 #
+import jwt
 import pytest
 from freezegun import freeze_time
 
 from api.models import DutchBirthDate, Holder
+from api.requesters.event_data_providers import EventDataProviders
 from api.requesters.identity_hashes import (
     calculate_identity_hash,
     calculate_identity_hash_message,
@@ -18,6 +20,7 @@ from api.requesters.identity_hashes import (
 from api.settings import settings
 from api.tests.conftest import require_rvig_mock
 from api.tests.test_utils import json_from_test_data_file
+from api.utils import read_file
 
 bsn_test_data = json_from_test_data_file("bsn_jwts.json")
 
@@ -25,9 +28,8 @@ bsn_test_data = json_from_test_data_file("bsn_jwts.json")
 @pytest.mark.asyncio
 @freeze_time("2021-05-31T16:24:06")
 @pytest.mark.parametrize("jwt_token,expected_bsn", bsn_test_data)
-async def test_retrieve_bsn_from_inge6(jwt_token, expected_bsn, requests_mock):
-    requests_mock.post(
-        url=f"{settings.INGE6_BSN_RETRIEVAL_URL}",
+async def test_retrieve_bsn_from_inge6(jwt_token, expected_bsn, respx_mock):
+    respx_mock.post(url=f"{settings.INGE6_BSN_RETRIEVAL_URL}").respond(
         text="MDEyMzQ1Njc4OTAxMjM0NTY3ODkwMUNDGq4KxM4U2Esz3zqoyjeVz/39vIpNeMFD8140",
     )
     bsn = await retrieve_bsn_from_inge6(jwt_token)
@@ -61,9 +63,10 @@ bsns = identity_hashes.keys()
 
 
 @require_rvig_mock
+@pytest.mark.asyncio
 @pytest.mark.parametrize("bsn", bsns)
-def test_create_provider_jwt_tokens(bsn):
-    provider_jwts = create_provider_jwt_tokens(bsn)
+async def test_create_provider_jwt_tokens(bsn):
+    provider_jwts = await create_provider_jwt_tokens(bsn)
     assert len(provider_jwts) == 1
     provider_jwt = provider_jwts[0].dict()
     assert "event" in provider_jwt
@@ -71,6 +74,86 @@ def test_create_provider_jwt_tokens(bsn):
     assert "provider_identifier" in provider_jwt
 
 
+def test_event_data_provider_identity_hash():
+    provider = EventDataProviders(settings).providers[0]
+    holder = Holder(firstName="Herman", lastName="Acker", birthDate=DutchBirthDate("1983-12-28"), infix="")
+    message = calculate_identity_hash_message("999999138", holder).encode()
+    assert provider.identity_hash(message) == calculate_identity_hash(
+        "999999138", holder, key=settings.EVENT_DATA_PROVIDERS[0]["identity_hash_secret"]
+    )
+
+
+def test_event_data_providers_batches():
+    many_providers = [{**settings.EVENT_DATA_PROVIDERS[0], "identifier": str(number)} for number in range(5)]
+
+    for threads, sizes in [(1, [5]), (2, [3, 2]), (4, [2, 2, 1]), (8, [1, 1, 1, 1, 1])]:
+        providers = EventDataProviders(
+            settings.copy(update={"EVENT_DATA_PROVIDERS": many_providers, "IDENTITY_HASH_JWT_SIGNING_THREADS": threads})
+        )
+        batches = providers.batches()
+        assert [len(batch) for batch in batches] == sizes
+        assert [provider.identifier for batch in batches for provider in batch] == ["0", "1", "2", "3", "4"]
+
+
+@pytest.mark.asyncio
+@freeze_time("2020-02-02")
+async def test_create_provider_jwt_tokens_in_threads(mocker):
+    holder = Holder(firstName="Herman", lastName="Acker", birthDate=DutchBirthDate("1983-12-28"), infix="")
+    mocker.patch("api.requesters.identity_hashes.rvig_cache.get_pii", return_value=holder)
+    mocker.patch("api.requesters.identity_hashes.random", return_value=b"012345678901234567890123")
+    many_providers = [{**settings.EVENT_DATA_PROVIDERS[0], "identifier": str(number)} for number in range(5)]
+
+    minted = {}
+    for threads in [1, 3]:
+        providers = EventDataProviders(
+            settings.copy(update={"EVENT_DATA_PROVIDERS": many_providers, "IDENTITY_HASH_JWT_SIGNING_THREADS": threads})
+        )
+        mocker.patch("api.requesters.identity_hashes.event_data_providers", providers)
+        minted[threads] = await create_provider_jwt_tokens("999999138")
+        providers.shutdown()
+
+    # Signing in threads gives the same tokens, in the order of the providers
+    assert minted[3] == minted[1]
+    assert [token.provider_identifier for token in minted[3]] == ["0", "1", "2", "3", "4"]
+    unomi = jwt.decode(
+        minted[3][0].unomi,
+        settings.IDENTITY_HASH_JWT_PUBLIC_KEY,
+        algorithms=["RS256"],
+        audience=many_providers[0]["unomi_url"],
+    )
+    assert unomi["identityHash"] == calculate_identity_hash(
+        "999999138", holder, key=many_providers[0]["identity_hash_secret"]
+    )
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "algorithm, public_key_file",
+    [("RS256", "jwt_public.crt"), ("ES256", "jwt_es256_public.crt"), ("EdDSA", "jwt_eddsa_public.crt")],
+)
+async def test_create_provider_jwt_tokens_per_algorithm(algorithm, public_key_file, mocker):
+    holder = Holder(firstName="Herman", lastName="Acker", birthDate=DutchBirthDate("1983-12-28"), infix="")
+    mocker.patch("api.requesters.identity_hashes.rvig_cache.get_pii", return_value=holder)
+    provider = {**settings.EVENT_DATA_PROVIDERS[0], "jwt_algorithm": algorithm}
+    mocker.patch(
+        "api.requesters.identity_hashes.event_data_providers",
+        EventDataProviders(settings.copy(update={"EVENT_DATA_PROVIDERS": [provider]})),
+    )
+
+    provider_jwts = await create_provider_jwt_tokens("999999138")
+
+    public_key = read_file(f"{settings.SECRETS_FOLDER}/{public_key_file}")
+    assert jwt.get_unverified_header(provider_jwts[0].event)["alg"] == algorithm
+    event = jwt.decode(provider_jwts[0].event, public_key, algorithms=[algorithm], audience=provider["event_url"])
+    assert event["identityHash"] == calculate_identity_hash("999999138", holder, key=provider["identity_hash_secret"])
+
+
+def test_event_data_providers_without_key():
+    provider = {**settings.EVENT_DATA_PROVIDERS[0], "jwt_algorithm": "ES256"}
+    with pytest.raises(ValueError, match="No key to sign ES256"):
+        EventDataProviders(settings.copy(update={"EVENT_DATA_PROVIDERS": [provider]}), signing_keys={})
+
+
 hash_data = [
     (
         b"",
@@ -0,0 +1,89 @@
+# Copyright (c) 2020-2021 De Staat der Nederlanden, Ministerie van Volksgezondheid, Welzijn en Sport.
+#
+# Licensed under the EUROPEAN UNION PUBLIC LICENCE v. 1.2
+#
+# SPDX-License-Identifier: EUPL-1.2
+#
+from freezegun import freeze_time
+
+from api.signers import logic
+from api.signers.logic import DistillationContext, distill_relevant_events
+from api.signers.logic_domestic import remove_domestic_ineligible_events
+from api.signers.logic_eu import remove_eu_ineligible_events
+from api.tests.test_eu_issuing_rules import _create_events
+
+events_list = [
+    {
+        "protocolVersion": "3.0",
+        "providerIdentifier": "ZZZ",
+        "status": "complete",
+        "holder": {"firstName": "Test", "infix": "", "lastName": "Positief", "birthDate": "1999-01-01"},
+        "events": [
+            {
+                "type": "vaccination",
+                "unique": "b187ddf919643e29a409041fd45112ab8e42d552",
+                "isSpecimen": True,
+                "vaccination": {"date": "2021-05-01", "hpkCode": "2924528"},
+            },
+            {
+                "type": "positivetest",
+                "unique": "fe3ba0ba5ec2f4f3b7eeb2a5c9ec3f3b0ec9ef47",
+                "isSpecimen": True,
+                "positivetest": {
+                    "sampleDate": "2021-04-01T10:00:00Z",
+                    "positiveResult": True,
+                    "facility": "GGD XL Amsterdam",
+                    "type": "LP6464-4",
+                    "name": "Bestest",
+                    "manufacturer": "1232",
+                    "country": "NLD",
+                },
+            },
+            {
+                "type": "negativetest",
+                "unique": "6b3c8f2ee5bd4c5a9a0c0b2a7b3cdd7c4e3f1f22",
+                "isSpecimen": True,
+                "negativetest": {
+                    "sampleDate": "2021-06-01T10:00:00Z",
+                    "negativeResult": True,
+                    "facility": "GGD XL Amsterdam",
+                    "type": "NL:BREATH",
+                    "name": "Bestest",
+                    "manufacturer": "1232",
+                    "country": "NLD",
+                },
+            },
+        ],
+    }
+]
+
+
+@freeze_time("2021-06-01T12:00:00Z")
+def test_distillation_context_matches_distill_relevant_events(mocker):
+    events = _create_events(events_list)
+    original = events.copy(deep=True)
+    prepare_spy = mocker.spy(logic, "prepare_events")
+
+    context = DistillationContext(events)
+    domestic = context.distill(remove_domestic_ineligible_events)
+    european = context.distill(remove_eu_ineligible_events)
+    assert prepare_spy.call_count == 1
+
+    assert domestic == distill_relevant_events(remove_domestic_ineligible_events(original.copy(deep=True)))
+    assert european == distill_relevant_events(remove_eu_ineligible_events(original.copy(deep=True)))
+    assert "negativetest" in domestic.type_set
+    assert "negativetest" not in european.type_set
+
+    # the events of the request stay as they were received
+    assert events == original
+
+
+@freeze_time("2021-06-01T12:00:00Z")
+def test_distillation_context_hands_out_copies():
+    context = DistillationContext(_create_events(events_list))
+
+    domestic = context.distill(remove_domestic_ineligible_events)
+    domestic.vaccinations[0].vaccination.doseNumber = 99  # type: ignore
+
+    assert context.distill(remove_domestic_ineligible_events).vaccinations[0].vaccination.doseNumber == 1
+    assert context.distill(remove_eu_ineligible_events).vaccinations[0].vaccination.doseNumber == 1
@@ -5,7 +5,9 @@
 # SPDX-License-Identifier: EUPL-1.2
 #
 import json
-from datetime import datetime, timezone
+import random
+import secrets
+from datetime import datetime, timedelta, timezone
 from typing import Dict, List
 
 import json5
@@ -13,9 +15,22 @@ import pytz
 from freezegun import freeze_time
 
 from api.app_support import decode_and_normalize_events
-from api.models import CMSSignedDataBlob, DomesticSignerAttributes, Holder, RichOrigin, StripType
+from api.models import (
+    CMSSignedDataBlob,
+    ContiguousOriginsBlock,
+    DomesticSignerAttributes,
+    Holder,
+    RichOrigin,
+    StripType,
+)
 from api.settings import settings
-from api.signers.logic_domestic import create_attributes, create_origins
+from api.signers import logic
+from api.signers.logic_domestic import (
+    calculate_attributes_from_blocks,
+    calculate_strips_from_blocks,
+    create_attributes,
+    create_origins,
+)
 from api.utils import read_file
 
 
@@ -211,3 +226,105 @@ def test_attributes_and_origins(current_path, requests_mock, mocker):
             birthMonth="",
         ),
     ]
+
+
+def reference_calculate_attributes_from_blocks(contiguous_blocks):
+    # calculate_attributes_from_blocks as it was, building and striking the attributes of every strip
+    rounded_now = logic.floor_hours(datetime.now(tz=pytz.utc))
+    attributes = []
+    maximum_expiration_time = rounded_now + timedelta(days=settings.DOMESTIC_MAXIMUM_ISSUANCE_DAYS)
+    for overlapping_block in contiguous_blocks:
+        expiration_time_scrubber = max(rounded_now, overlapping_block.validFrom)
+        while True:
+            rand_overlap_hours = secrets.randbelow(settings.DOMESTIC_MAXIMUM_RANDOMIZED_OVERLAP_HOURS + 1)
+            expiration_time_scrubber += timedelta(hours=settings.DOMESTIC_STRIP_VALIDITY_HOURS) - timedelta(
+                hours=rand_overlap_hours
+            )
+            expiration_time_scrubber = min(expiration_time_scrubber, overlapping_block.expirationTime)
+            if expiration_time_scrubber >= maximum_expiration_time:
+                break
+            valid_from = expiration_time_scrubber - timedelta(hours=settings.DOMESTIC_STRIP_VALIDITY_HOURS)
+            holder = overlapping_block.origins[0].holder
+            domestic_signer_attributes = DomesticSignerAttributes(
+                isSpecimen="1" if overlapping_block.origins[0].isSpecimen else "0",
+                isPaperProof=StripType.APP_STRIP,
+                validFrom=str(int(valid_from.timestamp())),
+                validForHours=settings.DOMESTIC_STRIP_VALIDITY_HOURS,
+                firstNameInitial=holder.first_name_initial,
+                lastNameInitial=holder.last_name_initial,
+                birthDay=str(holder.birthDate.day) if holder.birthDate.day else "",
+                birthMonth=str(holder.birthDate.month) if holder.birthDate.month else "",
+            )
+            domestic_signer_attributes.strike()
+            attributes.append(domestic_signer_attributes)
+            if expiration_time_scrubber == overlapping_block.expirationTime:
+                break
+    return attributes
+
+
+def random_blocks(rnd, now):
+    holders = [
+        Holder(firstName="Top", lastName="Pertje", birthDate="1950-01-01", infix=""),
+        Holder(firstName="Ä", lastName="de Vries", birthDate="1883-XX-XX", infix=""),
+        Holder(firstName="", lastName="Q", birthDate="2000-12-31", infix=""),
+    ]
+    blocks, start = [], now - timedelta(days=rnd.randint(0, 5))
+    for _ in range(rnd.randint(1, 4)):
+        # Not only whole hours, as the validFrom of a vaccination is the time it was given
+        valid_from = start + timedelta(seconds=rnd.randint(0, 10 * 24 * 3600), microseconds=rnd.randint(0, 999999))
+        expiration_time = valid_from + timedelta(hours=rnd.randint(1, 40 * 24))
+        origin = RichOrigin(
+            holder=rnd.choice(holders),
+            type="vaccination",
+            eventTime=valid_from,
+            validFrom=valid_from,
+            expirationTime=expiration_time,
+            isSpecimen=rnd.random() < 0.5,
+        )
+        blocks.append(ContiguousOriginsBlock.from_origin(origin))
+        start = expiration_time + timedelta(hours=1)
+    return blocks
+
+
+@freeze_time("2021-05-28 13:14:15")
+def test_calculate_attributes_from_blocks_same_as_reference(mocker):
+    rnd = random.Random(5)
+    for _ in range(100):
+        blocks = random_blocks(rnd, datetime.now(tz=pytz.utc))
+        seed = rnd.random()
+
+        mocker.patch("secrets.randbelow", side_effect=random.Random(seed).randrange)
+        expected = reference_calculate_attributes_from_blocks(blocks)
+        mocker.patch("secrets.randbelow", side_effect=random.Random(seed).randrange)
+        assert calculate_attributes_from_blocks(blocks) == expected
+
+
+@freeze_time("2021-05-28")
+def test_strips_share_the_attributes_of_their_block(mocker):
+    mocker.patch("secrets.randbelow", return_value=0)
+    holder = Holder(firstName="Top", lastName="Pertje", birthDate="1950-01-01", infix="")
+    block = ContiguousOriginsBlock.from_origin(
+        RichOrigin(
+            holder=holder,
+            type="vaccination",
+            eventTime=datetime(2021, 5, 1, tzinfo=pytz.utc),
+            validFrom=datetime(2021, 5, 1, tzinfo=pytz.utc),
+            expirationTime=datetime(2021, 7, 1, tzinfo=pytz.utc),
+            isSpecimen=False,
+        )
+    )
+
+    strips = calculate_strips_from_blocks([block])
+    assert len(strips) == settings.DOMESTIC_MAXIMUM_ISSUANCE_DAYS - 1
+    assert all(strip.attributes is strips[0].attributes for strip in strips)
+    assert [strip.valid_from for strip in strips[:2]] == [1622160000, 1622246400]
+    assert strips[0].to_signer_attributes() == DomesticSignerAttributes(
+        isSpecimen="0",
+        isPaperProof=StripType.APP_STRIP,
+        validFrom="1622160000",
+        validForHours="24",
+        firstNameInitial="T",
+        lastNameInitial="",
+        birthDay="1",
+        birthMonth="",
+    )
@@ -601,6 +601,27 @@ def test_eu_holder():
     assert holder.last_name_eu_normalized == "VRIES"
 
 
+def test_holder_names_are_cached(mocker):
+    holder = Holder(firstName="Ëlla", lastName="vries", infix="de", birthDate="2000-01-01")
+    normalize = mocker.spy(Holder, "_eu_normalize")
+    name_initial = mocker.spy(Holder, "_name_initial")
+
+    for _ in range(3):
+        assert holder.first_name_eu_normalized == "ELLA"
+        assert holder.last_name_eu_normalized == "DE<VRIES"
+        assert holder.first_name_initial == "E"
+    assert normalize.call_count == 2
+    assert name_initial.call_count == 1
+
+    # A changed name is normalized again
+    holder.infix = ""
+    assert holder.last_name_eu_normalized == "VRIES"
+    # Copies share what is known
+    assert holder.copy().first_name_initial == "E"
+    assert normalize.call_count == 3
+    assert name_initial.call_count == 1
+
+
 def test_very_long_names(mocker):
     """
     People can have very long names. The EU allows up to 80 characters.
@@ -655,3 +676,40 @@ def test_very_long_names(mocker):
             )
         ],
     )
+
+
+def test_events_index():
+    holder = Holder(firstName="Henk", lastName="Vries", infix="", birthDate="2000-01-01")
+
+    def recovery(sample_date: str) -> Event:
+        return Event(
+            recovery=Recovery(sampleDate=sample_date, validFrom=sample_date, validUntil="2021-12-01"),
+            holder=holder,
+            type="recovery",
+            unique=sample_date,
+        )
+
+    events = Events(events=[recovery("2021-03-01"), recovery("2021-01-01")])
+    recoveries = events.recoveries
+    assert [event.unique for event in recoveries] == ["2021-01-01", "2021-03-01"]
+    # built once, until the events change
+    assert events.recoveries is recoveries
+    assert events.type_set == {EventType.recovery}
+    assert events.vaccinations == []
+
+    # the index follows changes to the list of events
+    events.events.append(recovery("2021-02-01"))
+    assert [event.unique for event in events.recoveries] == ["2021-01-01", "2021-02-01", "2021-03-01"]
+
+    events.events = [recovery("2021-04-01")]
+    assert [event.unique for event in events.recoveries] == ["2021-04-01"]
+
+    events.events = []
+    assert events.recoveries == []
+    assert events.type_set == set()
+
+    # copies get their own index
+    events = Events(events=[recovery("2021-03-01")])
+    assert events.recoveries
+    copied = events.copy(deep=True)
+    assert copied.recoveries[0] is copied.events[0]
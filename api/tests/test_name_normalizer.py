@@ -0,0 +1,48 @@
+# Copyright (c) 2020-2021 De Staat der Nederlanden, Ministerie van Volksgezondheid, Welzijn en Sport.
+#
+# Licensed under the EUROPEAN UNION PUBLIC LICENCE v. 1.2
+#
+# SPDX-License-Identifier: EUPL-1.2
+#
+import random
+import re
+
+import pytest
+from mrz.base.functions import transliterate
+
+from api.enrichment.name_normalizer import TRANSLITERATION, normalize_name
+
+
+def mrz_normalize_name(name):
+    # normalize_name as it was written with the transliteration of mrz, kept as reference
+    encoded = transliterate(name, dictionary=TRANSLITERATION)
+    encoded = encoded.upper()
+    encoded = re.sub(r"[^A-Z<]+", "", encoded)
+    return encoded
+
+
+# Every character up to the last one in the dictionaries, most of them are not in there
+CHARACTERS = [chr(code_point) for code_point in range(max(map(ord, TRANSLITERATION)) + 1)]
+
+
+@pytest.mark.parametrize("template", ["{}", "a{}b", "{} {}", "{}-{}", " {}-", "{}ß{}"])
+def test_normalize_name_same_as_mrz(template):
+    for char in CHARACTERS:
+        name = template.format(char, char)
+        assert normalize_name.__wrapped__(name) == mrz_normalize_name(name), f"U+{ord(char):04X} in {name!r}"
+
+
+def test_normalize_name_same_as_mrz_for_names():
+    alphabet = list(TRANSLITERATION) + list("abcXYZ -'.<") * 20
+    rnd = random.Random(4)
+    for _ in range(2000):
+        name = "".join(rnd.choice(alphabet) for _ in range(rnd.randint(0, 40)))
+        assert normalize_name.__wrapped__(name) == mrz_normalize_name(name), repr(name)
+
+
+def test_normalize_name():
+    assert normalize_name("Čapek-de Vries") == "CAPEK<DE<VRIES"
+    assert normalize_name("Þĩŝ ïŜ Á ţęšť") == "THIS<IS<A<TEST"
+    assert normalize_name("Straße") == "STRASSE"
+    assert normalize_name("παράδειγμα δοκιμής") == "PAPADEIGMA<DOKIMIS"
+    assert normalize_name("") == ""
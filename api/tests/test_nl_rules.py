@@ -9,6 +9,7 @@ import json
 from datetime import date, datetime, timedelta, timezone
 from typing import Any, Dict
 
+import pytest
 from freezegun import freeze_time
 
 from api.models import (
@@ -57,8 +58,9 @@ def dti(data: str) -> datetime:
     return datetime.fromisoformat(data)
 
 
+@pytest.mark.asyncio
 @freeze_time("2021-06-21T01:23:45")
-def test_777771994(mock_signers):  # noqa # pylint: disable=unused-argument
+async def test_777771994(mock_signers):  # noqa # pylint: disable=unused-argument
     """
     Positive followed by negative test on same day.
 
@@ -198,7 +200,7 @@ def test_777771994(mock_signers):  # noqa # pylint: disable=unused-argument
 
     # domestic: origins now and one valid from in 11 days.
     # eu does not know negativetest or postitivetest:
-    signed = nl_domestic_dynamic.sign(events, base64_json_dump({}), base64_json_dump({}))
+    signed = await nl_domestic_dynamic.sign(events, base64_json_dump({}), base64_json_dump({}))
     assert signed == DomesticGreenCard(
         origins=[
             GreenCardOrigin(
@@ -237,7 +239,7 @@ def test_777771994(mock_signers):  # noqa # pylint: disable=unused-argument
     ) + timedelta(days=settings.DOMESTIC_NL_EXPIRY_DAYS_POSITIVE_TEST)
 
     # Expected: a negative test for now, so something valid 40 hours. And a recovery in 11 days.
-    signed = eu_international.sign(events)
+    signed = await eu_international.sign(events)
     assert signed == [
         EUGreenCard(
             origins=[
@@ -264,8 +266,9 @@ def test_777771994(mock_signers):  # noqa # pylint: disable=unused-argument
     ]
 
 
+@pytest.mark.asyncio
 @freeze_time("2021-06-21T01:23:45")
-def test_777771998(mock_signers):  # noqa # pylint: disable=unused-argument
+async def test_777771998(mock_signers):  # noqa # pylint: disable=unused-argument
     """
     Jannsen vaccination followed by positive test 2 weeks later
 
@@ -383,7 +386,7 @@ def test_777771998(mock_signers):  # noqa # pylint: disable=unused-argument
 
     # domestic: origins now and one valid from in 11 days.
     # eu does not know negativetest or postitivetest:
-    signed = nl_domestic_dynamic.sign(events, base64_json_dump({}), base64_json_dump({}))
+    signed = await nl_domestic_dynamic.sign(events, base64_json_dump({}), base64_json_dump({}))
     assert signed == DomesticGreenCard(
         origins=[
             GreenCardOrigin(
@@ -402,7 +405,7 @@ def test_777771998(mock_signers):  # noqa # pylint: disable=unused-argument
         createCredentialMessages="eyJjcmVkZW50aWFsIjogIkFfUVJfQ09ERSJ9",
     )
     # # Expected: a negative test for now, so something valid 40 hours. And a recovery in 11 days.
-    signed = eu_international.sign(events)
+    signed = await eu_international.sign(events)
     assert signed == [
         EUGreenCard(
             origins=[
@@ -429,8 +432,9 @@ def test_777771998(mock_signers):  # noqa # pylint: disable=unused-argument
     ]
 
 
+@pytest.mark.asyncio
 @freeze_time("2021-06-21T01:23:45")
-def test_777771999(mock_signers):  # noqa # pylint: disable=unused-argument
+async def test_777771999(mock_signers):  # noqa # pylint: disable=unused-argument
     """
     Jannsen vaccination followed by negative test 2 weeks later
 
@@ -549,7 +553,7 @@ def test_777771999(mock_signers):  # noqa # pylint: disable=unused-argument
 
     # domestic: origins now and one valid from in 11 days.
     # eu does not know negativetest or postitivetest:
-    signed = nl_domestic_dynamic.sign(events, base64_json_dump({}), base64_json_dump({}))
+    signed = await nl_domestic_dynamic.sign(events, base64_json_dump({}), base64_json_dump({}))
     assert signed == DomesticGreenCard(
         origins=[
             GreenCardOrigin(
@@ -568,7 +572,7 @@ def test_777771999(mock_signers):  # noqa # pylint: disable=unused-argument
         createCredentialMessages="eyJjcmVkZW50aWFsIjogIkFfUVJfQ09ERSJ9",
     )
 
-    signed = eu_international.sign(events)
+    signed = await eu_international.sign(events)
     assert signed == [
         EUGreenCard(
             origins=[
@@ -595,8 +599,9 @@ def test_777771999(mock_signers):  # noqa # pylint: disable=unused-argument
     ]
 
 
+@pytest.mark.asyncio
 @freeze_time("2021-06-22T19:20:00")
-def test_ronnie(mock_signers):  # noqa # pylint: disable=unused-argument
+async def test_ronnie(mock_signers):  # noqa # pylint: disable=unused-argument
     events = {
         "protocolVersion": "3.0",
         "providerIdentifier": "ZZZ",
@@ -641,8 +646,8 @@ def test_ronnie(mock_signers):  # noqa # pylint: disable=unused-argument
     events = _create_events([events])
     events = distill_relevant_events(events)
 
-    signed_domestic = nl_domestic_dynamic.sign(events, base64_json_dump({}), base64_json_dump({}))
-    signed_eu = eu_international.sign(events)
+    signed_domestic = await nl_domestic_dynamic.sign(events, base64_json_dump({}), base64_json_dump({}))
+    signed_eu = await eu_international.sign(events)
 
     print(signed_domestic)
     print(signed_eu)
@@ -46,8 +46,9 @@ def test_nl_testcases_invalid(event):
     assert "type" in detail
 
 
+@pytest.mark.asyncio
 @freeze_time("2021-06-14T16:24:06")
-def test_nl_testcases(requests_mock, current_path):
+async def test_nl_testcases(respx_mock, current_path):
     # country is empty.
     signing_response_data = {
         "qr": {
@@ -66,7 +67,9 @@ def test_nl_testcases(requests_mock, current_path):
         "error": 0,
     }
 
-    requests_mock.post(settings.DOMESTIC_NL_VWS_ONLINE_SIGNING_URL, json=json.dumps(signing_response_data))
+    respx_mock.post(settings.DOMESTIC_NL_VWS_ONLINE_SIGNING_URL).respond(
+        text=json.dumps(json.dumps(signing_response_data))
+    )
 
     event = {
         "protocolVersion": "3.0",
@@ -99,7 +102,7 @@ def test_nl_testcases(requests_mock, current_path):
 
     blob = CMSSignedDataBlob(signature="", payload=b64encode(json.dumps(event).encode()).decode("UTF-8"))
 
-    answer = sign(
+    answer = await sign(
         decode_and_normalize_events([blob]),
         b64encode(prepare_issue_message.encode()).decode(),
         icm,
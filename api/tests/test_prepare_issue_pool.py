@@ -0,0 +1,118 @@
+# Copyright (c) 2020-2021 De Staat der Nederlanden, Ministerie van Volksgezondheid, Welzijn en Sport.
+#
+# Licensed under the EUROPEAN UNION PUBLIC LICENCE v. 1.2
+#
+# SPDX-License-Identifier: EUPL-1.2
+#
+# allow access of private variables for mocking purposes
+# pylint: disable=W0212
+import json
+from base64 import b64decode
+
+import httpx
+import pytest
+
+from api.requesters.prepare_issue import PrepareIssuePool, get_prepare_issue
+from api.session_store import session_store
+from api.settings import settings
+
+POOL_SETTINGS = {
+    "PREPARE_ISSUE_POOL_ENABLED": True,
+    "PREPARE_ISSUE_POOL_LOW_WATERMARK": 2,
+    "PREPARE_ISSUE_POOL_HIGH_WATERMARK": 5,
+    "PREPARE_ISSUE_POOL_MAX_AGE_SECONDS": 30,
+    "PREPARE_ISSUE_POOL_REFILL_CONCURRENCY": 2,
+}
+
+
+@pytest.fixture(name="clock")
+def fixture_clock(mocker):
+    yield mocker.patch("api.requesters.prepare_issue.time.monotonic", return_value=1000.0)
+
+
+@pytest.fixture(name="prepare_issue")
+def fixture_prepare_issue(respx_mock):
+    nonces = iter(range(1000))
+    yield respx_mock.post(settings.DOMESTIC_NL_VWS_PREPARE_ISSUE_URL).mock(
+        side_effect=lambda request: httpx.Response(200, text=json.dumps({"issuerNonce": next(nonces)}))
+    )
+
+
+def nonce(message: bytes) -> int:
+    return json.loads(b64decode(message))["issuerNonce"]
+
+
+@pytest.mark.asyncio
+async def test_prepare_issue_pool_disabled(prepare_issue):
+    pool = PrepareIssuePool(settings.copy(update={"PREPARE_ISSUE_POOL_ENABLED": False}))
+    assert pool.take() is None
+    assert not pool.refilling
+    assert prepare_issue.call_count == 0
+
+
+@pytest.mark.asyncio
+async def test_prepare_issue_pool_refills(prepare_issue, clock):  # pylint: disable=unused-argument
+    pool = PrepareIssuePool(settings.copy(update=POOL_SETTINGS))
+
+    # Nothing there yet, the app has to wait for a message this time
+    assert pool.take() is None
+    assert pool.refilling
+    await pool._refill_task
+    assert pool.statistics().size == 5
+    assert prepare_issue.call_count == 5
+
+    # Handed out once each, oldest first. Below the low watermark the pool is filled up again.
+    assert [nonce(pool.take()) for _ in range(3)] == [0, 1, 2]
+    assert not pool.refilling
+    assert nonce(pool.take()) == 3
+    assert pool.refilling
+    await pool._refill_task
+    assert [nonce(pool.take()) for _ in range(5)] == [4, 5, 6, 7, 8]
+
+    statistics = pool.statistics()
+    assert (statistics.hits, statistics.misses, statistics.fetched) == (9, 1, 9)
+
+
+@pytest.mark.asyncio
+async def test_prepare_issue_pool_expiry(prepare_issue, clock):  # pylint: disable=unused-argument
+    pool = PrepareIssuePool(settings.copy(update=POOL_SETTINGS))
+    pool.start_refill()
+    await pool._refill_task
+
+    clock.return_value += 31
+    assert pool.take() is None
+    assert pool.statistics().expired == 5
+
+
+@pytest.mark.asyncio
+async def test_prepare_issue_pool_refill_error(respx_mock, caplog):
+    respx_mock.post(settings.DOMESTIC_NL_VWS_PREPARE_ISSUE_URL).respond(status_code=400)
+    pool = PrepareIssuePool(settings.copy(update=POOL_SETTINGS))
+    pool.start_refill()
+    await pool._refill_task
+
+    # Stops at the first failing round, the next take tries again
+    assert pool.statistics().size == 0
+    assert pool.statistics().refill_errors == 2
+    assert "Could not refill the prepare issue pool" in caplog.text
+
+
+@pytest.mark.asyncio
+async def test_get_prepare_issue_from_pool(prepare_issue, async_redis_db, mocker):
+    session_store._redis = async_redis_db
+    pool = PrepareIssuePool(settings.copy(update=POOL_SETTINGS))
+    mocker.patch("api.requesters.prepare_issue.prepare_issue_pool", pool)
+    pool.start_refill()
+    await pool._refill_task
+
+    response = await get_prepare_issue()
+    assert nonce(response.prepareIssueMessage.encode()) == 0
+    assert await session_store.get_message(str(response.stoken)) == response.prepareIssueMessage.encode()
+    assert prepare_issue.call_count == 5
+
+    # An empty pool falls back to fetching
+    pool._items.clear()
+    pool._refill_task = None
+    mocker.patch.object(pool, "start_refill")
+    response = await get_prepare_issue()
+    assert nonce(response.prepareIssueMessage.encode()) == 5
@@ -0,0 +1,119 @@
+# Copyright (c) 2020-2021 De Staat der Nederlanden, Ministerie van Volksgezondheid, Welzijn en Sport.
+#
+# Licensed under the EUROPEAN UNION PUBLIC LICENCE v. 1.2
+#
+# SPDX-License-Identifier: EUPL-1.2
+#
+# allow overwriting of private variables for mocking purposes
+# pylint: disable=W0212
+import pytest
+from fastapi import HTTPException
+
+from api.enrichment.rvig.cache import RvigCache
+from api.enrichment.rvig.rvig import PersonNotFound
+from api.models import Holder
+from api.settings import redis_settings, settings
+
+HOLDER = Holder(firstName="Naomi", lastName="Goede", birthDate="1987-04-01", infix=None)
+
+
+@pytest.fixture(name="rvig")
+def fixture_rvig(mocker):
+    yield mocker.patch("api.enrichment.rvig.cache.get_pii_from_rvig", return_value=HOLDER)
+
+
+@pytest.fixture(name="clock")
+def fixture_clock(mocker):
+    yield mocker.patch("api.enrichment.rvig.cache.time.monotonic", return_value=1000.0)
+
+
+@pytest.mark.asyncio
+async def test_rvig_cache_hit_and_expiry(rvig, clock):
+    cache = RvigCache(settings, redis_settings)
+
+    assert await cache.get_pii("999995571") == HOLDER
+    assert await cache.get_pii("999995571") == HOLDER
+    assert rvig.call_count == 1
+    assert cache.statistics().hits == 1
+    assert cache.statistics().misses == 1
+
+    # the bsn is not used as key
+    assert b"999995571" not in b"".join(cache._entries.keys())
+
+    clock.return_value += settings.RVIG_CACHE_TTL_SECONDS
+    assert await cache.get_pii("999995571") == HOLDER
+    assert rvig.call_count == 2
+
+
+@pytest.mark.asyncio
+async def test_rvig_cache_returns_copies(rvig, clock):  # pylint: disable=unused-argument
+    cache = RvigCache(settings, redis_settings)
+
+    (await cache.get_pii("999995571")).firstName = "Changed"
+    assert await cache.get_pii("999995571") == HOLDER
+
+
+@pytest.mark.asyncio
+async def test_rvig_cache_evicts_least_recently_used(rvig, clock, mocker):  # pylint: disable=unused-argument
+    mocker.patch.object(settings, "RVIG_CACHE_MAX_SIZE", 2)
+    cache = RvigCache(settings, redis_settings)
+
+    await cache.get_pii("1")
+    await cache.get_pii("2")
+    await cache.get_pii("1")
+    await cache.get_pii("3")
+    assert rvig.call_count == 3
+
+    await cache.get_pii("1")
+    assert rvig.call_count == 3
+    await cache.get_pii("2")
+    assert rvig.call_count == 4
+    assert cache.statistics().evictions == 2
+
+
+@pytest.mark.asyncio
+async def test_rvig_cache_not_found(rvig, clock):
+    rvig.side_effect = PersonNotFound(500, detail="Error processing result from enrichment service.")
+    cache = RvigCache(settings, redis_settings)
+
+    for _ in range(2):
+        with pytest.raises(HTTPException):
+            await cache.get_pii("999995005")
+    assert rvig.call_count == 1
+    assert cache.statistics().not_found_hits == 1
+
+    clock.return_value += settings.RVIG_CACHE_NOT_FOUND_TTL_SECONDS
+    with pytest.raises(HTTPException):
+        await cache.get_pii("999995005")
+    assert rvig.call_count == 2
+
+
+@pytest.mark.asyncio
+async def test_rvig_cache_does_not_cache_errors(rvig, clock):  # pylint: disable=unused-argument
+    rvig.side_effect = HTTPException(500, detail="Could not connect to enrichment service.")
+    cache = RvigCache(settings, redis_settings)
+
+    for _ in range(2):
+        with pytest.raises(HTTPException):
+            await cache.get_pii("999995571")
+    assert rvig.call_count == 2
+
+
+@pytest.mark.asyncio
+async def test_rvig_cache_redis_tier(rvig, clock, async_redis_db, mocker):  # pylint: disable=unused-argument
+    mocker.patch.object(settings, "RVIG_CACHE_REDIS_ENABLED", True)
+    worker_1 = RvigCache(settings, redis_settings)
+    worker_2 = RvigCache(settings, redis_settings)
+    worker_1._redis = worker_2._redis = async_redis_db
+
+    assert await worker_1.get_pii("999995571") == HOLDER
+    assert await worker_2.get_pii("999995571") == HOLDER
+    assert rvig.call_count == 1
+    assert worker_2.statistics().redis_hits == 1
+
+    rvig.side_effect = PersonNotFound(500, detail="Error processing result from enrichment service.")
+    with pytest.raises(PersonNotFound):
+        await worker_1.get_pii("999995005")
+    with pytest.raises(PersonNotFound):
+        await worker_2.get_pii("999995005")
+    assert rvig.call_count == 2
@@ -6,10 +6,20 @@
 #
 # allow overwriting of private variables for mocking purposes
 # pylint: disable=W0212
+from uuid import UUID, uuid4
+
 import pytest
 
-from api.session_store import session_store
-from api.settings import settings
+from api.metrics import LatencyHistogram
+from api.models import ServiceHealth
+from api.session_store import (
+    MemorySessionStore,
+    RedisSessionStore,
+    SessionStore,
+    create_session_store,
+    session_store,
+)
+from api.settings import redis_settings, settings
 
 testdata = [
     b"",
@@ -35,10 +45,107 @@ testdata = [
 ]
 
 
+@pytest.fixture(name="store", params=["redis", "memory"])
+def fixture_store(request, async_redis_db):
+    if request.param == "memory":
+        yield MemorySessionStore(settings)
+    else:
+        if settings.USE_PYTEST_REDIS:
+            session_store._redis = async_redis_db
+        yield session_store
+
+
+@pytest.mark.asyncio
 @pytest.mark.parametrize("message", testdata)
-def test_session_store(redis_db, message):
+async def test_session_store(store, message):
+    session_token = await store.store_message(message)
+    assert await store.get_message(session_token) == message
+    assert await store.get_message(session_token) is None
+
+
+@pytest.mark.asyncio
+async def test_store_messages(store):
+    session_tokens = await store.store_messages(testdata)
+    assert len(set(session_tokens)) == len(testdata)
+
+    # Every message can be retrieved once, with its own token
+    for session_token, message in reversed(list(zip(session_tokens, testdata))):
+        assert await store.get_message(session_token) == message
+        assert await store.get_message(session_token) is None
+
+    assert await store.store_messages([]) == []
+
+
+@pytest.mark.asyncio
+async def test_session_store_expires(async_redis_db):
     if settings.USE_PYTEST_REDIS:
-        session_store._redis = redis_db
-    session_token = session_store.store_message(message)
-    assert session_store.get_message(session_token) == message
-    assert session_store.get_message(session_token) is None
+        session_store._redis = async_redis_db
+    session_token = await session_store.store_message(b"9p35p51")
+    key = session_store._hash_key(UUID(session_token).bytes)
+    assert 0 < await async_redis_db.ttl(key) <= settings.EXPIRATION_TIME_IN_SECONDS
+
+
+@pytest.mark.asyncio
+async def test_memory_session_store_expires(mocker):
+    clock = mocker.patch("api.session_store.time.monotonic", return_value=1000.0)
+    store = MemorySessionStore(settings.copy(update={"SESSION_STORE_SWEEP_INTERVAL_SECONDS": 100}))
+    session_token = await store.store_message(b"9p35p51")
+    expired_token = await store.store_message(b"9p35p51")
+
+    clock.return_value += settings.EXPIRATION_TIME_IN_SECONDS
+    assert await store.get_message(session_token) is None
+
+    # Expired messages that are not asked for are swept once in a while
+    await store.store_message(b"9p35p51")
+    assert len(store) == 2
+    clock.return_value += 100
+    await store.store_message(b"9p35p51")
+    assert len(store) == 1
+    assert await store.get_message(expired_token) is None
+
+
+def test_create_session_store():
+    assert isinstance(create_session_store(settings, redis_settings), RedisSessionStore)
+    memory = create_session_store(settings.copy(update={"SESSION_STORE_BACKEND": "memory"}), redis_settings)
+    assert isinstance(memory, MemorySessionStore)
+    assert memory.statistics().backend == "memory"
+
+    with pytest.raises(ValueError):
+        create_session_store(settings.copy(update={"SESSION_STORE_BACKEND": "memcached"}), redis_settings)
+
+
+@pytest.mark.asyncio
+async def test_session_store_statistics(async_redis_db):
+    if settings.USE_PYTEST_REDIS:
+        session_store._redis = async_redis_db
+    before = session_store.statistics().latency["get_message"].count
+
+    await session_store.get_message(str(uuid4()))
+    assert await session_store.health_check() == [
+        ServiceHealth(service="redis", is_healthy=True, message="ping succeeded")
+    ]
+
+    statistics = session_store.statistics()
+    assert statistics.latency["get_message"].count == before + 1
+    assert statistics.latency["get_message"].buckets["+Inf"] == before + 1
+    assert statistics.latency["ping"].count >= 1
+
+
+def test_latency_histogram():
+    histogram = LatencyHistogram(buckets_ms=[1, 10])
+    for duration_ms in [0.5, 1, 5, 50]:
+        histogram.observe(duration_ms)
+
+    statistics = histogram.statistics()
+    assert statistics.count == 4
+    assert statistics.mean_ms == 14.125
+    assert statistics.buckets == {"1": 2, "10": 3, "+Inf": 4}
+
+
+def test_backend_must_implement_storage():
+    class IncompleteSessionStore(SessionStore):  # pylint: disable=abstract-method
+        async def _set(self, session_token, message):
+            pass
+
+    with pytest.raises(TypeError):
+        IncompleteSessionStore(settings)  # pylint: disable=abstract-class-instantiated
@@ -4,8 +4,43 @@
 #
 # SPDX-License-Identifier: EUPL-1.2
 #
+# allow access of private variables for testing purposes
+# pylint: disable=W0212
+import random
+
+import pytest
+
 from api.models import DutchBirthDate, Event, EventType, Holder
-from api.uci import generate_uci_01, random_unique_identifier, verify_uci_01
+from api.uci import LuhnModN, generate_uci_01, random_unique_identifier, verify_uci_01, verify_ucis_01
+
+
+class ReferenceLuhnModN:
+    """
+    The Luhn-Mod-N reference implementation of the EU, that LuhnModN has to stay identical to:
+    https://github.com/ehn-dcc-development/ehn-dcc-schema/tree/release/1.3.0/examples/Luhn-Mod-N
+    """
+
+    _CODE_POINTS = "ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789/:"
+
+    @classmethod
+    def _luhn_mod_n(cls, factor, txt):
+        total = 0
+        n = len(cls._CODE_POINTS)
+        for i in range(len(txt) - 1, -1, -1):
+            addend = factor * cls._CODE_POINTS.index(txt[i])
+            factor = 1 if (factor == 2) else 2
+            addend = (addend // n) + (addend % n)
+            total += addend
+        return total % n
+
+    @classmethod
+    def generate_check_character(cls, txt):
+        n = len(cls._CODE_POINTS)
+        return cls._CODE_POINTS[(n - cls._luhn_mod_n(2, txt)) % n]
+
+    @classmethod
+    def validate_check_character(cls, txt):
+        return cls._luhn_mod_n(1, txt) == 0
 
 
 def test_random_unique_identifier():
@@ -50,3 +85,47 @@ def test_uci_logging(caplog):
     event.to_uci_01()
     assert "unique" in caplog.text
     assert '", "provider": "XYZ", "unique": "1337"}' in caplog.text
+
+
+def random_texts(amount, seed=7):
+    rnd = random.Random(seed)
+    return ["".join(rnd.choices(LuhnModN._CODE_POINTS, k=rnd.randint(0, 45))) for _ in range(amount)]
+
+
+def test_luhn_mod_n_same_as_reference():
+    texts = random_texts(5000) + ["URN:UVI:01:NL:MY/INPUT/STRING", "URN:UVI:01:NL:MY/INPUT/STRINGS"]
+    # Every text with its own check character is valid, most others are not
+    texts += [f"{text}{ReferenceLuhnModN.generate_check_character(text)}" for text in texts[:1000]]
+
+    expected_check_characters = [ReferenceLuhnModN.generate_check_character(text) for text in texts]
+    expected_valid = [ReferenceLuhnModN.validate_check_character(text) for text in texts]
+
+    assert [LuhnModN.generate_check_character(text) for text in texts] == expected_check_characters
+    assert [LuhnModN.validate_check_character(text) for text in texts] == expected_valid
+    assert LuhnModN.generate_check_characters(texts) == expected_check_characters
+    assert LuhnModN.validate_check_characters(texts) == expected_valid
+    assert LuhnModN.generate_check_character("URN:UCI:01:NL:JLXN4P4ONJH7VMELWYUT42") == "6"
+
+
+@pytest.mark.parametrize("text", ["urn:uvi", "URN#UVI", "URN:ÜVI", "URN UVI"])
+def test_luhn_mod_n_invalid_characters(text):
+    with pytest.raises(ValueError):
+        ReferenceLuhnModN.generate_check_character(text)
+    with pytest.raises(ValueError):
+        LuhnModN.generate_check_character(text)
+    with pytest.raises(ValueError):
+        LuhnModN.validate_check_characters(["URN:UVI", text])
+
+
+def test_verify_ucis_01():
+    ucis = [generate_uci_01() for _ in range(100)] + [
+        "URN:UCI:01:NL:JLXN4P4ONJH7VMELWYUT42#6",
+        "URN:UCI:01:NL:JLXN4P4ONJH7VMELWYUT42#7",
+        "URN:UCI:01:NL:JLXN4P4ONJH7VMELWYUT4226",
+        "HALLOWERELDHALLOWERELDHALLOWERELDHALLO",
+        "URN:UCI:01:NL:JLXN4P4ONJH7V#MELWYUT4#6",
+        "HI",
+    ]
+    assert verify_ucis_01(ucis) == [verify_uci_01(uci) for uci in ucis]
+    assert verify_ucis_01(ucis)[-6:] == [True, False, False, False, False, False]
+    assert verify_ucis_01([]) == []
@@ -0,0 +1,87 @@
+# Copyright (c) 2020-2021 De Staat der Nederlanden, Ministerie van Volksgezondheid, Welzijn en Sport.
+#
+# Licensed under the EUROPEAN UNION PUBLIC LICENCE v. 1.2
+#
+# SPDX-License-Identifier: EUPL-1.2
+#
+import logging
+import os
+
+import pytest
+
+from api.uci_audit_log import UciAuditLogHandler
+
+
+@pytest.fixture(name="uci_logger")
+def fixture_uci_logger():
+    logger = logging.getLogger("test_uci_audit_log")
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    yield logger
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+        handler.close()
+
+
+def lines(path):
+    return path.read_text().splitlines()
+
+
+def test_flush_writes_and_fsyncs(tmp_path, uci_logger, mocker):
+    fsync = mocker.spy(os, "fsync")
+    handler = UciAuditLogHandler(tmp_path / "uci.log", fsync_interval=3600, fsync_count=1000)
+    uci_logger.addHandler(handler)
+
+    for number in range(250):
+        uci_logger.info("uci %s", number)
+    handler.flush()
+
+    assert lines(tmp_path / "uci.log") == [f"uci {number}" for number in range(250)]
+    assert handler.counters.written == 250
+    # Less than fsync_count records within the fsync_interval, only the flush fsyncs
+    assert handler.counters.syncs == 1
+    assert fsync.call_count == 1
+
+
+def test_fsync_every_count(tmp_path, uci_logger):
+    handler = UciAuditLogHandler(tmp_path / "uci.log", fsync_interval=3600, fsync_count=1)
+    uci_logger.addHandler(handler)
+
+    uci_logger.info("first")
+    handler.flush()
+    uci_logger.info("second")
+    handler.flush()
+
+    assert handler.counters.syncs == 2
+
+
+def test_close_writes_everything(tmp_path, uci_logger):
+    handler = UciAuditLogHandler(tmp_path / "uci.log", fsync_interval=3600, fsync_count=1000)
+    uci_logger.addHandler(handler)
+
+    for number in range(5000):
+        uci_logger.info("uci %s", number)
+    handler.close()
+
+    assert lines(tmp_path / "uci.log") == [f"uci {number}" for number in range(5000)]
+
+    # Still written after the handler is closed, as logging keeps handlers around until exit
+    uci_logger.info("late")
+    assert lines(tmp_path / "uci.log")[-1] == "late"
+
+
+def test_rotates_by_size(tmp_path, uci_logger):
+    handler = UciAuditLogHandler(tmp_path / "uci.log", max_bytes=100)
+    uci_logger.addHandler(handler)
+
+    for number in range(60):
+        uci_logger.info("uci %02d", number)
+        handler.flush()
+
+    # 14 lines of 7 bytes fit in a file, no file is ever removed
+    assert handler.counters.rotations == 4
+    rotated = sorted(path for path in tmp_path.iterdir() if path.name != "uci.log")
+    assert len(rotated) == 4
+    assert all(path.stat().st_size <= 100 for path in rotated)
+    kept = [line for path in [*rotated, tmp_path / "uci.log"] for line in lines(path)]
+    assert kept == [f"uci {number:02d}" for number in range(60)]
@@ -0,0 +1,117 @@
+# Copyright (c) 2020-2021 De Staat der Nederlanden, Ministerie van Volksgezondheid, Welzijn en Sport.
+#
+# Licensed under the EUROPEAN UNION PUBLIC LICENCE v. 1.2
+#
+# SPDX-License-Identifier: EUPL-1.2
+#
+import json
+
+from api import uci_log_index
+from api.uci_log_index import UciLogIndex, log_files, main
+
+
+def log_line(uci, provider="ZZZ", unique="1"):
+    message = json.dumps({"uci": f"URN:UCI:01:NL:{uci}", "provider": provider, "unique": unique})
+    return f"[INFO] [17/Jun/2021 09:41:35] [uci:479] {message}\n"
+
+
+def write(path, *lines):
+    with open(path, "a", encoding="utf-8") as file:
+        file.write("".join(lines))
+
+
+def ucis(records):
+    return [record.uci[len("URN:UCI:01:NL:") :] for record in records]
+
+
+def test_find(tmp_path):
+    log = tmp_path / "uci.log"
+    write(log, log_line("A", "ZZZ", "1"), log_line("B", "GGD", "2"), "not a uci\n", log_line("C", "ZZZ", "2"))
+    index = UciLogIndex(log)
+
+    assert index.update() == 3
+    assert index.find_uci("URN:UCI:01:NL:B") == (
+        "URN:UCI:01:NL:B",
+        "GGD",
+        "2",
+        log_line("B", "GGD", "2").rstrip("\n"),
+    )
+    assert index.find_uci("URN:UCI:01:NL:D") is None
+    assert ucis(index.find("provider", "ZZZ")) == ["A", "C"]
+    assert ucis(index.find("unique", "2")) == ["B", "C"]
+
+
+def test_update_is_incremental(tmp_path):
+    log = tmp_path / "uci.log"
+    write(log, log_line("A"), log_line("B")[:20])
+    index = UciLogIndex(log)
+
+    # The line that is being written is left for the next update
+    assert index.update() == 1
+    write(log, log_line("B")[20:], log_line("C"))
+    assert index.update() == 2
+    assert index.update() == 0
+    assert ucis(index.find("provider", "ZZZ")) == ["A", "B", "C"]
+
+
+def test_rotated_logs(tmp_path):
+    log = tmp_path / "uci.log"
+    write(log, log_line("A"))
+    index = UciLogIndex(log)
+    index.update()
+
+    log.rename(tmp_path / "uci.log.20210617T094135000000Z")
+    write(log, log_line("B"))
+    # Only the new log is indexed, the index of the rotated log is found by its first line
+    assert index.update() == 1
+    assert ucis(index.find("provider", "ZZZ")) == ["A", "B"]
+
+    (tmp_path / "uci.log.20210617T094135000000Z").unlink()
+    index.update()
+    assert ucis(index.find("provider", "ZZZ")) == ["B"]
+    assert len(list((tmp_path / "uci.log.index").iterdir())) == 1
+
+
+def test_segments_are_merged(tmp_path, monkeypatch):
+    monkeypatch.setattr(uci_log_index, "SEGMENT_SIZE", 2)
+    monkeypatch.setattr(uci_log_index, "MAX_SEGMENTS", 3)
+    log = tmp_path / "uci.log"
+    write(log, *[log_line(f"U{number}", unique=str(number % 3)) for number in range(10)])
+    index = UciLogIndex(log)
+
+    assert index.update() == 10
+    assert [len(file_index.segments) for file_index in index._indexes()] == [1]  # pylint: disable=protected-access
+    assert ucis(index.find("unique", "1")) == ["U1", "U4", "U7"]
+    assert all(index.find_uci(f"URN:UCI:01:NL:U{number}") for number in range(10))
+
+
+def test_same_digest_other_value(tmp_path, monkeypatch):
+    monkeypatch.setattr(uci_log_index, "key_digest", lambda value: bytes(uci_log_index.DIGEST_SIZE))
+    log = tmp_path / "uci.log"
+    write(log, log_line("A"), log_line("B"))
+    index = UciLogIndex(log)
+    index.update()
+
+    assert ucis(index.find("uci", "URN:UCI:01:NL:B")) == ["B"]
+
+
+def test_main(tmp_path, capsys):
+    log = tmp_path / "uci.log"
+    write(log, log_line("A", "ZZZ"), log_line("B", "GGD"))
+
+    main([str(log), "--index", str(tmp_path / "index"), "--provider", "GGD"])
+    assert capsys.readouterr().out == log_line("B", "GGD")
+
+
+def test_log_files_oldest_first(tmp_path):
+    names = ["uci.log", "uci.log.1", "uci.log.2", "uci.log.20210618T000000000000Z", "uci.log.20210617T000000000000Z"]
+    for name in [*names, "uci.log.index", "uci.log.old"]:
+        (tmp_path / name).touch()
+
+    assert [path.name for path in log_files(tmp_path / "uci.log")] == [
+        "uci.log.2",
+        "uci.log.1",
+        "uci.log.20210617T000000000000Z",
+        "uci.log.20210618T000000000000Z",
+        "uci.log",
+    ]
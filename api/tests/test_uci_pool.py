@@ -0,0 +1,77 @@
+# Copyright (c) 2020-2021 De Staat der Nederlanden, Ministerie van Volksgezondheid, Welzijn en Sport.
+#
+# Licensed under the EUROPEAN UNION PUBLIC LICENCE v. 1.2
+#
+# SPDX-License-Identifier: EUPL-1.2
+#
+# allow access of private variables for mocking purposes
+# pylint: disable=W0212
+import re
+
+import pytest
+
+from api.settings import settings
+from api.uci import REGEX, UciPool, generate_ucis_01, random_unique_identifiers, verify_ucis_01
+
+POOL_SETTINGS = {
+    "UCI_POOL_ENABLED": True,
+    "UCI_POOL_LOW_WATERMARK": 3,
+    "UCI_POOL_HIGH_WATERMARK": 10,
+    "UCI_POOL_REFILL_BATCH_SIZE": 4,
+}
+
+
+def test_generate_ucis_01():
+    ucis = generate_ucis_01(500)
+    assert len(set(ucis)) == 500
+    assert all(re.fullmatch(REGEX, uci) and uci.startswith("URN:UCI:01:NL:") for uci in ucis)
+    assert all(verify_ucis_01(ucis))
+    assert generate_ucis_01(0) == []
+
+    # The version nibble of the uuid4 ends up in the 10th and 11th character, as with random_unique_identifier
+    identifiers = random_unique_identifiers(100)
+    assert {identifier[9] for identifier in identifiers} <= set("BFJNRVZ5")
+    assert {identifier[10] for identifier in identifiers} <= set("ABCDEFGH")
+
+
+def test_uci_pool_disabled(mocker):
+    mocker.patch("api.uci.random_unique_identifier", return_value="JLXN4P4ONJH7VMELWYUT42")
+    pool = UciPool(settings.copy(update={"UCI_POOL_ENABLED": False}))
+    assert pool.take() == "URN:UCI:01:NL:JLXN4P4ONJH7VMELWYUT42#6"
+    assert pool.statistics().size == 0
+
+
+def test_uci_pool_outside_event_loop():
+    pool = UciPool(settings.copy(update=POOL_SETTINGS))
+    assert verify_ucis_01([pool.take(), pool.take()]) == [True, True]
+    statistics = pool.statistics()
+    assert (statistics.size, statistics.misses, statistics.refills) == (0, 2, 0)
+
+
+@pytest.mark.asyncio
+async def test_uci_pool_refills():
+    pool = UciPool(settings.copy(update=POOL_SETTINGS))
+
+    # Nothing there yet, this one is generated on the spot
+    first = pool.take()
+    assert pool.refilling
+    await pool._refill_task
+    assert pool.statistics().size == 10
+
+    # Handed out once each. Below the low watermark the pool is filled up again.
+    ucis = [pool.take() for _ in range(7)]
+    assert not pool.refilling
+    ucis.append(pool.take())
+    assert pool.refilling
+    await pool._refill_task
+
+    assert len(set([first, *ucis])) == 9
+    assert all(verify_ucis_01(ucis))
+
+    statistics = pool.statistics()
+    assert (statistics.size, statistics.hits, statistics.misses) == (10, 8, 1)
+    assert (statistics.generated, statistics.refills) == (18, 2)
+    assert statistics.refill_rate > 0
+
+    await pool.aclose()
+    assert pool.statistics().size == 0
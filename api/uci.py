@@ -4,11 +4,21 @@
 #
 # SPDX-License-Identifier: EUPL-1.2
 #
+import asyncio
 import base64
+import os
 import re
+import time
 import uuid
+from typing import TYPE_CHECKING, List, Sequence, Tuple
 
 from api import log
+from api.settings import AppSettings, settings
+from api.watermark_pool import WatermarkPool
+
+if TYPE_CHECKING:
+    # api.models uses this module
+    from api.models import UciPoolStatistics
 
 REGEX = r"[A-Z0-9:#/]{38}"
 
@@ -28,7 +38,7 @@ def random_unique_identifier() -> str:
     return f"{b32[0:20]}42"
 
 
-def generate_uci_01():
+def generate_uci_01() -> str:
     """
     Generates a Unique Vaccination Certificate/assertion identifier (UVCI) based on the unique value.
     Based on: Release 2 2021-03-12
@@ -89,6 +99,79 @@ def generate_uci_01():
     return f"{uvci_data}#{checksum}"
 
 
+def random_unique_identifiers(amount: int) -> List[str]:
+    """
+    random_unique_identifier for many identifiers at once, with the randomness for all of them read in one go.
+    """
+    randomness = os.urandom(16 * amount)
+    identifiers = []
+    for start in range(0, len(randomness), 16):
+        uuid_bytes = bytearray(randomness[start : start + 16])
+        # The version and variant bits that uuid.uuid4 sets
+        uuid_bytes[6] = (uuid_bytes[6] & 0x0F) | 0x40
+        uuid_bytes[8] = (uuid_bytes[8] & 0x3F) | 0x80
+        identifiers.append(f"{base64.b32encode(uuid_bytes)[0:20].decode('UTF-8')}42")
+    return identifiers
+
+
+def generate_ucis_01(amount: int) -> List[str]:
+    """
+    generate_uci_01 for many UCI's at once, the checksums are calculated in one batch.
+    """
+    uvci_datas = [f"URN:UCI:01:NL:{identifier}" for identifier in random_unique_identifiers(amount)]
+    checksums = LuhnModN.generate_check_characters(uvci_datas)
+    return [f"{uvci_data}#{checksum}" for uvci_data, checksum in zip(uvci_datas, checksums)]
+
+
+class UciPool(WatermarkPool[str]):
+    """
+    UCI's generated ahead of time, so issuing one on the signing path is taking it from a queue.
+
+    A background task generates batches up to the high watermark. When the pool is empty, or outside of an event loop,
+    a UCI is generated on the spot as without the pool. A UCI is written to the UCI log when it is issued, see
+    Event.to_uci_01.
+    """
+
+    def __init__(self, app_settings: AppSettings):
+        super().__init__(
+            app_settings.UCI_POOL_ENABLED, app_settings.UCI_POOL_LOW_WATERMARK, app_settings.UCI_POOL_HIGH_WATERMARK
+        )
+        self._batch_size = app_settings.UCI_POOL_REFILL_BATCH_SIZE
+
+        self.generated = 0
+        self.refills = 0
+        self._refill_seconds = 0.0
+
+    def take(self) -> str:
+        return self._take() or generate_uci_01()
+
+    async def _refill(self) -> None:
+        while self.missing:
+            started = time.perf_counter()
+            ucis = generate_ucis_01(min(self._batch_size, self.missing))
+            self._items.extend(ucis)
+            self.generated += len(ucis)
+            self._refill_seconds += time.perf_counter() - started
+            # Let the requests go first between batches
+            await asyncio.sleep(0)
+        self.refills += 1
+
+    def statistics(self) -> "UciPoolStatistics":
+        from api.models import UciPoolStatistics  # pylint: disable=import-outside-toplevel
+
+        return UciPoolStatistics(
+            enabled=self._enabled,
+            size=len(self._items),
+            low_watermark=self._low_watermark,
+            high_watermark=self._high_watermark,
+            hits=self.hits,
+            misses=self.misses,
+            generated=self.generated,
+            refills=self.refills,
+            refill_rate=self.generated / self._refill_seconds if self._refill_seconds else 0.0,
+        )
+
+
 def verify_uci_01(uci: str):
 
     if not re.fullmatch(REGEX, uci):
@@ -111,6 +194,37 @@ def verify_uci_01(uci: str):
     return LuhnModN.generate_check_character(uvci_data) == checksum
 
 
+def verify_ucis_01(ucis: Sequence[str]) -> List[bool]:
+    """
+    verify_uci_01 for many UCI's at once, for example when scanning the UCI log. Invalid UCI's are not logged.
+    """
+    well_formed = [uci for uci in ucis if re.fullmatch(REGEX, uci) and uci.startswith("URN:UCI:") and "#" in uci]
+    # As in verify_uci_01: the data is before the first #, the checksum after the last
+    check_characters = LuhnModN.generate_check_characters([uci.split("#")[0] for uci in well_formed])
+    valid = {
+        uci for uci, check_character in zip(well_formed, check_characters) if uci.split("#")[-1] == check_character
+    }
+    return [uci in valid for uci in ucis]
+
+
+# Marks a byte that is not one of the code points in the addend tables of LuhnModN
+INVALID_CHARACTER = 255
+
+
+def _addend_table(code_points: str, factor: int) -> bytes:
+    """
+    For every byte, the addend of LuhnModN when the character is multiplied by factor: a 256 byte table for
+    bytes.translate. Bytes that are not a code point map to INVALID_CHARACTER.
+    """
+    n = len(code_points)  # pylint: disable=invalid-name
+    table = bytearray([INVALID_CHARACTER] * 256)
+    for code_point, character in enumerate(code_points):
+        addend = factor * code_point
+        # Sum the digits of the "addend" as expressed in base "n"
+        table[ord(character)] = (addend // n) + (addend % n)
+    return bytes(table)
+
+
 class LuhnModN:
     """
     Taken from: https://github.com/ehn-dcc-development/ehn-dcc-schema/tree/release/1.3.0/examples/Luhn-Mod-N
@@ -120,12 +234,17 @@ class LuhnModN:
     Usage:
     LuhnModN.generate_check_character("URN:UVI:01:NL:MY/INPUT/STRING")  # S
     LuhnModN.validate_check_character("URN:UVI:01:NL:MY/INPUT/STRINGS") # True
+
+    Instead of a loop per character, the addend of every character is looked up in a table for each factor with
+    bytes.translate, and the addends are summed in C. The batch methods translate all texts in one go. Characters that
+    are not in _CODE_POINTS raise a ValueError, as in the reference implementation.
     """
 
     _CODE_POINTS = "ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789/:"
+    _ADDENDS = {1: _addend_table(_CODE_POINTS, 1), 2: _addend_table(_CODE_POINTS, 2)}
 
     @classmethod
-    def _number_of_valid_input_characters(cls):
+    def _number_of_valid_input_characters(cls) -> int:
         return len(cls._CODE_POINTS)
 
     @classmethod
@@ -136,36 +255,62 @@ class LuhnModN:
     def _character_from_code_point(cls, code_point: int) -> str:
         return cls._CODE_POINTS[code_point]
 
+    @classmethod
+    def _addends(cls, factor: int, txt: str) -> Tuple[bytes, bytes]:
+        """
+        The addends of txt with the factor that the last character is multiplied by, and with the other factor.
+        """
+        # Non ascii characters raise UnicodeEncodeError, a ValueError
+        data = txt.encode("ascii")
+        addends = data.translate(cls._ADDENDS[factor]), data.translate(cls._ADDENDS[3 - factor])
+        if INVALID_CHARACTER in addends[0]:
+            invalid = next(character for character in txt if character not in cls._CODE_POINTS)
+            raise ValueError(f"{invalid!r} is not a valid character for LuhnModN.")
+        return addends
+
+    @classmethod
+    def _remainder(cls, this_factor: bytes, other_factor: bytes) -> int:
+        # Starting from the right, the factor alternates: the last character has this factor, the one before it the
+        # other factor.
+        return (sum(this_factor[::-2]) + sum(other_factor[-2::-2])) % cls._number_of_valid_input_characters()
+
     @classmethod
     def _luhn_mod_n(cls, factor, txt):
-        total = 0
+        return cls._remainder(*cls._addends(factor, txt))
+
+    @classmethod
+    def _luhn_mod_n_batch(cls, factor: int, txts: Sequence[str]) -> List[int]:
+        this_factor, other_factor = cls._addends(factor, "".join(txts))
+        remainders, start = [], 0
+        for txt in txts:
+            end = start + len(txt)
+            remainders.append(cls._remainder(this_factor[start:end], other_factor[start:end]))
+            start = end
+        return remainders
+
+    @classmethod
+    def _check_character(cls, remainder: int) -> str:
         n = cls._number_of_valid_input_characters()  # pylint: disable=invalid-name
-        # Starting from the right, work leftwards
-        # Now, the initial "factor" will always be "1"
-        # since the last character is the check character.
-        for i in range(len(txt) - 1, -1, -1):
-            code_point = cls._code_point_from_character(txt[i])
-            addend = factor * code_point
-
-            # Alternate the "factor" that each "code_point" is multiplied by
-            factor = 1 if (factor == 2) else 2
-
-            # Sum the digits of the "addend" as expressed in base "n"
-            addend = (addend // n) + (addend % n)
-            total += addend
-        remainder = total % n
-        return remainder
+        return cls._character_from_code_point((n - remainder) % n)
 
     @classmethod
     def generate_check_character(cls, txt: str) -> str:
-        factor = 2
-        remainder = cls._luhn_mod_n(factor, txt)
-        n = cls._number_of_valid_input_characters()  # pylint: disable=invalid-name
-        check_code_point = (n - remainder) % n
-        return cls._character_from_code_point(check_code_point)
+        return cls._check_character(cls._luhn_mod_n(2, txt))
 
     @classmethod
     def validate_check_character(cls, txt: str) -> bool:
-        factor = 1
-        remainder = cls._luhn_mod_n(factor, txt)
-        return remainder == 0  # type: ignore
+        return cls._luhn_mod_n(1, txt) == 0  # type: ignore
+
+    @classmethod
+    def generate_check_characters(cls, txts: Sequence[str]) -> List[str]:
+        """
+        generate_check_character for many texts at once, for example to check an audit log.
+        """
+        return [cls._check_character(remainder) for remainder in cls._luhn_mod_n_batch(2, txts)]
+
+    @classmethod
+    def validate_check_characters(cls, txts: Sequence[str]) -> List[bool]:
+        return [remainder == 0 for remainder in cls._luhn_mod_n_batch(1, txts)]
+
+
+uci_pool = UciPool(settings)
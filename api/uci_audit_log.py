@@ -0,0 +1,211 @@
+# Copyright (c) 2020-2021 De Staat der Nederlanden, Ministerie van Volksgezondheid, Welzijn en Sport.
+#
+# Licensed under the EUROPEAN UNION PUBLIC LICENCE v. 1.2
+#
+# SPDX-License-Identifier: EUPL-1.2
+#
+# This module is loaded by the logging config, while the api package is still being imported: only use the standard
+# library here.
+import logging
+import os
+import queue
+import threading
+import time
+from datetime import datetime, timezone
+from typing import IO, List, Optional, Union
+
+# Stops the writer after everything before it is written
+_STOP = object()
+
+# Records written with one write call at most
+MAX_BATCH_SIZE = 1000
+
+
+class UciAuditLogCounters:  # pylint: disable=too-few-public-methods
+    def __init__(self) -> None:
+        self.written = 0
+        self.syncs = 0
+        self.rotations = 0
+
+
+class UciAuditLogHandler(logging.Handler):  # pylint: disable=too-many-instance-attributes
+    """
+    The UCI log, written by a background thread so issuing a UCI does not wait for the disk.
+
+    A record is put on a queue. The writer writes what is on the queue in one go, and fsyncs every fsync_interval
+    seconds or every fsync_count records, whichever comes first.
+
+    When max_bytes is set and the file would grow beyond it, the file is renamed to its name with the time appended.
+    Renamed files are never removed: the UCI log is the audit trail of the issued certificates. Only rotate when a
+    single process writes the log. Every process only knows the size of its own writes, and the others would go on
+    writing to the renamed file.
+
+    flush() returns when every record before it is on disk. close(), also called by logging at exit, writes and fsyncs
+    everything that is queued, so no UCI is lost on a graceful shutdown. Records after close are written right away.
+    """
+
+    def __init__(
+        self,
+        filename: str,
+        max_bytes: int = 0,
+        fsync_interval: float = 1.0,
+        fsync_count: int = 100,
+        encoding: str = "utf-8",
+    ):
+        super().__init__()
+        self.filename = os.path.abspath(filename)
+        self.max_bytes = max_bytes
+        self.fsync_interval = fsync_interval
+        self.fsync_count = fsync_count
+        self.encoding = encoding
+
+        self._queue: "queue.SimpleQueue[Union[logging.LogRecord, threading.Event, object]]" = queue.SimpleQueue()
+        self._stream: Optional[IO[str]] = None
+        self._writer: Optional[threading.Thread] = None
+        # The writer is started for the process that logs, a forked worker starts its own.
+        self._writer_pid = 0
+        self._start_lock = threading.Lock()
+        self._closed = False
+
+        self._unsynced = 0
+        self._synced_at = time.monotonic()
+        self.counters = UciAuditLogCounters()
+
+    def emit(self, record: logging.LogRecord) -> None:
+        if self._closed:
+            self._write_now(record)
+            return
+        self._ensure_writer()
+        self._queue.put(record)
+
+    def flush(self) -> None:
+        if self._closed or not self._writer_alive():
+            return
+        written = threading.Event()
+        self._queue.put(written)
+        # The writer can only stop by an error that is reported already, don't wait forever for it.
+        while not written.wait(0.1):
+            if not self._writer_alive():
+                return
+
+    def close(self) -> None:
+        with self._start_lock:
+            if self._closed:
+                return
+            self._closed = True
+        if self._writer_alive():
+            self._queue.put(_STOP)
+            self._writer.join()  # type: ignore
+        self._close_stream()
+        super().close()
+
+    def _writer_alive(self) -> bool:
+        return self._writer is not None and self._writer.is_alive() and self._writer_pid == os.getpid()
+
+    def _ensure_writer(self) -> None:
+        if self._writer_alive():
+            return
+        with self._start_lock:
+            if self._writer_alive() or self._closed:
+                return
+            self._writer_pid = os.getpid()
+            self._writer = threading.Thread(target=self._run, name="uci-audit-log", daemon=True)
+            self._writer.start()
+
+    def _run(self) -> None:
+        while True:
+            try:
+                item = self._queue.get(timeout=self._until_sync())
+            except queue.Empty:
+                self._sync()
+                continue
+
+            items = [item]
+            while len(items) < MAX_BATCH_SIZE:
+                try:
+                    items.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            records = [item for item in items if isinstance(item, logging.LogRecord)]
+            waiting = [item for item in items if isinstance(item, threading.Event)]
+            stop = any(item is _STOP for item in items)
+
+            self._write(records)
+            if waiting or stop or self._unsynced >= self.fsync_count or self._until_sync() == 0:
+                self._sync()
+            for written in waiting:
+                written.set()
+            if stop:
+                return
+
+    def _until_sync(self) -> Optional[float]:
+        if not self._unsynced:
+            return None
+        return max(0.0, self._synced_at + self.fsync_interval - time.monotonic())
+
+    def _write(self, records: List[logging.LogRecord]) -> None:
+        lines = []
+        for record in records:
+            try:
+                lines.append(f"{self.format(record)}\n")
+            except Exception:  # pylint: disable=broad-except
+                self.handleError(record)
+        if not lines:
+            return
+
+        data = "".join(lines)
+        try:
+            stream = self._open()
+            if self._should_rotate(stream, data):
+                self._rotate()
+                stream = self._open()
+            stream.write(data)
+            # Into the os right away, the fsync makes it survive a crash of the machine
+            stream.flush()
+        except OSError:
+            self.handleError(records[-1])
+            return
+        self._unsynced += len(lines)
+        self.counters.written += len(lines)
+
+    def _write_now(self, record: logging.LogRecord) -> None:
+        with self._start_lock:
+            self._write([record])
+            self._sync()
+            self._close_stream()
+
+    def _open(self) -> IO[str]:
+        if self._stream is None:
+            self._stream = open(self.filename, "a", encoding=self.encoding)  # pylint: disable=consider-using-with
+        return self._stream
+
+    def _should_rotate(self, stream: IO[str], data: str) -> bool:
+        if not self.max_bytes:
+            return False
+        size = stream.tell()
+        return size > 0 and size + len(data.encode(self.encoding)) > self.max_bytes
+
+    def _rotate(self) -> None:
+        self._sync()
+        self._close_stream()
+        # The names sort in the order of rotation
+        os.rename(self.filename, f"{self.filename}.{datetime.now(timezone.utc):%Y%m%dT%H%M%S%fZ}")
+        self.counters.rotations += 1
+
+    def _sync(self) -> None:
+        if self._stream is not None and self._unsynced:
+            try:
+                self._stream.flush()
+                os.fsync(self._stream.fileno())
+            except OSError:
+                # Reported as logging reports errors of handlers, the records are in the file as far as the os knows.
+                self.handleError(logging.makeLogRecord({"msg": f"Could not fsync {self.filename}"}))
+            self.counters.syncs += 1
+        self._unsynced = 0
+        self._synced_at = time.monotonic()
+
+    def _close_stream(self) -> None:
+        if self._stream is not None:
+            self._stream.close()
+            self._stream = None
@@ -0,0 +1,303 @@
+# Copyright (c) 2020-2021 De Staat der Nederlanden, Ministerie van Volksgezondheid, Welzijn en Sport.
+#
+# Licensed under the EUROPEAN UNION PUBLIC LICENCE v. 1.2
+#
+# SPDX-License-Identifier: EUPL-1.2
+#
+"""
+Index of the UCI log, to find which provider event a UCI was made for and the other way around.
+
+Every log file gets its own folder in the index, named after its first line so it is found again after the log is
+rotated. For each of the fields uci, provider and unique the index has sorted segments of fixed size entries:
+the blake2b digest of the value and the offset of the line in the log. New lines are added as a new segment, and
+segments are merged when there are too many of them. Lookups binary search the memory-mapped segments and read the
+matching lines from the log one at a time.
+
+Usage: python -m api.uci_log_index uci.log [--uci URN:UCI:01:NL:...#X | --provider ZZZ | --unique ...]
+"""
+
+import argparse
+import hashlib
+import heapq
+import json
+import mmap
+import os
+import re
+import shutil
+import struct
+import sys
+from pathlib import Path
+from typing import IO, Any, Dict, Iterator, List, NamedTuple, Optional, Tuple, Union
+
+import orjson
+
+FIELDS = ("uci", "provider", "unique")
+
+DIGEST_SIZE = 16
+ENTRY = struct.Struct(f">{DIGEST_SIZE}sQ")
+
+# Lines in a segment at most, this limits the memory needed to build the index of a large log at once
+SEGMENT_SIZE = 1_000_000
+# More segments than this are merged into one
+MAX_SEGMENTS = 8
+
+READ_SIZE = 16 * 1024 * 1024
+FINGERPRINT_SIZE = 4096
+
+
+class UciLogRecord(NamedTuple):
+    uci: str
+    provider: str
+    unique: str
+    # The line as it is in the log, without the newline
+    line: str
+
+
+def key_digest(value: str) -> bytes:
+    return hashlib.blake2b(value.encode(), digest_size=DIGEST_SIZE).digest()
+
+
+def parse_line(line: bytes) -> Optional[Dict[str, Any]]:
+    # [INFO] [17/Jun/2021 09:41:35] [uci:447] {"uci": "...", "provider": "ZZZ", "unique": "..."}
+    start = line.find(b"{")
+    if start == -1:
+        return None
+    try:
+        record = orjson.loads(line[start:])
+    except orjson.JSONDecodeError:
+        return None
+    if not isinstance(record, dict) or not all(isinstance(record.get(field), str) for field in FIELDS):
+        return None
+    return record
+
+
+def log_files(log: Path) -> List[Path]:
+    """
+    The log and its rotated files, oldest first. UciAuditLogHandler appends the time of rotation to the name, a
+    RotatingFileHandler or logrotate a number that is higher for older files.
+    """
+    rotated = re.compile(rf"{re.escape(log.name)}\.(?:(\d+)|(\d{{8}}T\d{{12}}Z))")
+    numbered, timed = [], []
+    for path in log.parent.iterdir():
+        match = rotated.fullmatch(path.name)
+        if match and match.group(1):
+            numbered.append((int(match.group(1)), path))
+        elif match:
+            timed.append((match.group(2), path))
+    return (
+        [path for _, path in sorted(numbered, reverse=True)]
+        + [path for _, path in sorted(timed)]
+        + ([log] if log.exists() else [])
+    )
+
+
+def fingerprint(log: Path) -> Optional[str]:
+    with open(log, "rb") as file:
+        first_line = file.readline(FINGERPRINT_SIZE)
+    if not first_line.endswith(b"\n") and len(first_line) < FINGERPRINT_SIZE:
+        # Still being written
+        return None
+    return hashlib.sha256(first_line).hexdigest()[:32]
+
+
+class Segment:
+    def __init__(self, path: Path):
+        self.path = path
+
+    def offsets(self, digest: bytes) -> Iterator[int]:
+        with open(self.path, "rb") as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as entries:
+            position = self._lower_bound(entries, digest)
+            while position < len(entries) and entries[position : position + DIGEST_SIZE] == digest:
+                yield ENTRY.unpack_from(entries, position)[1]
+                position += ENTRY.size
+
+    @staticmethod
+    def _lower_bound(entries: mmap.mmap, digest: bytes) -> int:
+        low, high = 0, len(entries) // ENTRY.size
+        while low < high:
+            middle = (low + high) // 2
+            if entries[middle * ENTRY.size : middle * ENTRY.size + DIGEST_SIZE] < digest:
+                low = middle + 1
+            else:
+                high = middle
+        return low * ENTRY.size
+
+    def entries(self) -> Iterator[bytes]:
+        with open(self.path, "rb") as file:
+            while chunk := file.read(ENTRY.size * 4096):
+                for position in range(0, len(chunk), ENTRY.size):
+                    yield chunk[position : position + ENTRY.size]
+
+    @staticmethod
+    def write(path: Path, entries: Iterator[bytes]) -> "Segment":
+        temporary = path.with_suffix(".tmp")
+        with open(temporary, "wb") as file:
+            for entry in entries:
+                file.write(entry)
+        os.replace(temporary, path)
+        return Segment(path)
+
+
+class LogFileIndex:
+    """
+    The index of one log file. state.json has how far the log is indexed and which segments there are.
+    """
+
+    def __init__(self, log: Path, folder: Path):
+        self.log = log
+        self.folder = folder
+        self._state_path = folder / "state.json"
+        self.indexed = 0
+        self.segments: List[int] = []
+        self.next_segment = 0
+        if self._state_path.exists():
+            state = json.loads(self._state_path.read_text())
+            self.indexed, self.segments, self.next_segment = state["indexed"], state["segments"], state["next_segment"]
+
+    def segment(self, field: str, number: int) -> Segment:
+        return Segment(self.folder / f"{field}.{number}.idx")
+
+    def update(self) -> int:
+        """Indexes the lines added to the log since the last update, returns the number of lines indexed."""
+        if self.log.stat().st_size < self.indexed:
+            # Not the file that was indexed after all
+            shutil.rmtree(self.folder)
+            self.indexed, self.segments, self.next_segment = 0, [], 0
+
+        self.folder.mkdir(parents=True, exist_ok=True)
+        indexed = 0
+        with open(self.log, "rb") as log:
+            log.seek(self.indexed)
+            while True:
+                entries, offset = self._read_entries(log, self.indexed)
+                if offset == self.indexed:
+                    break
+                if entries["uci"]:
+                    self._add_segment(entries)
+                indexed += len(entries["uci"])
+                self.indexed = offset
+                self._save()
+
+        if len(self.segments) > MAX_SEGMENTS:
+            self._merge()
+        return indexed
+
+    @staticmethod
+    def _read_entries(log: IO[bytes], offset: int) -> Tuple[Dict[str, List[bytes]], int]:
+        entries: Dict[str, List[bytes]] = {field: [] for field in FIELDS}
+        pending = b""
+        while len(entries["uci"]) < SEGMENT_SIZE and (chunk := log.read(READ_SIZE)):
+            data = pending + chunk
+            start = 0
+            while len(entries["uci"]) < SEGMENT_SIZE and (end := data.find(b"\n", start)) != -1:
+                record = parse_line(data[start:end])
+                if record is not None:
+                    for field in FIELDS:
+                        entries[field].append(ENTRY.pack(key_digest(record[field]), offset + start))
+                start = end + 1
+            offset += start
+            pending = data[start:]
+        # A line that is not complete yet is indexed in a next update
+        log.seek(offset)
+        return entries, offset
+
+    def _add_segment(self, entries: Dict[str, List[bytes]]) -> None:
+        for field in FIELDS:
+            # Entries of the same value stay in the order of the log, the offset is part of the sort key
+            Segment.write(self.folder / f"{field}.{self.next_segment}.idx", iter(sorted(entries[field])))
+        self.segments.append(self.next_segment)
+        self.next_segment += 1
+
+    def _merge(self) -> None:
+        merged = self.next_segment
+        for field in FIELDS:
+            parts = [self.segment(field, number).entries() for number in self.segments]
+            Segment.write(self.folder / f"{field}.{merged}.idx", heapq.merge(*parts))
+        old, self.segments, self.next_segment = self.segments, [merged], merged + 1
+        self._save()
+        for number in old:
+            for field in FIELDS:
+                self.segment(field, number).path.unlink()
+
+    def _save(self) -> None:
+        temporary = self._state_path.with_suffix(".tmp")
+        state = {"indexed": self.indexed, "segments": self.segments, "next_segment": self.next_segment}
+        temporary.write_text(json.dumps(state))
+        os.replace(temporary, self._state_path)
+
+    def find(self, field: str, value: str) -> Iterator[UciLogRecord]:
+        digest = key_digest(value)
+        with open(self.log, "rb") as log:
+            # Segments are in the order of the log, as are the offsets of a value within a segment
+            for number in self.segments:
+                for offset in self.segment(field, number).offsets(digest):
+                    log.seek(offset)
+                    line = log.readline().rstrip(b"\n")
+                    record = parse_line(line)
+                    # Another value with the same digest is not impossible
+                    if record is not None and record[field] == value:
+                        yield UciLogRecord(record["uci"], record["provider"], record["unique"], line.decode())
+
+
+class UciLogIndex:
+    """
+    The index of a UCI log and its rotated files. Lookups take O(log n) per segment and stream the matching records.
+    """
+
+    def __init__(self, log: Union[str, Path], folder: Union[str, Path, None] = None):
+        self.log = Path(log)
+        self.folder = Path(folder) if folder else self.log.with_name(f"{self.log.name}.index")
+
+    def _indexes(self) -> Iterator[LogFileIndex]:
+        for log in log_files(self.log):
+            name = fingerprint(log)
+            if name:
+                yield LogFileIndex(log, self.folder / name)
+
+    def update(self) -> int:
+        """Indexes what was added to the logs, returns the number of lines indexed. Removes indexes of removed logs."""
+        indexes = list(self._indexes())
+        indexed = sum(index.update() for index in indexes)
+        current = {index.folder.name for index in indexes}
+        for folder in self.folder.iterdir() if self.folder.exists() else []:
+            if folder.is_dir() and folder.name not in current:
+                shutil.rmtree(folder)
+        return indexed
+
+    def find(self, field: str, value: str) -> Iterator[UciLogRecord]:
+        """The records with this value of uci, provider or unique, oldest first. Only finds what is indexed."""
+        if field not in FIELDS:
+            raise ValueError(f"Cannot find by {field}, only by {', '.join(FIELDS)}")
+        for index in self._indexes():
+            yield from index.find(field, value)
+
+    def find_uci(self, uci: str) -> Optional[UciLogRecord]:
+        return next(self.find("uci", uci), None)
+
+
+def main(arguments: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(
+        prog="python -m api.uci_log_index", description="Updates the index of the UCI log and finds records in it."
+    )
+    parser.add_argument("log", help="the UCI log, its rotated files are indexed as well")
+    parser.add_argument("--index", help="folder of the index, default: the log with .index appended")
+    parser.add_argument("--no-update", action="store_true", help="only look in what is indexed already")
+    lookup = parser.add_mutually_exclusive_group()
+    for field in FIELDS:
+        lookup.add_argument(f"--{field}", help=f"print the log lines with this {field}")
+    options = parser.parse_args(arguments)
+
+    index = UciLogIndex(options.log, options.index)
+    if not options.no_update:
+        indexed = index.update()
+        print(f"Indexed {indexed} lines", file=sys.stderr)
+
+    for field in FIELDS:
+        value = getattr(options, field)
+        if value is not None:
+            for record in index.find(field, value):
+                sys.stdout.write(f"{record.line}\n")
+
+
+if __name__ == "__main__":
+    main()
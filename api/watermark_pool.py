@@ -0,0 +1,83 @@
+# Copyright (c) 2020-2021 De Staat der Nederlanden, Ministerie van Volksgezondheid, Welzijn en Sport.
+#
+# Licensed under the EUROPEAN UNION PUBLIC LICENCE v. 1.2
+#
+# SPDX-License-Identifier: EUPL-1.2
+#
+import asyncio
+from collections import deque
+from typing import Deque, Generic, Optional, TypeVar
+
+Item = TypeVar("Item")
+
+
+class WatermarkPool(Generic[Item]):
+    """
+    Items made ahead of time, handed out once each, the oldest first.
+
+    When fewer than the low watermark are left, a background task refills the pool up to its high watermark. Outside
+    of an event loop nothing is refilled. Subclasses make the items in _refill, and fall back to making an item on the
+    spot when _take returns None. Each worker has its own pools.
+    """
+
+    def __init__(self, enabled: bool, low_watermark: int, high_watermark: int):
+        self._enabled = enabled
+        self._low_watermark = low_watermark
+        self._high_watermark = high_watermark
+
+        self._items: Deque[Item] = deque()
+        self._refill_task: Optional["asyncio.Task[None]"] = None
+
+        self.hits = 0
+        self.misses = 0
+
+    def _take(self) -> Optional[Item]:
+        """
+        The oldest item, or None when the pool is disabled or empty. Starts a refill when the pool runs low.
+        """
+        if not self._enabled:
+            return None
+
+        item = self._items.popleft() if self._items else None
+        if item is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+
+        if len(self._items) < self._low_watermark:
+            self.start_refill()
+        return item
+
+    @property
+    def missing(self) -> int:
+        """The number of items to make to be at the high watermark."""
+        return max(0, self._high_watermark - len(self._items))
+
+    def start_refill(self) -> None:
+        if not self._enabled:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # Such as in scripts, the callers make every item themselves.
+            return
+        if self.refilling:
+            return
+        self._refill_task = loop.create_task(self._refill())
+
+    @property
+    def refilling(self) -> bool:
+        # A task of another event loop (tests) will never finish in this one.
+        return (
+            self._refill_task is not None
+            and not self._refill_task.done()
+            and self._refill_task.get_loop() is asyncio.get_running_loop()
+        )
+
+    async def _refill(self) -> None:
+        raise NotImplementedError
+
+    async def aclose(self) -> None:
+        if self._refill_task is not None and not self._refill_task.done():
+            self._refill_task.cancel()
+        self._items.clear()
@@ -0,0 +1,58 @@
+# Copyright (c) 2020-2021 De Staat der Nederlanden, Ministerie van Volksgezondheid, Welzijn en Sport.
+#
+# Licensed under the EUROPEAN UNION PUBLIC LICENCE v. 1.2
+#
+# SPDX-License-Identifier: EUPL-1.2
+#
+import base64
+import json
+import logging
+import timeit
+from typing import List
+
+from pydantic import ValidationError
+
+from api.app_support import data_provider_events_results_to_events, extract_results
+from api.models import CMSSignedDataBlob, DataProviderEventsResult, Event, Events
+from api.tests.test_utils import DEFAULT_TEST_DATA, json_from_test_data_file
+
+
+def two_pass_decoding(blobs: List[CMSSignedDataBlob]) -> Events:
+    # json, a DataProviderEventsResult and every event validated again as Event, as before extract_results did it
+    events = Events()
+    for blob in blobs:
+        result = DataProviderEventsResult(**json.loads(base64.b64decode(blob.payload)))
+        for dp_event in result.events:
+            events.events.append(
+                Event(source_provider_identifier=result.providerIdentifier, holder=result.holder, **dp_event.dict())
+            )
+    return events
+
+
+if __name__ == "__main__":
+    """
+    Payloads per second when decoding the valid payloads of the combined test data, with json and validating every
+    event twice, compared to orjson and validating every event once.
+
+    Run with: python -m test_scripts.benchmark_cms_decoding
+    """
+    logging.getLogger("api").setLevel(logging.WARNING)
+    number = 20
+
+    payloads = []
+    for dp_event_json in json_from_test_data_file(DEFAULT_TEST_DATA).values():
+        blob = CMSSignedDataBlob(signature="", payload=base64.b64encode(json.dumps(dp_event_json).encode()).decode())
+        try:
+            two_pass_decoding([blob])
+        except ValidationError:
+            continue
+        payloads.append(blob)
+
+    assert two_pass_decoding(payloads) == data_provider_events_results_to_events(extract_results(payloads))
+
+    for name, decode in [
+        ("json, two validations", lambda: two_pass_decoding(payloads)),
+        ("orjson, one validation", lambda: data_provider_events_results_to_events(extract_results(payloads))),
+    ]:
+        seconds = timeit.timeit(decode, number=number)
+        print(f"{name:>24}: {number * len(payloads) / seconds:8.0f} payloads/s")
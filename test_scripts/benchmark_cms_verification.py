@@ -0,0 +1,57 @@
+# Copyright (c) 2020-2021 De Staat der Nederlanden, Ministerie van Volksgezondheid, Welzijn en Sport.
+#
+# Licensed under the EUROPEAN UNION PUBLIC LICENCE v. 1.2
+#
+# SPDX-License-Identifier: EUPL-1.2
+#
+import asyncio
+import logging
+import tempfile
+import time
+from pathlib import Path
+
+from cryptography.hazmat.primitives.serialization import Encoding
+
+from api.cms_signatures import CmsVerifier, parse_certificate
+from api.settings import settings
+from api.tests.test_cms_signatures import PAYLOAD, new_certificate, sign
+
+if __name__ == "__main__":
+    """
+    Signatures per second of a request with a handful of blobs, without caches, with the certificate and chain caches,
+    and with the caches verified over threads.
+
+    Run with: python -m test_scripts.benchmark_cms_verification
+    """
+    logging.getLogger("api").setLevel(logging.WARNING)
+    number = 200
+    blobs = 8
+
+    provider_ca = new_certificate("ZZZ CA", ca=True)
+    signed_payloads = [("ZZZ", sign(PAYLOAD, new_certificate("ZZZ signing", issuer=provider_ca)), PAYLOAD)] * blobs
+
+    with tempfile.TemporaryDirectory() as secrets_folder:
+        Path(secrets_folder, "zzz_cms.crt").write_bytes(provider_ca[0].public_bytes(Encoding.PEM))
+
+        def new_verifier(threads):
+            return CmsVerifier(
+                settings.copy(
+                    update={"SECRETS_FOLDER": Path(secrets_folder), "CMS_SIGNATURE_VERIFICATION_THREADS": threads}
+                ),
+                provider_configs=[{"identifier": "ZZZ", "cms_certificates": ["zzz_cms.crt"]}],
+            )
+
+        def without_caches():
+            parse_certificate.cache_clear()
+            return new_verifier(1)
+
+        for name, verifier_of_request in [
+            ("no caches", without_caches),
+            ("caches", lambda verifier=new_verifier(1): verifier),
+            ("caches, 4 threads", lambda verifier=new_verifier(4): verifier),
+        ]:
+            started = time.perf_counter()
+            for _ in range(number):
+                errors = asyncio.run(verifier_of_request().verify_all(signed_payloads))
+                assert errors == [None] * blobs
+            print(f"{name:>18}: {number * blobs / (time.perf_counter() - started):8.0f} signatures/s")
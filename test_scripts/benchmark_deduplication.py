@@ -0,0 +1,36 @@
+# Copyright (c) 2020-2021 De Staat der Nederlanden, Ministerie van Volksgezondheid, Welzijn en Sport.
+#
+# Licensed under the EUROPEAN UNION PUBLIC LICENCE v. 1.2
+#
+# SPDX-License-Identifier: EUPL-1.2
+#
+import logging
+import timeit
+from copy import deepcopy
+from datetime import timedelta
+
+from api.models import Event, Events
+from api.signers.logic import deduplicate_events
+from api.tests.test_eu_rules import DEFAULT_NEGATIVE_TEST
+
+if __name__ == "__main__":
+    """
+    Shows how deduplication scales with the number of events of a holder. Half of the negative tests are
+    duplicates from another provider, the rest are a few days apart.
+
+    Run with: python -m test_scripts.benchmark_deduplication
+    """
+    logging.getLogger("api").setLevel(logging.WARNING)
+
+    for amount in [100, 500, 1000, 2000, 5000]:
+        events = []
+        for number in range(amount):
+            event = Event(**deepcopy(DEFAULT_NEGATIVE_TEST))
+            event.unique = str(number)
+            event.negativetest.sampleDate += timedelta(days=(number // 2) * 3)  # type: ignore
+            events.append(event)
+
+        # deduplication merges into the events, so every run gets its own copy
+        copies = [Events(events=deepcopy(events)) for _ in range(3)]
+        duration = min(timeit.repeat(lambda: deduplicate_events(copies.pop()), number=1, repeat=3))
+        print(f"{amount:>5} events: {duration * 1000:8.1f} ms, {duration / amount * 1_000_000:6.1f} us per event")
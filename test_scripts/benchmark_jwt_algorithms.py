@@ -0,0 +1,26 @@
+# Copyright (c) 2020-2021 De Staat der Nederlanden, Ministerie van Volksgezondheid, Welzijn en Sport.
+#
+# Licensed under the EUROPEAN UNION PUBLIC LICENCE v. 1.2
+#
+# SPDX-License-Identifier: EUPL-1.2
+#
+import logging
+import timeit
+
+from api.key_material import encode_jwt, identity_hash_jwt_private_keys
+from test_scripts.benchmark_jwt_keys import PAYLOAD
+
+if __name__ == "__main__":
+    """
+    Access tokens per second for event data providers, per jwt algorithm that a provider can choose in
+    vaccinationproviders.json5. Every provider costs two tokens per request for access tokens.
+
+    Run with: python -m test_scripts.benchmark_jwt_algorithms
+    """
+    logging.getLogger("api").setLevel(logging.WARNING)
+    number = 500
+
+    for algorithm, key in identity_hash_jwt_private_keys.items():
+        duration = min(timeit.repeat(lambda: encode_jwt(PAYLOAD, key, algorithm=algorithm), number=number, repeat=3))
+        duration /= number
+        print(f"{algorithm:>6}: {1 / duration:8.0f} tokens per second, {duration * 1_000_000:7.1f} us per token")
@@ -0,0 +1,50 @@
+# Copyright (c) 2020-2021 De Staat der Nederlanden, Ministerie van Volksgezondheid, Welzijn en Sport.
+#
+# Licensed under the EUROPEAN UNION PUBLIC LICENCE v. 1.2
+#
+# SPDX-License-Identifier: EUPL-1.2
+#
+import logging
+import timeit
+
+import jwt
+
+from api.key_material import KeyMaterial, decode_jwt, encode_jwt, identity_hash_jwt_private_key, load_public_key
+from api.settings import settings
+
+PAYLOAD = {
+    "aud": "https://example.com/events/v2/data/",
+    "bsn": "a58b4ae6b3a1fb3f7c4e3b8c2d7b4b0d33f0d7d2f0e1",
+    "exp": 4102444800,
+    "iat": 1580601600,
+    "identityHash": "44b3ee6e1b9d4ae8b2ba3e5c3a51bfa9a4a2c6fe2e5f1a3ad2d6bb64fa6cbd2f",
+    "iss": "jwt.test.coronacheck.nl",
+    "nbf": 1580601600,
+    "nonce": "303132333435363738393031323334353637383930313233",
+    "roleIdentifier": "01",
+}
+
+if __name__ == "__main__":
+    """
+    Tokens per second when PyJWT gets the pem of the key, compared to the key object of api.key_material.
+
+    Run with: python -m test_scripts.benchmark_jwt_keys
+    """
+    logging.getLogger("api").setLevel(logging.WARNING)
+    number = 500
+
+    public_pem = settings.IDENTITY_HASH_JWT_PUBLIC_KEY
+    public_key = KeyMaterial(
+        f"{settings.SECRETS_FOLDER}/{settings.DYNAMIC_FLOW_JWT_PUBLIC_KEY_FILENAME}", load_public_key
+    )
+    token = encode_jwt(PAYLOAD, identity_hash_jwt_private_key)
+
+    runs = {
+        "encode, pem": lambda: jwt.encode(PAYLOAD, settings.IDENTITY_HASH_JWT_PRIVATE_KEY, algorithm="RS256"),
+        "encode, key object": lambda: encode_jwt(PAYLOAD, identity_hash_jwt_private_key),
+        "decode, pem": lambda: jwt.decode(token, public_pem, algorithms=["RS256"], audience=PAYLOAD["aud"]),
+        "decode, key object": lambda: decode_jwt(token, public_key, algorithms=["RS256"], audience=PAYLOAD["aud"]),
+    }
+    for name, run in runs.items():
+        duration = min(timeit.repeat(run, number=number, repeat=3)) / number
+        print(f"{name:>20}: {1 / duration:8.0f} tokens per second, {duration * 1_000_000:7.1f} us per token")
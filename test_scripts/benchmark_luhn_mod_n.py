@@ -0,0 +1,32 @@
+# Copyright (c) 2020-2021 De Staat der Nederlanden, Ministerie van Volksgezondheid, Welzijn en Sport.
+#
+# Licensed under the EUROPEAN UNION PUBLIC LICENCE v. 1.2
+#
+# SPDX-License-Identifier: EUPL-1.2
+#
+import logging
+import timeit
+
+from api.tests.test_uci import ReferenceLuhnModN
+from api.uci import LuhnModN, generate_uci_01
+
+if __name__ == "__main__":
+    """
+    UCI's per second that get their check character validated: the reference implementation, the table driven
+    LuhnModN one at a time, and in a batch.
+
+    Run with: python -m test_scripts.benchmark_luhn_mod_n
+    """
+    logging.getLogger("api").setLevel(logging.WARNING)
+    number = 5
+
+    ucis = [generate_uci_01().replace("#", "") for _ in range(20000)]
+    assert LuhnModN.validate_check_characters(ucis) == [ReferenceLuhnModN.validate_check_character(uci) for uci in ucis]
+
+    for name, validate in [
+        ("reference", lambda: [ReferenceLuhnModN.validate_check_character(uci) for uci in ucis]),
+        ("table", lambda: [LuhnModN.validate_check_character(uci) for uci in ucis]),
+        ("table, batch", lambda: LuhnModN.validate_check_characters(ucis)),
+    ]:
+        seconds = timeit.timeit(validate, number=number)
+        print(f"{name:>12}: {number * len(ucis) / seconds:9.0f} UCI's/s")
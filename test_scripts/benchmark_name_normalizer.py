@@ -0,0 +1,37 @@
+# Copyright (c) 2020-2021 De Staat der Nederlanden, Ministerie van Volksgezondheid, Welzijn en Sport.
+#
+# Licensed under the EUROPEAN UNION PUBLIC LICENCE v. 1.2
+#
+# SPDX-License-Identifier: EUPL-1.2
+#
+import logging
+import timeit
+
+from api.enrichment.name_normalizer import normalize_name
+from api.tests.test_name_normalizer import mrz_normalize_name
+from api.tests.test_utils import DEFAULT_TEST_DATA, json_from_test_data_file
+
+if __name__ == "__main__":
+    """
+    Names per second normalized with the transliteration of mrz, compared to the translation table. The lru cache in
+    front of normalize_name is left out, every name is normalized.
+
+    Run with: python -m test_scripts.benchmark_name_normalizer
+    """
+    logging.getLogger("api").setLevel(logging.WARNING)
+    number = 200
+
+    names = [
+        name
+        for dp_event_json in json_from_test_data_file(DEFAULT_TEST_DATA).values()
+        for name in [dp_event_json["holder"]["firstName"], dp_event_json["holder"]["lastName"]]
+    ]
+    names += ["Červenková Panklová", "Þĩŝ ïŜ Á ţęšť", "παράδειγμα δοκιμής", "Мария-Тереза", "محمود عبدالرحيم"]
+    assert [mrz_normalize_name(name) for name in names] == [normalize_name.__wrapped__(name) for name in names]
+
+    for name, normalize in [
+        ("mrz transliterate", mrz_normalize_name),
+        ("translation table", normalize_name.__wrapped__),
+    ]:
+        seconds = timeit.timeit(lambda: [normalize(name) for name in names], number=number)
+        print(f"{name:>18}: {number * len(names) / seconds:9.0f} names/s")
@@ -0,0 +1,34 @@
+# Copyright (c) 2020-2021 De Staat der Nederlanden, Ministerie van Volksgezondheid, Welzijn en Sport.
+#
+# Licensed under the EUROPEAN UNION PUBLIC LICENCE v. 1.2
+#
+# SPDX-License-Identifier: EUPL-1.2
+#
+import logging
+import timeit
+
+from api.constants import INGE4_ROOT
+from api.enrichment.rvig.vraag_response import parse_vraag_response
+from api.tests.test_enrichment_rvig import RVIG_FIXTURES, zeep_vraag_antwoord
+
+if __name__ == "__main__":
+    """
+    Compares reading a GBA-V vraagResponse with the streaming parser to deserializing it with zeep, for every
+    response in api/tests/rvig.
+
+    Run with: python -m test_scripts.benchmark_rvig_response
+    """
+    logging.getLogger("api").setLevel(logging.WARNING)
+    logging.getLogger("zeep").setLevel(logging.WARNING)
+    number = 1000
+
+    for fixture in RVIG_FIXTURES:
+        with open(f"{INGE4_ROOT}/api/tests/rvig/{fixture}", "rb") as file:
+            content = file.read()
+
+        streaming = min(timeit.repeat(lambda: parse_vraag_response(content), number=number, repeat=3)) / number
+        zeep = min(timeit.repeat(lambda: zeep_vraag_antwoord(content), number=number, repeat=3)) / number
+        print(
+            f"{fixture:>22}: streaming {streaming * 1_000_000:7.1f} us, zeep {zeep * 1_000_000:7.1f} us, "
+            f"{zeep / streaming:5.1f}x"
+        )
@@ -0,0 +1,49 @@
+# Copyright (c) 2020-2021 De Staat der Nederlanden, Ministerie van Volksgezondheid, Welzijn en Sport.
+#
+# Licensed under the EUROPEAN UNION PUBLIC LICENCE v. 1.2
+#
+# SPDX-License-Identifier: EUPL-1.2
+#
+import logging
+import timeit
+from datetime import datetime, timedelta
+
+import pytz
+
+from api.models import ContiguousOriginsBlock, Holder, RichOrigin
+from api.settings import settings
+from api.signers.logic_domestic import calculate_attributes_from_blocks, calculate_strips_from_blocks
+from api.tests.test_logic_domestic import reference_calculate_attributes_from_blocks
+
+if __name__ == "__main__":
+    """
+    Strips per second for a vaccination that is valid for years, over issuance windows of increasing length: the
+    reference that builds and strikes the attributes of every strip, the strips themselves, and the strips turned into
+    signer attributes.
+
+    Run with: python -m test_scripts.benchmark_strip_schedule
+    """
+    logging.getLogger("api").setLevel(logging.WARNING)
+    now = datetime.now(tz=pytz.utc)
+    block = ContiguousOriginsBlock.from_origin(
+        RichOrigin(
+            holder=Holder(firstName="Top", lastName="Pertje", birthDate="1950-01-01", infix=""),
+            type="vaccination",
+            eventTime=now - timedelta(days=30),
+            validFrom=now - timedelta(days=30),
+            expirationTime=now + timedelta(days=1461),
+            isSpecimen=False,
+        )
+    )
+
+    for days in [28, 90, 365]:
+        settings.DOMESTIC_MAXIMUM_ISSUANCE_DAYS = days
+        strips = len(calculate_strips_from_blocks([block]))
+        number = max(1, 10000 // strips)
+        for name, calculate in [
+            ("reference", reference_calculate_attributes_from_blocks),
+            ("strips", calculate_strips_from_blocks),
+            ("attributes", calculate_attributes_from_blocks),
+        ]:
+            seconds = timeit.timeit(lambda: calculate([block]), number=number)  # pylint: disable=cell-var-from-loop
+            print(f"{days:>3} days {name:>10}: {number * strips / seconds:9.0f} strips/s")
@@ -0,0 +1,43 @@
+# Copyright (c) 2020-2021 De Staat der Nederlanden, Ministerie van Volksgezondheid, Welzijn en Sport.
+#
+# Licensed under the EUROPEAN UNION PUBLIC LICENCE v. 1.2
+#
+# SPDX-License-Identifier: EUPL-1.2
+#
+import json
+import logging
+import tempfile
+import timeit
+from pathlib import Path
+
+from api.uci import generate_ucis_01
+from api.uci_audit_log import UciAuditLogHandler
+
+if __name__ == "__main__":
+    """
+    Time spent logging a UCI on the request thread, with the FileHandler that was used before and the
+    UciAuditLogHandler. The time to get everything on disk is measured separately.
+
+    Run with: python -m test_scripts.benchmark_uci_audit_log
+    """
+    logging.getLogger("api").setLevel(logging.WARNING)
+    amount = 100000
+    messages = [
+        json.dumps({"uci": uci, "provider": "ZZZ", "unique": "UCI_TEST_EVENT"}) for uci in generate_ucis_01(amount)
+    ]
+    formatter = logging.Formatter("[%(levelname)s] [%(asctime)-15s] [%(name)s:%(lineno)s] %(message)s")
+
+    with tempfile.TemporaryDirectory() as folder:
+        for name, handler in [
+            ("FileHandler", logging.FileHandler(Path(folder) / "file_handler.log")),
+            ("UciAuditLogHandler", UciAuditLogHandler(Path(folder) / "uci_audit.log", fsync_count=100)),
+        ]:
+            handler.setFormatter(formatter)
+            logger = logging.getLogger(f"benchmark_{name}")
+            logger.propagate = False
+            logger.setLevel(logging.INFO)
+            logger.addHandler(handler)
+
+            logged = timeit.timeit(lambda: [logger.info(message) for message in messages], number=1)  # noqa
+            on_disk = logged + timeit.timeit(handler.close, number=1)
+            print(f"{name:>18}: {amount / logged:9.0f} UCI's/s logged, {amount / on_disk:9.0f} UCI's/s on disk")
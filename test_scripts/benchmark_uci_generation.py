@@ -0,0 +1,40 @@
+# Copyright (c) 2020-2021 De Staat der Nederlanden, Ministerie van Volksgezondheid, Welzijn en Sport.
+#
+# Licensed under the EUROPEAN UNION PUBLIC LICENCE v. 1.2
+#
+# SPDX-License-Identifier: EUPL-1.2
+#
+import asyncio
+import logging
+import timeit
+
+from api.settings import settings
+from api.uci import UciPool, generate_uci_01, generate_ucis_01
+
+
+async def take_from_pool(pool: UciPool, amount: int) -> None:
+    for _ in range(amount):
+        pool.take()
+
+
+if __name__ == "__main__":
+    """
+    UCI's per second generated one at a time, in batches of 100, and taken from a filled pool.
+
+    Run with: python -m test_scripts.benchmark_uci_generation
+    """
+    logging.getLogger("api").setLevel(logging.WARNING)
+    amount = 100000
+
+    pool = UciPool(settings.copy(update={"UCI_POOL_ENABLED": True, "UCI_POOL_HIGH_WATERMARK": amount}))
+    asyncio.run(pool._refill())  # pylint: disable=protected-access
+
+    # Taking stops above the low watermark, so the pool does not start a refill
+    taken = amount - settings.UCI_POOL_LOW_WATERMARK
+    for name, number_of_ucis, generate in [
+        ("one at a time", amount, lambda: [generate_uci_01() for _ in range(amount)]),
+        ("batches of 100", amount, lambda: [generate_ucis_01(100) for _ in range(amount // 100)]),
+        ("taken from pool", taken, lambda: asyncio.run(take_from_pool(pool, taken))),
+    ]:
+        seconds = timeit.timeit(generate, number=1)
+        print(f"{name:>16}: {number_of_ucis / seconds:9.0f} UCI's/s")
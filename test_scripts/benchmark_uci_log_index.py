@@ -0,0 +1,46 @@
+# Copyright (c) 2020-2021 De Staat der Nederlanden, Ministerie van Volksgezondheid, Welzijn en Sport.
+#
+# Licensed under the EUROPEAN UNION PUBLIC LICENCE v. 1.2
+#
+# SPDX-License-Identifier: EUPL-1.2
+#
+import json
+import logging
+import tempfile
+import timeit
+from pathlib import Path
+
+from api.uci import generate_ucis_01
+from api.uci_log_index import UciLogIndex, parse_line
+
+
+def scan(log: Path, uci: str) -> list:
+    with open(log, "rb") as file:
+        return [line for line in file if (record := parse_line(line)) and record["uci"] == uci]
+
+
+if __name__ == "__main__":
+    """
+    Finding a UCI by scanning the log and with the index, and the time it takes to build the index.
+
+    Run with: python -m test_scripts.benchmark_uci_log_index
+    """
+    logging.getLogger("api").setLevel(logging.WARNING)
+    amount = 500000
+    ucis = generate_ucis_01(amount)
+
+    with tempfile.TemporaryDirectory() as folder:
+        log = Path(folder) / "uci.log"
+        with open(log, "w", encoding="utf-8") as file:
+            for number, uci in enumerate(ucis):
+                message = json.dumps({"uci": uci, "provider": "ZZZ", "unique": str(number)})
+                file.write(f"[INFO] [17/Jun/2021 09:41:35] [uci:479] {message}\n")
+
+        index = UciLogIndex(log)
+        print(f"{'build index':>12}: {amount / timeit.timeit(index.update, number=1):9.0f} lines/s")
+
+        wanted = ucis[amount // 2 : amount // 2 + 1000]
+        seconds = timeit.timeit(lambda: scan(log, wanted[0]), number=1)
+        print(f"{'scan':>12}: {1 / seconds:9.1f} lookups/s")
+        seconds = timeit.timeit(lambda: [index.find_uci(uci) for uci in wanted], number=1)
+        print(f"{'index':>12}: {len(wanted) / seconds:9.0f} lookups/s")
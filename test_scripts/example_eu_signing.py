@@ -4,6 +4,7 @@
 #
 # SPDX-License-Identifier: EUPL-1.2
 #
+import asyncio
 import logging
 
 from api.models import Events, CredentialsRequestData
@@ -205,18 +206,20 @@ prepare_issue_message = """
 stoken = "43b09572-c4b3-4247-8dc1-104680c20b82"
 
 if __name__ == "__main__":
-    data = nl_sign(
-        CredentialsRequestData(
-            **{
-                "events": Events(**testcase_events),
-                "issueCommitmentMessage": issue_commitment_message,
-                "stoken": stoken,
-            }
-        ),
-        prepare_issue_message,
+    data = asyncio.run(
+        nl_sign(
+            CredentialsRequestData(
+                **{
+                    "events": Events(**testcase_events),
+                    "issueCommitmentMessage": issue_commitment_message,
+                    "stoken": stoken,
+                }
+            ),
+            prepare_issue_message,
+        )
     )
 
     log.info(data)
 
-    data = eu_sign(Events(**testcase_events))
+    data = asyncio.run(eu_sign(Events(**testcase_events)))
     log.info(data)